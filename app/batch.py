@@ -0,0 +1,316 @@
+"""
+NautiCAI — Headless Batch Inspection
+Runs the inspection engine over a directory of stills and videos with a worker
+pool. Every asset gets a JSON result (written last, atomically) so an
+interrupted run resumes where it stopped.
+"""
+
+import os, json, time, hashlib, datetime
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+import engine
+from engine import (full_enhance_bgr, annotate_image, build_heatmap, compute_risk,
+                    score_to_grade, cv_to_pil)
+from ingest import probe, load_bgr, large_images, MAX_SIDE
+from worker_pool import set_threads, tuned
+from telemetry import Trace, observe, write_metrics
+
+IMAGE_EXT = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff"}
+VIDEO_EXT = {".mp4", ".avi", ".mov", ".mkv"}
+MODE_PREFIX = {"hull": "HULL", "pipeline": "PIPE", "cable": "CABLE"}
+
+DEFAULT_SETTINGS = {
+    "mode": "general",
+    "conf": engine.DETECT_CONFIG["conf"],
+    "iou": engine.DETECT_CONFIG["iou"],
+    "clahe": True,
+    "clahe_clip": 3.0,
+    "green": True,
+    "edge": False,
+    "turbidity": 0.0,
+    "correct_turbidity": True,
+    "sample_every": 10,
+    "vessel": "Unknown",
+    "inspector": "NautiCAI AutoScan v1.0",
+    "model": None,      # weights path; None = engine default
+    "imgsz": None,      # inference size; None = model default
+    "roi": True,        # pipeline / cable: detect inside the asset band only
+    "max_side": MAX_SIDE,   # stills are decoded straight to this longest side
+}
+
+
+# ═══════════════════════════════════════════════════════════════════
+# DISCOVERY / RESUME
+# ═══════════════════════════════════════════════════════════════════
+def discover(src):
+    """All stills and videos under ``src`` as ``(path, relpath, kind)``, sorted."""
+    src = Path(src)
+    if src.is_file():
+        files = [src]
+        src = src.parent
+    else:
+        files = sorted(p for p in src.rglob("*") if p.is_file())
+    assets = []
+    for p in files:
+        ext = p.suffix.lower()
+        kind = "image" if ext in IMAGE_EXT else "video" if ext in VIDEO_EXT else None
+        if kind:
+            assets.append((p, p.relative_to(src).as_posix(), kind))
+    return assets
+
+
+def asset_stem(rel):
+    """Result file stem: the whole relative path (extension kept) plus a hash of it, so no two assets collide."""
+    return f"{rel.replace('/', '__')}-{hashlib.sha1(rel.encode()).hexdigest()[:8]}"
+
+
+def mission_id_for(rel, mode, fp=""):
+    """Stable per asset and fingerprint, so a changed file or setting is a new mission."""
+    return f"{MODE_PREFIX.get(mode, 'M')}-{hashlib.sha1((rel + fp).encode()).hexdigest()[:6].upper()}"
+
+
+# Settings that describe the run, not the result — measured latencies change on every re-profile
+FINGERPRINT_SKIP = {"model_info"}
+
+
+def fingerprint(path, settings):
+    st_ = os.stat(path)
+    s = {k: v for k, v in settings.items() if k not in FINGERPRINT_SKIP}
+    key = json.dumps([st_.st_size, st_.st_mtime_ns, s], sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def is_done(result_path, fp):
+    try:
+        with open(result_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("fingerprint") == fp
+    except (OSError, ValueError):
+        return False
+
+
+def _atomic_json(path, obj):
+    tmp = Path(str(path) + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=1, default=lambda o: o.item() if hasattr(o, "item") else str(o))
+    os.replace(tmp, path)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PER-ASSET PIPELINE (runs in worker processes)
+# ═══════════════════════════════════════════════════════════════════
+def _init_worker(threads=None, model=None):
+    set_threads(threads)
+    if model or engine.MODEL_PATH:
+        engine.load_yolo(str(model or engine.MODEL_PATH))
+
+
+def _enhance(bgr, s):
+    return full_enhance_bgr(bgr, s["clahe"], s["green"], s["turbidity"],
+                            s["correct_turbidity"], s["edge"], s["clahe_clip"])
+
+
+def _detect(img, s):
+    return engine.run_detection(img, s["conf"], s["iou"], s["mode"],
+                                model_path=s["model"], imgsz=engine.parse_imgsz(s["imgsz"]),
+                                roi=s["roi"])
+
+
+# Frames stay BGR arrays end to end; PIL copies are only made for annotation / PDF output
+def _inspect_image(path, s, tr):
+    with tr.span("decode"), large_images():        # local survey panoramas, not uploads
+        src = probe(path)
+        orig = load_bgr(path, s["max_side"])
+    with tr.span("enhance"):
+        enh = _enhance(orig, s)
+    with tr.span("detect"):
+        dets = _detect(enh, s)
+    return orig, enh, dets, {"width": src["width"], "height": src["height"],
+                             "work_width": orig.shape[1], "work_height": orig.shape[0]}
+
+
+def _inspect_video(path, s, tr):
+    cap = cv2.VideoCapture(str(path))
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    all_dets, best, first, fn, det_id = [], None, None, 0, 0
+    while True:
+        with tr.span("decode"):
+            ret, frame = cap.read()
+        if not ret:
+            break
+        if fn % s["sample_every"] == 0:
+            if first is None:
+                first = frame
+            with tr.span("enhance"):
+                ef = _enhance(frame, s)
+            with tr.span("detect"):
+                dets = _detect(ef, s)
+            for d in dets:
+                det_id += 1
+                d["id"] = det_id
+                d["frame"] = fn
+            all_dets.extend(dets)
+            if best is None or len(dets) > len(best[1]):
+                best = (ef, dets)
+        fn += 1
+    cap.release()
+    enh, best_dets = best if best else (first, [])
+    info = {"frames": total, "fps": fps, "sampled": (fn + s["sample_every"] - 1) // s["sample_every"],
+            "width": first.shape[1] if first is not None else 0,
+            "height": first.shape[0] if first is not None else 0}
+    return first, enh, all_dets, info, best_dets
+
+
+def process_asset(path, rel, kind, out_dir, settings, annotate=False, pdf=False):
+    """Inspect one asset and write its outputs. Returns the result record."""
+    t0 = time.perf_counter()
+    out_dir = Path(out_dir)
+    stem = asset_stem(rel)
+    s = settings
+    tr = Trace()
+    if kind == "image":
+        orig, enh, dets, info = _inspect_image(path, s, tr)
+        frame_dets = dets
+    else:
+        orig, enh, dets, info, frame_dets = _inspect_video(path, s, tr)
+
+    risk = compute_risk(dets)
+    grade = score_to_grade(risk)
+    fp = fingerprint(path, s)
+    mid = mission_id_for(rel, s["mode"], fp)
+    outputs = {}
+
+    with tr.span("export"):
+        try:
+            from export import write_detections_parquet
+            outputs["parquet"] = str(write_detections_parquet(
+                out_dir / "results" / f"{stem}.parquet", dets, mid, s["vessel"]))
+        except ImportError:
+            from export import write_detections_csv
+            outputs["csv"] = str(write_detections_csv(
+                out_dir / "results" / f"{stem}.csv", dets, mid, s["vessel"]))
+
+    if (annotate or pdf) and enh is not None:
+        orig, enh = cv_to_pil(orig), cv_to_pil(enh)
+        with tr.span("annotate"):
+            ann = annotate_image(enh, frame_dets)
+        if annotate:
+            p = out_dir / "annotated" / f"{stem}.jpg"
+            ann.save(p, quality=90)
+            outputs["annotated"] = str(p)
+        if pdf:
+            from pdf_report import build_pdf
+            with tr.span("heatmap"):
+                hmap = build_heatmap(enh, frame_dets)
+            p = out_dir / "reports" / f"{stem}.pdf"
+            with tr.span("pdf"), open(p, "wb") as f:
+                f.write(build_pdf(mid, s["vessel"], s["inspector"], s["mode"], dets,
+                                  orig, ann, hmap, risk, grade, s["conf"], s["iou"],
+                                  model_info=s.get("model_info")))
+            outputs["pdf"] = str(p)
+
+    record = {
+        "asset": rel,
+        "kind": kind,
+        "mission_id": mid,
+        "mode": s["mode"] if kind == "image" else f"video/{s['mode']}",
+        "vessel": s["vessel"],
+        "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "risk_score": risk,
+        "grade": grade,
+        "n_detections": len(dets),
+        "info": info,
+        "settings": s,
+        "fingerprint": fp,
+        "outputs": outputs,
+        "seconds": round(time.perf_counter() - t0, 3),
+        "timings": tr.as_dict(),
+        "detections": dets,
+    }
+    _atomic_json(out_dir / "results" / f"{stem}.json", record)
+    return record
+
+
+# ═══════════════════════════════════════════════════════════════════
+# DRIVER
+# ═══════════════════════════════════════════════════════════════════
+def run_batch(src, out_dir, workers=None, settings=None, annotate=False, pdf=False,
+              force=False, store=None, log=print, threads=None):
+    """
+    Inspect every still/video under ``src`` across ``workers`` processes.
+    Assets whose result JSON matches the current file + settings fingerprint are
+    skipped unless ``force``. When ``store`` (a ``MissionStore``) is given the
+    results are recorded as missions in batched inserts. ``workers`` /
+    ``threads`` default to the swept optimum (``worker_pool.tuned``).
+    """
+    s = dict(DEFAULT_SETTINGS, **(settings or {}))
+    out_dir = Path(out_dir)
+    for sub in ("results", "annotated", "reports"):
+        (out_dir / sub).mkdir(parents=True, exist_ok=True)
+
+    assets = discover(src)
+    todo = [a for a in assets if force or not is_done(
+        out_dir / "results" / f"{asset_stem(a[1])}.json", fingerprint(a[0], s))]
+    log(f"📂 {len(assets)} assets · {len(assets) - len(todo)} already done · {len(todo)} to process")
+
+    workers, threads = tuned(workers, threads)
+    done, failed, pending = [], {}, []
+    t0 = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads, s["model"]))
+    try:
+        futs = {pool.submit(process_asset, p, rel, kind, out_dir, s, annotate, pdf): rel
+                for p, rel, kind in todo}
+        for i, fut in enumerate(as_completed(futs), 1):
+            rel = futs[fut]
+            try:
+                rec = fut.result()
+                for stage, ms in rec["timings"].items():
+                    if stage != "total":
+                        observe(stage, ms / 1000)
+                done.append(rec)
+                pending.append(rec)
+                log(f"  [{i}/{len(todo)}] {rel} · {rec['n_detections']} det · "
+                    f"{rec['risk_score']}/100 {rec['grade']} · {rec['seconds']:.2f}s")
+            except Exception as e:
+                failed[rel] = str(e)
+                log(f"  [{i}/{len(todo)}] {rel} · FAILED: {e}")
+            if store is not None and len(pending) >= 50:
+                _record(store, pending, replace=force)
+    except KeyboardInterrupt:
+        log("⏸️  Interrupted — completed assets are saved; rerun to resume.")
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        if store is not None and pending:
+            _record(store, pending, replace=force)
+    wall = time.perf_counter() - t0
+
+    summary = {
+        "source": str(src),
+        "assets": len(assets),
+        "processed": len(done),
+        "skipped": len(assets) - len(todo),
+        "failed": failed,
+        "workers": workers,
+        "threads": threads,
+        "wall_s": round(wall, 3),
+        "assets_per_s": round(len(done) / wall, 3) if wall > 0 else None,
+        "settings": s,
+    }
+    _atomic_json(out_dir / "summary.json", summary)
+    write_metrics(out_dir / "metrics.prom", {"batch_assets_per_second": summary["assets_per_s"] or 0})
+    return summary
+
+
+def _record(store, records, replace=False):
+    store.add_missions([(
+        {"id": r["mission_id"], "vessel": r["vessel"], "date": r["date"],
+         "score": r["risk_score"], "grade": r["grade"], "detections": r["n_detections"],
+         "mode": r["mode"], "_src": f"batch_{r['asset']}_{r['fingerprint'][:8]}",
+         "timings": r.get("timings")},
+        r["detections"]) for r in records], replace=replace)
+    records.clear()
@@ -0,0 +1,188 @@
+"""
+NautiCAI — Pipeline Benchmark
+Times every inspection stage (enhance → detect → annotate → heatmap → PDF) over
+synthetic and fixture images at several resolutions and detection densities.
+Results are JSON (per-stage latency percentiles, throughput, peak RSS); a
+comparison mode flags regressions against a stored baseline.
+
+    python app/nauticai.py bench -o bench.json
+    python app/nauticai.py bench --images samples/ --compare bench_baseline.json
+"""
+
+import os, json, time, platform, datetime
+from pathlib import Path
+
+import numpy as np
+import cv2
+from PIL import Image
+
+import engine
+from engine import (DEFECT_CLASSES, SEVERITY_MAP, full_enhance, annotate_image,
+                    build_heatmap, compute_risk, score_to_grade)
+from telemetry import peak_rss_mb
+
+RESOLUTIONS = ((640, 480), (1280, 720), (1920, 1080), (3840, 2160))
+DENSITIES = (5, 50, 200)
+STAGES = ("enhance", "detect", "annotate", "heatmap", "pdf")
+TOLERANCE = 0.15
+
+
+# ═══════════════════════════════════════════════════════════════════
+# INPUTS
+# ═══════════════════════════════════════════════════════════════════
+def synthetic_image(w, h, seed=0):
+    """Deterministic murky-water frame: blurred colour noise, a pipe-like band and speckle."""
+    rng = np.random.default_rng(seed)
+    base = cv2.resize(rng.integers(20, 140, (h // 32 + 1, w // 32 + 1, 3), dtype=np.uint8),
+                      (w, h), interpolation=cv2.INTER_CUBIC)
+    base[..., 1] = np.clip(base[..., 1].astype(np.int16) + 40, 0, 255)
+    cv2.line(base, (0, h // 2), (w, h // 2 + h // 8), (90, 90, 80), max(4, h // 10))
+    speckle = rng.random((h, w)) > 0.997
+    base[speckle] = 230
+    return Image.fromarray(base)
+
+
+def synthetic_dets(w, h, n, seed=0):
+    rng = np.random.default_rng(seed)
+    dets = []
+    for i in range(n):
+        bw, bh = int(rng.integers(20, max(21, w // 6))), int(rng.integers(20, max(21, h // 6)))
+        x1, y1 = int(rng.integers(0, w - bw)), int(rng.integers(0, h - bh))
+        cls = DEFECT_CLASSES[int(rng.integers(len(DEFECT_CLASSES)))]
+        dets.append(dict(id=i + 1, cls=cls, severity=SEVERITY_MAP.get(cls, "Medium"),
+                         conf=float(rng.uniform(0.3, 0.95)), x1=x1, y1=y1, x2=x1 + bw, y2=y1 + bh,
+                         area=bw * bh))
+    return dets
+
+
+def inputs(images=None, resolutions=RESOLUTIONS):
+    """``(label, PIL image)`` pairs: one synthetic frame per resolution plus any fixtures."""
+    out = [(f"synthetic {w}x{h}", synthetic_image(w, h, i)) for i, (w, h) in enumerate(resolutions)]
+    if images:
+        from batch import discover
+        for p, rel, kind in discover(images):
+            if kind == "image":
+                out.append((rel, Image.open(p).convert("RGB")))
+    return out
+
+
+# ═══════════════════════════════════════════════════════════════════
+# TIMING
+# ═══════════════════════════════════════════════════════════════════
+def _time(fn, runs, warmup=1):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def _summary(times):
+    a = np.asarray(times)
+    return {
+        "runs": len(times),
+        "mean_ms": round(float(a.mean()), 2),
+        "p50_ms": round(float(np.percentile(a, 50)), 2),
+        "p90_ms": round(float(np.percentile(a, 90)), 2),
+        "p99_ms": round(float(np.percentile(a, 99)), 2),
+        "throughput_per_s": round(1000.0 / float(a.mean()), 2) if a.mean() > 0 else None,
+    }
+
+
+def bench_case(label, img, densities=DENSITIES, runs=10, pdf_runs=2, stages=STAGES,
+               conf_thr=0.25, iou_thr=0.45, mode="general"):
+    """Benchmark every stage on one image; returns one row per (stage, density)."""
+    w, h = img.size
+    rows = []
+
+    def row(stage, density, times):
+        rows.append({"case": label, "resolution": f"{w}x{h}", "stage": stage, "density": density,
+                     **_summary(times), "peak_rss_mb": peak_rss_mb()})
+
+    enh = full_enhance(img, True, True, 0.0, True, False)
+    if "enhance" in stages:
+        row("enhance", None, _time(lambda: full_enhance(img, True, True, 0.0, True, False), runs))
+    if "detect" in stages:
+        row("detect", None, _time(lambda: engine.run_detection(enh, conf_thr, iou_thr, mode), runs))
+    for n in densities:
+        dets = synthetic_dets(w, h, n, seed=n)
+        if "annotate" in stages:
+            row("annotate", n, _time(lambda: annotate_image(enh, dets), runs))
+        if "heatmap" in stages:
+            row("heatmap", n, _time(lambda: build_heatmap(enh, dets), runs))
+        if "pdf" in stages:
+            from pdf_report import build_pdf
+            ann, hmap = annotate_image(enh, dets), build_heatmap(enh, dets)
+            risk = compute_risk(dets)
+            row("pdf", n, _time(lambda: build_pdf("BENCH-0001", "Benchmark", "bench", mode, dets, img,
+                                                  ann, hmap, risk, score_to_grade(risk),
+                                                  conf_thr, iou_thr), pdf_runs))
+    return rows
+
+
+def run(images=None, resolutions=RESOLUTIONS, densities=DENSITIES, runs=10, pdf_runs=2,
+        stages=STAGES, log=print):
+    """Full benchmark -> ``{"meta": ..., "results": [...]}``."""
+    model = engine.MODEL_PATH
+    if model:
+        engine.load_yolo(str(model))
+    results = []
+    for label, img in inputs(images, resolutions):
+        t0 = time.perf_counter()
+        results += bench_case(label, img, densities, runs, pdf_runs, stages)
+        log(f"  {label:<28} {time.perf_counter() - t0:6.1f}s · peak RSS {peak_rss_mb()} MB")
+    return {
+        "meta": {
+            "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+            "host": platform.node(), "machine": platform.machine(),
+            "cpu_count": os.cpu_count(), "python": platform.python_version(),
+            "model": model.name if model else "synthetic",
+            "runs": runs, "pdf_runs": pdf_runs,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════
+# BASELINE COMPARISON
+# ═══════════════════════════════════════════════════════════════════
+def _key(r):
+    return (r["case"], r["stage"], r["density"])
+
+
+def compare(current, baseline, tolerance=TOLERANCE, metric="p50_ms"):
+    """
+    Match rows by (case, stage, density) and flag any whose ``metric`` grew by
+    more than ``tolerance``. Returns a list of ``{case, stage, density, base,
+    now, change, regression}`` rows.
+    """
+    base = {_key(r): r for r in baseline["results"]}
+    out = []
+    for r in current["results"]:
+        b = base.get(_key(r))
+        if not b or not b.get(metric):
+            continue
+        change = r[metric] / b[metric] - 1
+        out.append({"case": r["case"], "stage": r["stage"], "density": r["density"],
+                    "base": b[metric], "now": r[metric], "change": round(change, 3),
+                    "regression": change > tolerance})
+    return out
+
+
+def print_table(report, log=print):
+    log(f"\n{'case':<28} {'stage':<9} {'dets':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'/s':>8}")
+    for r in report["results"]:
+        log(f"{r['case']:<28} {r['stage']:<9} {r['density'] if r['density'] is not None else '—':>5} "
+            f"{r['p50_ms']:>9.2f} {r['p90_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['throughput_per_s'] or 0:>8.2f}")
+    log(f"\npeak RSS {report['peak_rss_mb']} MB · model {report['meta']['model']}")
+
+
+def write(report, path):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    return Path(path)
@@ -0,0 +1,359 @@
+"""
+NautiCAI — Inspection Engine
+Visibility enhancement, YOLO detection, annotation, heatmap and risk scoring
+with no UI dependency, shared by the Streamlit app and the headless CLI.
+"""
+import os, json, math, time, logging
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+import cv2, numpy as np
+from PIL import Image, ImageDraw, ImageEnhance
+import matplotlib
+matplotlib.use("Agg")
+from scipy.ndimage import gaussian_filter
+
+ROOT = Path(__file__).resolve().parent.parent
+MODEL_CANDIDATES = ["best.pt","best_n.pt","yolov8s.pt","yolov8n.pt"]   # best_n.pt: distilled YOLOv8n (scripts/distill.py)
+log = logging.getLogger("nauticai.engine")
+# Set to e.g. http://127.0.0.1:8765 to use a shared inference server instead of a local model
+INFERENCE_URL = os.environ.get("NAUTICAI_INFERENCE_URL","").rstrip("/")
+REMOTE_TIMEOUT = float(os.environ.get("NAUTICAI_INFERENCE_TIMEOUT","30"))
+
+def parse_imgsz(v):
+    """``"640"`` -> 640, ``"384x640"`` -> (384, 640) (height x width); falsy -> None."""
+    if not v: return None
+    if isinstance(v,(int,tuple)): return v
+    h,_,w=str(v).lower().partition("x");return (int(h),int(w)) if w else int(h)
+def fmt_imgsz(sz): return "" if sz is None else f"{sz}" if isinstance(sz,int) else f"{sz[0]}x{sz[1]}"
+# Warm-up passes run by load_yolo at every pinned input size, and optional per-mode inference
+# sizes, e.g. NAUTICAI_MODE_IMGSZ="pipeline=384x640,cable=384x640,hull=640"
+WARMUP_PASSES = int(os.environ.get("NAUTICAI_WARMUP","3"))
+DEFAULT_IMGSZ = 640
+MODE_IMGSZ = {k.strip():parse_imgsz(v) for k,_,v in (kv.partition("=") for kv in os.environ.get("NAUTICAI_MODE_IMGSZ","").split(",")) if v}
+# Post-processing defaults; scripts/sweep.py writes tuned values to data/detect_config.json
+DETECT_CONFIG_PATH = ROOT/"data"/"detect_config.json"
+DETECT_DEFAULTS = {"conf":0.25,"iou":0.45,"coverage":[0.005,0.50]}
+def load_detect_config(path=None):
+    """Tuned ``{conf, iou, coverage}`` from the sweep (missing keys / file -> hand-set defaults)."""
+    try: cfg=json.loads(Path(path or DETECT_CONFIG_PATH).read_text(encoding="utf-8"))
+    except (OSError,ValueError): cfg={}
+    out={k:cfg.get(k,v) for k,v in DETECT_DEFAULTS.items()}
+    out["coverage"]=list(out["coverage"] or (0.0,1.0))   # null = filter off
+    return out
+DETECT_CONFIG = load_detect_config()
+COVERAGE_MIN,COVERAGE_MAX = DETECT_CONFIG["coverage"]
+
+def _find_model():
+    for n in MODEL_CANDIDATES:
+        p = ROOT/n
+        if p.exists(): return p
+    return None
+
+def ensure_model():
+    """Download ``best.pt`` from Hugging Face when missing; returns the resolved model path."""
+    global MODEL_PATH
+    if not os.path.exists(ROOT / "best.pt"):
+        print("Downloading model from Hugging Face...")
+        from huggingface_hub import hf_hub_download
+        hf_hub_download(
+            repo_id="aishwarya252525/nauticai-yolov8",
+            filename="best.pt",
+            local_dir=str(ROOT),
+            local_dir_use_symlinks=False
+        )
+    MODEL_PATH = _find_model()
+    return MODEL_PATH
+MODEL_PATH = _find_model()
+
+DEFECT_CLASSES = [
+    "Corrosion","Crack","Marine Growth","Biofouling","Paint Damage","Pitting",
+    "Weld Defect","Anode Damage","Coating Failure","Dent","Deformation","Fracture",
+    "Spalling","Scaling","Disbondment","CP Failure","Leakage","Blockage","Foreign Object",
+    "Free Span","No Defect",
+]
+SEVERITY_MAP = {
+    "Corrosion":"Critical","Crack":"Critical","Fracture":"Critical","Leakage":"Critical",
+    "Marine Growth":"High","Biofouling":"High","Weld Defect":"High","Anode Damage":"High",
+    "CP Failure":"High","Pitting":"Medium","Paint Damage":"Medium","Coating Failure":"Medium",
+    "Deformation":"Medium","Blockage":"Medium","Dent":"Low","Scaling":"Low",
+    "Spalling":"Low","Disbondment":"Low","Foreign Object":"Low",
+    "Free Span":"Critical","No Defect":"Low",
+}
+CLASS_REMAP = {
+    "pipeline": "Corrosion",
+    "concrete": "Marine Growth",
+    "hull": "Paint Damage",
+    "propeller": "Biofouling",
+    "anode": "Anode Damage",
+    "leakage": "Leakage",
+    "anomaly": "Crack",
+    "biofouling": "Biofouling",
+    "bilge_keel": "Coating Failure",
+    "draft_mark": "Paint Damage",
+    "ropeguard": "Foreign Object",
+    "rudder": "Deformation",
+    "sea_chest": "Blockage",
+    "thruster_blades": "Weld Defect",
+    "thruster_grating": "Disbondment",
+    "flange": "Weld Defect",
+    "buoy": "Foreign Object",
+    "bend_restrictor": "Deformation",
+    "pipe_coupling": "Coating Failure",
+    "free_span": "Free Span",
+    "healthy": "No Defect",
+}
+SEV_COLORS = {"Critical":(220,50,50),"High":(255,165,0),"Medium":(0,180,255),"Low":(0,220,130)}
+PIPELINE_DEFECTS = ["Corrosion","Crack","Coating Failure","Pitting","Leakage","Weld Defect","Blockage"]
+CABLE_DEFECTS    = ["Fracture","Deformation","Foreign Object","Biofouling","Marine Growth","Dent"]
+
+# ══════════════════════════════════════════════════════════════════════════
+# HELPERS
+# ══════════════════════════════════════════════════════════════════════════
+def pil_to_cv(img): return cv2.cvtColor(np.array(img.convert("RGB")),cv2.COLOR_RGB2BGR)
+def cv_to_pil(arr): return Image.fromarray(cv2.cvtColor(arr,cv2.COLOR_BGR2RGB))
+def score_to_grade(s): return "A" if s>=76 else "B" if s>=51 else "C" if s>=26 else "D"
+def sev_weight(s): return {"Critical":25,"High":12,"Medium":6,"Low":2}.get(s,0)
+def compute_risk(dets): return max(0,min(100,100-sum(sev_weight(d["severity"]) for d in dets)))
+
+# ══════════════════════════════════════════════════════════════════════════
+# VISIBILITY PIPELINE
+# ══════════════════════════════════════════════════════════════════════════
+def apply_clahe(bgr,clip=3.0,grid=8):
+    lab=cv2.cvtColor(bgr,cv2.COLOR_BGR2LAB);l,a,b=cv2.split(lab)
+    l=cv2.createCLAHE(clipLimit=clip,tileGridSize=(grid,grid)).apply(l)
+    return cv2.cvtColor(cv2.merge([l,a,b]),cv2.COLOR_LAB2BGR)
+def apply_green_water(bgr,s=0.6):
+    o=bgr.astype(np.float32)
+    o[:,:,1]=np.clip(o[:,:,1]*(1+.4*s),0,255);o[:,:,0]=np.clip(o[:,:,0]*(1-.3*s),0,255);o[:,:,2]=np.clip(o[:,:,2]*(1+.15*s),0,255)
+    return o.astype(np.uint8)
+def apply_turbidity(bgr,level=0.4):
+    if level<.01: return bgr
+    bl=cv2.GaussianBlur(bgr,(0,0),sigmaX=level*12);sim=cv2.addWeighted(bgr,1-level*.7,bl,level*.7,0)
+    t=sim.astype(np.float32)
+    t[:,:,1]=np.clip(t[:,:,1]*(1+level*.35),0,255);t[:,:,0]=np.clip(t[:,:,0]*(1-level*.2),0,255);t[:,:,2]=np.clip(t[:,:,2]*(1-level*.3),0,255)
+    return np.clip(t*(1-level*.25),0,255).astype(np.uint8)
+def apply_turbidity_correction(bgr,level=0.4):
+    o=bgr.astype(np.float32)
+    o[:,:,0]=np.clip(o[:,:,0]/max(.01,1-level*.2),0,255);o[:,:,1]=np.clip(o[:,:,1]/max(.01,1+level*.35),0,255);o[:,:,2]=np.clip(o[:,:,2]/max(.01,1-level*.3),0,255)
+    return np.clip(o/max(.01,1-level*.25),0,255).astype(np.uint8)
+def apply_edge_estimator(bgr):
+    gray=cv2.cvtColor(bgr,cv2.COLOR_BGR2GRAY);edges=cv2.Canny(gray,50,150)
+    ec=cv2.cvtColor(edges,cv2.COLOR_GRAY2BGR);ec[:,:,0]=0;ec[:,:,2]=0;ec[:,:,1]=edges
+    return cv2.addWeighted(bgr,.75,ec,.8,0)
+def apply_marine_snow(pil_img, intensity=0.5):
+    img_array = np.array(pil_img)
+    num_particles = int(300 * intensity)
+    for _ in range(num_particles):
+        x = np.random.randint(0, img_array.shape[1])
+        y = np.random.randint(0, img_array.shape[0])
+        radius = np.random.randint(1, 4)
+        brightness = np.random.randint(150, 255)
+        cv2.circle(img_array, (x, y), radius,
+                  (brightness, brightness, brightness), -1)
+    return Image.fromarray(img_array)
+def full_enhance_bgr(bgr,use_clahe,use_green,turb_in,corr_turb,use_edge,clahe_clip=3.0):
+    """Visibility chain on a BGR frame (as decoded by OpenCV / ``ingest.load_bgr``) -> BGR frame."""
+    if turb_in>.01: bgr=apply_turbidity(bgr,turb_in)
+    if corr_turb and turb_in>.01: bgr=apply_turbidity_correction(bgr,turb_in*.85)
+    if use_green: bgr=apply_green_water(bgr)
+    if use_clahe: bgr=apply_clahe(bgr,clip=clahe_clip)
+    if use_edge:  bgr=apply_edge_estimator(bgr)
+    return bgr
+def full_enhance(pil_img,use_clahe,use_green,turb_in,corr_turb,use_edge,clahe_clip=3.0):
+    return cv_to_pil(full_enhance_bgr(pil_to_cv(pil_img),use_clahe,use_green,turb_in,corr_turb,use_edge,clahe_clip))
+
+# ══════════════════════════════════════════════════════════════════════════
+# DETECTION
+# ══════════════════════════════════════════════════════════════════════════
+WARMUP_STATS = {}   # model path -> load / warm-up timings
+_SCAN_MS = {}       # model path -> recent per-call inference latencies (ms)
+@lru_cache(maxsize=4)
+def load_yolo(path):
+    from ultralytics import YOLO
+    t0=time.perf_counter();model=YOLO(path);load_s=time.perf_counter()-t0
+    WARMUP_STATS[str(path)]=dict(load_s=round(load_s,3),**warm_up(model))
+    return model
+def warm_up(model,passes=None,sizes=None):
+    """
+    Run ``passes`` dummy predictions at every expected input size so layer fusing, allocator
+    growth and first-call paths happen at load time instead of on the first scan.
+    """
+    passes=WARMUP_PASSES if passes is None else passes
+    sizes=sizes or sorted({DEFAULT_IMGSZ,*MODE_IMGSZ.values()},key=str);times=[]
+    for sz in sizes:
+        h,w=(sz,sz) if isinstance(sz,int) else sz;blank=np.zeros((h,w,3),np.uint8)
+        for _ in range(max(passes,0)):
+            t0=time.perf_counter();model.predict(blank,imgsz=sz,verbose=False);times.append((time.perf_counter()-t0)*1000)
+    steady=sorted(times[1:])[len(times[1:])//2] if len(times)>1 else None
+    return dict(passes=passes,sizes=[fmt_imgsz(sz) for sz in sizes],
+                first_ms=round(times[0],1) if times else None,steady_ms=round(steady,1) if steady else None)
+def latency_report(model_path=None):
+    """Load/warm-up timings plus first-scan and recent median latency for a loaded model."""
+    key=str(model_path or MODEL_PATH);rep=dict(WARMUP_STATS.get(key,{}));scans=list(_SCAN_MS.get(key,()))
+    if scans: rep.update(scans=len(scans),first_scan_ms=round(scans[0],1),median_scan_ms=round(sorted(scans)[len(scans)//2],1))
+    return rep
+def _warn(e): log.warning("YOLO error: %s",e)
+def _img_size(img): return (img.width,img.height) if hasattr(img,'width') else (img.shape[1],img.shape[0])
+def _parse_result(results,names,img_w,img_h):
+    dets=[];det_id=0
+    for i,box in enumerate(results.boxes):
+        x1,y1,x2,y2=map(int,box.xyxy[0].tolist());conf=float(box.conf[0]);cls_i=int(box.cls[0])
+        # Skip boxes covering too much (background / whole-frame) or too little (noise) of the image
+        box_area=(x2-x1)*(y2-y1);img_area=img_w*img_h;coverage=box_area/img_area if img_area>0 else 0
+        if coverage>COVERAGE_MAX or coverage<COVERAGE_MIN:
+            continue
+        cls_name=names.get(cls_i,DEFECT_CLASSES[cls_i%len(DEFECT_CLASSES)])
+        cls=CLASS_REMAP.get(cls_name,CLASS_REMAP.get(cls_name.lower(),cls_name));sev=SEVERITY_MAP.get(cls,"Medium")
+        det_id+=1
+        dets.append(dict(id=det_id,cls=cls,severity=sev,conf=conf,x1=x1,y1=y1,x2=x2,y2=y2,area=box_area))
+    return dets
+def detect_batch(imgs,conf_thr,iou_thr,model_path=None,imgsz=None,sizes=None):
+    """
+    One ``model.predict`` over a list of images (PIL RGB or numpy BGR) -> one detection list per image.
+    ``sizes`` overrides the (w, h) the box-coverage filter uses (full frame when ``imgs`` are crops).
+    """
+    key=str(model_path or MODEL_PATH);model=load_yolo(key);imgs=list(imgs)
+    kw={"imgsz":imgsz} if imgsz else {}
+    t0=time.perf_counter();results=model.predict(imgs,conf=conf_thr,iou=iou_thr,verbose=False,**kw)
+    _SCAN_MS.setdefault(key,deque(maxlen=50)).append((time.perf_counter()-t0)*1000/max(len(imgs),1))
+    return [_parse_result(r,model.names,*sz) for r,sz in zip(results,sizes or map(_img_size,imgs))]
+def _detect_real(img,conf_thr,iou_thr,model_path=None,on_error=_warn,imgsz=None):
+    try:
+        return detect_batch([img],conf_thr,iou_thr,model_path,imgsz)[0]
+    except Exception as e:
+        on_error(e); return []
+# ── Region of interest (pipeline / cable): the asset is usually a narrow band of the frame ──
+ROI_MODES = {"pipeline","cable"}
+ROI_ENABLED = os.environ.get("NAUTICAI_ROI","1")!="0"
+ROI_PAD = 0.10       # padding around the detected band, as a fraction of its size
+ROI_MAX_FRAC = 0.80  # bands covering more of the frame than this aren't worth cropping
+def find_roi(img,work_w=320):
+    """
+    Bounding band ``(x1,y1,x2,y2)`` of the dominant straight edges (the pipeline / cable run),
+    padded by ``ROI_PAD``, or None when no clear band is found or it covers most of the frame.
+    Works on a ``work_w``-wide grey copy with the same Canny thresholds as ``apply_edge_estimator``.
+    """
+    pil=hasattr(img,'convert');arr=np.asarray(img.convert("RGB") if pil else img);H,W=arr.shape[:2];k=min(1.0,work_w/W)
+    g=cv2.cvtColor(cv2.resize(arr,(max(1,int(W*k)),max(1,int(H*k))),interpolation=cv2.INTER_AREA),
+                   cv2.COLOR_RGB2GRAY if pil else cv2.COLOR_BGR2GRAY)
+    edges=cv2.Canny(cv2.GaussianBlur(g,(5,5),0),50,150)
+    lines=cv2.HoughLinesP(edges,1,np.pi/180,threshold=40,minLineLength=max(g.shape)//4,maxLineGap=12)
+    if lines is None or len(lines)<2: return None
+    l=lines[:,0,:].astype(np.float32);ang=np.arctan2(l[:,3]-l[:,1],l[:,2]-l[:,0])%np.pi
+    length=np.hypot(l[:,2]-l[:,0],l[:,3]-l[:,1])
+    # Dominant orientation = length-weighted histogram peak; keep lines within ~15° of it
+    hist=np.bincount((ang/np.pi*12).astype(int)%12,weights=length,minlength=12);peak=(np.argmax(hist)+.5)*np.pi/12
+    d=np.abs(ang-peak);keep=np.minimum(d,np.pi-d)<np.radians(15)
+    if keep.sum()<2: return None
+    xs=np.concatenate([l[keep,0],l[keep,2]])/k;ys=np.concatenate([l[keep,1],l[keep,3]])/k
+    x1,x2,y1,y2=xs.min(),xs.max(),ys.min(),ys.max();px,py=(x2-x1)*ROI_PAD+16,(y2-y1)*ROI_PAD+16
+    x1,y1,x2,y2=int(max(0,x1-px)),int(max(0,y1-py)),int(min(W,x2+px)),int(min(H,y2+py))
+    if (x2-x1)*(y2-y1)>ROI_MAX_FRAC*W*H or x2-x1<32 or y2-y1<32: return None
+    return (x1,y1,x2,y2)
+def _detect_roi(img,box,conf_thr,iou_thr,model_path=None,on_error=_warn,imgsz=None):
+    """Detect on the ROI crop only and map boxes back to full-frame coordinates."""
+    x1,y1,x2,y2=box;crop=img.crop(box) if hasattr(img,'crop') else img[y1:y2,x1:x2]
+    try:
+        dets=detect_batch([crop],conf_thr,iou_thr,model_path,imgsz,sizes=[_img_size(img)])[0]
+    except Exception as e:
+        on_error(e); return []
+    for d in dets: d["x1"]+=x1;d["x2"]+=x1;d["y1"]+=y1;d["y2"]+=y1
+    return dets
+def _detect_remote(img,conf_thr,iou_thr,url,on_error=_warn,imgsz=None):
+    """Send the frame to a NautiCAI inference server (app/inference_server.py) as raw .npy."""
+    import io,json,urllib.request
+    # RGB on the wire; numpy frames are BGR (OpenCV order) like everywhere else in the engine
+    buf=io.BytesIO();np.save(buf,np.asarray(img.convert("RGB")) if hasattr(img,'convert') else np.ascontiguousarray(img[...,::-1]),allow_pickle=False)
+    req=urllib.request.Request(f"{url}/detect?conf={conf_thr}&iou={iou_thr}&imgsz={fmt_imgsz(imgsz)}",data=buf.getvalue(),
+        headers={"Content-Type":"application/x-npy"},method="POST")
+    try:
+        with urllib.request.urlopen(req,timeout=REMOTE_TIMEOUT) as r: return json.load(r)["detections"]
+    except Exception as e:
+        on_error(e); return []
+SYNTH_MIN_SIDE = 168   # smallest side the demo box ranges fit (40..w//4 wide, 30..h//5 tall)
+def _detect_synthetic(img,conf_thr,pool):
+    w,h=_img_size(img)
+    if w<SYNTH_MIN_SIDE or h<SYNTH_MIN_SIDE: return []   # e.g. thin mosaic edge tiles
+    rng=np.random.default_rng(sum(img.tobytes()[:64]));n=rng.integers(3,9);dets=[]
+    for i in range(n):
+        cx,cy=rng.integers(60,w-60),rng.integers(60,h-60);bw,bh=rng.integers(40,w//4),rng.integers(30,h//5)
+        conf=rng.uniform(conf_thr,.98);cls=rng.choice(pool);sev=SEVERITY_MAP.get(cls,"Medium")
+        x1,y1=max(0,cx-bw//2),max(0,cy-bh//2);x2,y2=min(w,cx+bw//2),min(h,cy+bh//2)
+        dets.append(dict(id=i+1,cls=cls,severity=sev,conf=float(conf),x1=x1,y1=y1,x2=x2,y2=y2,area=(x2-x1)*(y2-y1)))
+    return dets
+def run_detection(img,conf_thr,iou_thr,mode,model_path=None,on_error=_warn,imgsz=None,roi=None,info=None):
+    """Detections for ``img``; ``info`` (a dict), when given, receives ``roi`` = the band actually cropped to, or None."""
+    pool=(PIPELINE_DEFECTS if mode=="pipeline" else CABLE_DEFECTS if mode=="cable" else DEFECT_CLASSES)
+    imgsz=MODE_IMGSZ.get(mode) or imgsz
+    if INFERENCE_URL and not model_path:
+        dets=_detect_remote(img,conf_thr,iou_thr,INFERENCE_URL,on_error,imgsz)
+        if dets: return dets
+    elif model_path or MODEL_PATH:
+        box=find_roi(img) if (ROI_ENABLED if roi is None else roi) and mode in ROI_MODES else None
+        if info is not None: info["roi"]=box
+        dets=(_detect_roi(img,box,conf_thr,iou_thr,model_path,on_error,imgsz) if box
+              else _detect_real(img,conf_thr,iou_thr,model_path,on_error,imgsz))
+        if dets: return dets
+    return _detect_synthetic(img,conf_thr,pool)
+
+# ══════════════════════════════════════════════════════════════════════════
+# ANNOTATION + HEATMAP
+# ══════════════════════════════════════════════════════════════════════════
+def annotate_image(pil_img,dets):
+    # Convert to RGBA for transparency support
+    img = pil_img.copy().convert("RGBA")
+    overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+
+    SEVERITY_COLORS = {
+        "Critical": (255, 50, 50),
+        "High": (255, 165, 0),
+        "Medium": (30, 144, 255),
+        "Low": (50, 205, 50)
+    }
+
+    for det in dets:
+        x1 = int(det['x1'])
+        y1 = int(det['y1'])
+        x2 = int(det['x2'])
+        y2 = int(det['y2'])
+        sev = det.get('severity', 'Medium')
+        color = SEVERITY_COLORS.get(sev, (30, 144, 255))
+
+        # Transparent fill
+        draw.rectangle(
+            [x1, y1, x2, y2],
+            fill=(*color, 40),      # 40 = very transparent
+            outline=(*color, 255),  # solid border
+            width=3
+        )
+
+        # Label text
+        label = f"[{det['id']:02d}] {det['cls']} {det['conf']*100:.0f}%"
+        draw.rectangle([x1, y1-20, x1+len(label)*7, y1],
+                      fill=(*color, 200))
+        draw.text((x1+2, y1-18), label, fill=(255,255,255,255))
+
+    # Blend overlay onto original
+    result = Image.alpha_composite(img, overlay)
+    return result.convert("RGB")
+
+def build_heatmap(img,dets):
+    W,H=img.size;heat=np.zeros((H,W),dtype=np.float32)
+    # Place all weighted detection centres on the heat array first
+    for d in dets:
+        cx=min(W-1,max(0,(d["x1"]+d["x2"])//2));cy=min(H-1,max(0,(d["y1"]+d["y2"])//2))
+        heat[cy,cx]+=float(sev_weight(d["severity"]))
+    # Apply a single gaussian filter (fast even for thousands of detections)
+    if heat.max()>0:
+        avg_area=np.mean([d.get("area",3000) for d in dets]) if dets else 3000
+        sig=max(30,math.sqrt(avg_area)*.35)
+        heat=gaussian_filter(heat,sigma=sig)
+        heat=(heat/heat.max()*255).astype(np.uint8)
+    cmap=matplotlib.colormaps.get_cmap("plasma")
+    hmap=(cmap(heat/255.0)[:,:,:3]*255).astype(np.uint8)
+    dark=ImageEnhance.Brightness(img).enhance(.4)
+    return Image.blend(dark,Image.fromarray(hmap).resize((W,H)),alpha=.62)
+
+# PDF report builder is now in pdf_report.py (imported at top)
@@ -0,0 +1,152 @@
+"""
+NautiCAI — Columnar Detection & Mission Export
+Parquet (Arrow) and CSV writers that build tables column-wise and stream large
+exports in row-group / chunk sized pieces instead of one in-memory blob.
+"""
+
+import io, csv
+from pathlib import Path
+
+CHUNK_ROWS = 50_000
+DET_FIELDS = ("class", "severity", "confidence", "x1", "y1", "x2", "y2", "area_px", "frame")
+MISSION_FIELDS = ("id", "vessel", "date", "score", "grade", "detections", "mode")
+
+
+def _pa():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export needs pyarrow — pip install pyarrow") from e
+    return pa, pq
+
+
+# ═══════════════════════════════════════════════════════════════════
+# COLUMN BUILDERS
+# ═══════════════════════════════════════════════════════════════════
+def detection_columns(dets, mission_id="", vessel=""):
+    """Detection dicts -> ``{column: list}`` (one pass per field, no row dicts)."""
+    n = len(dets)
+    return {
+        "mission_id": [mission_id] * n,
+        "vessel":     [vessel or ""] * n,
+        "class":      [d["cls"] for d in dets],
+        "severity":   [d["severity"] for d in dets],
+        "confidence": [round(float(d["conf"]), 4) for d in dets],
+        "x1":         [int(d["x1"]) for d in dets],
+        "y1":         [int(d["y1"]) for d in dets],
+        "x2":         [int(d["x2"]) for d in dets],
+        "y2":         [int(d["y2"]) for d in dets],
+        "area_px":    [int(d.get("area", 0)) for d in dets],
+        "frame":      [d.get("frame", -1) for d in dets],
+    }
+
+
+def _slice(cols, start, stop):
+    return {k: v[start:stop] for k, v in cols.items()}
+
+
+def _detection_schema(pa):
+    return pa.schema([
+        ("mission_id", pa.dictionary(pa.int32(), pa.string())),
+        ("vessel",     pa.dictionary(pa.int32(), pa.string())),
+        ("class",      pa.dictionary(pa.int32(), pa.string())),
+        ("severity",   pa.dictionary(pa.int8(), pa.string())),
+        ("confidence", pa.float32()),
+        ("x1", pa.int32()), ("y1", pa.int32()), ("x2", pa.int32()), ("y2", pa.int32()),
+        ("area_px",    pa.int64()),
+        ("frame",      pa.int32()),
+    ])
+
+
+def _mission_schema(pa):
+    return pa.schema([
+        ("id", pa.string()),
+        ("vessel", pa.dictionary(pa.int32(), pa.string())),
+        ("date", pa.string()),
+        ("score", pa.int16()),
+        ("grade", pa.dictionary(pa.int8(), pa.string())),
+        ("detections", pa.int32()),
+        ("mode", pa.dictionary(pa.int8(), pa.string())),
+    ])
+
+
+def detections_table(dets, mission_id="", vessel=""):
+    """Arrow table of detections (categorical columns dictionary-encoded)."""
+    pa, _ = _pa()
+    return pa.Table.from_pydict(detection_columns(dets, mission_id, vessel),
+                                schema=_detection_schema(pa))
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PARQUET
+# ═══════════════════════════════════════════════════════════════════
+def write_detections_parquet(path, dets, mission_id="", vessel="", chunk_rows=CHUNK_ROWS):
+    """Write detections as Parquet, one row group per ``chunk_rows``. Returns path."""
+    pa, pq = _pa()
+    schema = _detection_schema(pa)
+    cols = detection_columns(dets, mission_id, vessel)
+    with pq.ParquetWriter(str(path), schema, compression="zstd") as w:
+        for start in range(0, max(len(dets), 1), chunk_rows):
+            w.write_table(pa.Table.from_pydict(_slice(cols, start, start + chunk_rows), schema=schema))
+    return Path(path)
+
+
+def write_missions_parquet(path, store, chunk_rows=CHUNK_ROWS, **filters):
+    """Page through a ``MissionStore`` and append each page as a row group."""
+    pa, pq = _pa()
+    schema = _mission_schema(pa)
+    with pq.ParquetWriter(str(path), schema, compression="zstd") as w:
+        page = 0
+        while True:
+            rows = store.page(page, chunk_rows, newest_first=False, **filters)
+            if not rows and page:
+                break
+            w.write_table(pa.Table.from_pydict(
+                {k: [r[k] for r in rows] for k in MISSION_FIELDS}, schema=schema))
+            if len(rows) < chunk_rows:
+                break
+            page += 1
+    return Path(path)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CSV
+# ═══════════════════════════════════════════════════════════════════
+CSV_COLUMNS = ("mission_id", "vessel", "class", "severity", "confidence",
+               "x1", "y1", "x2", "y2", "area_px")
+
+
+def iter_detections_csv(dets, mission_id="", vessel="", chunk_rows=CHUNK_ROWS):
+    """Yield the detection CSV as encoded byte chunks (header first)."""
+    cols = detection_columns(dets, mission_id, vessel)
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(CSV_COLUMNS)
+    for start in range(0, len(dets), chunk_rows):
+        part = _slice(cols, start, start + chunk_rows)
+        writer.writerows(zip(*(part[c] for c in CSV_COLUMNS)))
+        yield buf.getvalue().encode()
+        buf.seek(0); buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def write_detections_csv(path, dets, mission_id="", vessel="", chunk_rows=CHUNK_ROWS):
+    with open(path, "wb") as f:
+        for chunk in iter_detections_csv(dets, mission_id, vessel, chunk_rows):
+            f.write(chunk)
+    return Path(path)
+
+
+def export_detections(out_dir, dets, mission_id="", vessel="", formats=("csv", "parquet")):
+    """Write the requested formats to ``out_dir``; returns ``{format: path}``."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"NautiCAI_{mission_id or 'export'}"
+    out = {}
+    if "csv" in formats:
+        out["csv"] = write_detections_csv(out_dir / f"{stem}.csv", dets, mission_id, vessel)
+    if "parquet" in formats:
+        out["parquet"] = write_detections_parquet(out_dir / f"{stem}.parquet", dets, mission_id, vessel)
+    return out
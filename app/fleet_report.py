@@ -0,0 +1,393 @@
+"""
+NautiCAI — Batch Fleet Report Builder
+Renders per-mission PDFs in parallel and one consolidated fleet summary PDF.
+
+Run: python app/fleet_report.py <missions_dir | manifest.json> [-o reports/] [-j 8]
+
+Input layout — either a directory with one sub-folder per mission:
+
+    missions/
+      M-3F2A1C/
+        mission.json          # metadata + detections (see below)
+        original.jpg
+        annotated.jpg         # optional — falls back to original
+        heatmap.jpg           # optional — section omitted when absent
+
+or a manifest (.json list / .jsonl, one mission per line) with the same keys.
+Image paths are resolved relative to the file that declares them.
+
+    {"mission_id": "M-3F2A1C", "vessel": "MV Neptune Star", "inspector": "...",
+     "mode": "hull", "conf_thr": 0.25, "iou_thr": 0.45,
+     "risk_score": 63, "grade": "B",              # optional — derived if absent
+     "detections": [{"id": 1, "cls": "Corrosion", "severity": "Critical", ...}],
+     "images": {"original": "original.jpg", "annotated": "annotated.jpg",
+                "heatmap": "heatmap.jpg"}}
+"""
+
+import io, os, re, sys, json, time, datetime, argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.enums import TA_CENTER
+from reportlab.platypus import (
+    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
+)
+
+from pdf_report import (
+    build_pdf, _styles, _section, _section_line, _pil_to_rl, _header_footer,
+    _severity_chart_png, PAGE_W, MARGIN, NAVY, WHITE, PANEL, BORDER,
+    TEXT_DARK, TEXT_LIGHT, BRAND_CYAN, SEV, GRADE_COL,
+)
+import matplotlib.pyplot as plt  # Agg backend already selected by pdf_report
+from engine import compute_risk, score_to_grade
+
+IMAGE_KEYS = ("original", "annotated", "heatmap")
+
+
+# ═══════════════════════════════════════════════════════════════════
+# MISSION LOADING
+# ═══════════════════════════════════════════════════════════════════
+def _normalise(raw, base_dir, fallback_id=None):
+    """Fill defaults and resolve image paths against ``base_dir``."""
+    dets = raw.get("detections", [])
+    m = {
+        "mission_id": str(raw.get("mission_id") or raw.get("id") or fallback_id or base_dir.name),
+        "vessel":     raw.get("vessel") or "Unknown",
+        "inspector":  raw.get("inspector") or "NautiCAI AutoScan v1.0",
+        "mode":       raw.get("mode") or "general",
+        "date":       raw.get("date") or "",
+        "conf_thr":   float(raw.get("conf_thr", 0.25)),
+        "iou_thr":    float(raw.get("iou_thr", 0.45)),
+        "detections": dets,
+        "model_info": raw.get("model_info"),
+    }
+    m["risk_score"] = int(raw["risk_score"]) if "risk_score" in raw else compute_risk(dets)
+    m["grade"] = raw.get("grade") or score_to_grade(m["risk_score"])
+    images = raw.get("images", {})
+    for key in IMAGE_KEYS:
+        p = images.get(key)
+        if p is not None:
+            m[key] = str((base_dir / p).resolve())      # manifest paths are relative to it
+        else:
+            hits = sorted(base_dir.glob(f"{key}.*")) if base_dir.is_dir() else []
+            m[key] = str(hits[0].resolve()) if hits else None   # glob hits already include base_dir
+    return m
+
+
+def load_missions(source):
+    """Read missions from a directory of mission folders or a manifest file."""
+    source = Path(source)
+    missions = []
+    if source.is_dir():
+        for meta in sorted(source.glob("*/mission.json")):
+            with open(meta, "r", encoding="utf-8") as f:
+                missions.append(_normalise(json.load(f), meta.parent))
+    elif source.suffix == ".jsonl":
+        with open(source, "r", encoding="utf-8") as f:
+            lines = [line for line in f if line.strip()]
+        for i, line in enumerate(lines, 1):
+            missions.append(_normalise(json.loads(line), source.parent, f"{source.stem}-{i:03d}"))
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for i, raw in enumerate(data.get("missions", []) if isinstance(data, dict) else data, 1):
+            missions.append(_normalise(raw, source.parent, f"{source.stem}-{i:03d}"))
+    return missions
+
+
+def pdf_filename(m):
+    safe = re.sub(r"[^\w.-]+", "_", m["mission_id"]).strip("._") or "mission"
+    return f"NautiCAI_Report_{safe}_{datetime.datetime.now().strftime('%Y%m%d')}.pdf"
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PER-MISSION RENDERING (runs inside worker processes)
+# ═══════════════════════════════════════════════════════════════════
+def _open(path):
+    return Image.open(path).convert("RGB") if path else None
+
+
+def render_mission(m, out_dir):
+    """Build one mission PDF on disk. Returns (mission_id, path, seconds)."""
+    t0 = time.perf_counter()
+    orig = _open(m["original"])
+    annot = _open(m["annotated"]) or orig
+    hmap = _open(m["heatmap"])
+    pdf = build_pdf(
+        m["mission_id"], m["vessel"], m["inspector"], m["mode"],
+        m["detections"], orig, annot, hmap,
+        m["risk_score"], m["grade"], m["conf_thr"], m["iou_thr"],
+        model_info=m["model_info"],
+    )
+    path = Path(out_dir) / pdf_filename(m)
+    with open(path, "wb") as f:
+        f.write(pdf)
+    return m["mission_id"], str(path), time.perf_counter() - t0
+
+
+# ═══════════════════════════════════════════════════════════════════
+# FLEET SUMMARY PDF
+# ═══════════════════════════════════════════════════════════════════
+def _grade_chart_png(grade_counts):
+    fig, ax = plt.subplots(figsize=(6.5, 2.4), facecolor="white")
+    ax.set_facecolor("#FAFBFC")
+    labels = list(grade_counts.keys())
+    values = list(grade_counts.values())
+    bars = ax.bar(labels, values, width=0.5, edgecolor="#E2E8F0", linewidth=0.8,
+                  color=[GRADE_COL[g].hexval().replace("0x", "#") for g in labels])
+    ax.set_ylabel("Missions", fontsize=9, color="#475569")
+    ax.tick_params(colors="#475569", labelsize=9)
+    for spine in ax.spines.values():
+        spine.set_color("#E2E8F0")
+    ax.spines["top"].set_visible(False)
+    ax.spines["right"].set_visible(False)
+    for bar, val in zip(bars, values):
+        if val:
+            ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 0.08,
+                    str(val), ha="center", color="#1E293B", fontsize=11,
+                    fontweight="bold")
+    fig.tight_layout(pad=1.2)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=140, facecolor="white")
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def build_fleet_pdf(missions, campaign="Fleet Campaign", files=None):
+    """Consolidated summary across missions. Returns: bytes"""
+    files = files or {}
+    buf = io.BytesIO()
+    usable_w = PAGE_W - 2 * MARGIN
+    ts = datetime.datetime.now().strftime("%Y-%m-%d  %H:%M:%S")
+    models = sorted({(m.get("model_info") or {}).get("model") for m in missions} - {None})
+    meta = {"mission_id": f"FLEET ({len(missions)})", "vessel": campaign,
+            "model": ", ".join(models) or "YOLOv8s", "date": ts}
+    doc = SimpleDocTemplate(
+        buf, pagesize=A4,
+        leftMargin=MARGIN, rightMargin=MARGIN,
+        topMargin=24 * mm, bottomMargin=16 * mm,
+        title=f"NautiCAI Fleet Summary — {campaign}",
+        author="NautiCAI — Singapore Maritime AI Systems",
+    )
+    ST = _styles()
+    story = []
+
+    sev_totals = {"Critical": 0, "High": 0, "Medium": 0, "Low": 0}
+    grade_counts = {"A": 0, "B": 0, "C": 0, "D": 0}
+    for m in missions:
+        if m["grade"] in grade_counts:
+            grade_counts[m["grade"]] += 1
+        for d in m["detections"]:
+            sev = d.get("severity", "Medium")
+            if sev in sev_totals:
+                sev_totals[sev] += 1
+    n = len(missions)
+    avg = sum(m["risk_score"] for m in missions) // n if n else 0
+    n_dets = sum(sev_totals.values())
+
+    # ─── COVER ──────────────────────────────────────────────────────
+    cover = Table([
+        [Paragraph("NautiCAI", ParagraphStyle("fct", fontName="Helvetica-Bold",
+                   fontSize=32, leading=38, textColor=WHITE))],
+        [Paragraph("FLEET INSPECTION SUMMARY", ParagraphStyle(
+                   "fcs", fontName="Helvetica-Bold", fontSize=14, leading=18,
+                   textColor=BRAND_CYAN))],
+        [Paragraph(f"{campaign}&nbsp;&nbsp;|&nbsp;&nbsp;{n} missions&nbsp;&nbsp;|&nbsp;&nbsp;{ts}",
+                   ParagraphStyle("fcm", fontName="Helvetica", fontSize=9.5,
+                   leading=14, textColor=TEXT_LIGHT))],
+    ], colWidths=[usable_w])
+    cover.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, -1), NAVY),
+        ("TOPPADDING", (0, 0), (0, 0), 20),
+        ("BOTTOMPADDING", (0, -1), (-1, -1), 18),
+        ("LEFTPADDING", (0, 0), (-1, -1), 20),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 20),
+    ]))
+    story += [cover, Spacer(1, 12)]
+
+    # ─── FLEET METRICS ──────────────────────────────────────────────
+    story += _section("Fleet Overview", ST)
+
+    def _cell(label, value, col=TEXT_DARK):
+        return [
+            Paragraph(str(value), ParagraphStyle(
+                "fmv_" + label, fontName="Helvetica-Bold", fontSize=22, leading=26,
+                textColor=col, alignment=TA_CENTER)),
+            Paragraph(label.upper(), ParagraphStyle(
+                "fml_" + label, fontName="Helvetica-Bold", fontSize=7, leading=10,
+                textColor=TEXT_LIGHT, alignment=TA_CENTER)),
+        ]
+
+    metrics = Table([[
+        _cell("Missions", n),
+        _cell("Avg Risk", avg, BRAND_CYAN),
+        _cell("Detections", n_dets),
+        _cell("Critical", sev_totals["Critical"],
+              SEV["Critical"] if sev_totals["Critical"] else TEXT_DARK),
+        _cell("Grade D", grade_counts["D"],
+              GRADE_COL["D"] if grade_counts["D"] else TEXT_DARK),
+    ]], colWidths=[usable_w / 5] * 5)
+    metrics.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, -1), PANEL),
+        ("BOX",        (0, 0), (-1, -1), 0.5, BORDER),
+        ("INNERGRID",  (0, 0), (-1, -1), 0.3, BORDER),
+        ("VALIGN",     (0, 0), (-1, -1), "MIDDLE"),
+        ("TOPPADDING",    (0, 0), (-1, -1), 12),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 12),
+    ]))
+    story += [metrics, Spacer(1, 10)]
+
+    # ─── CHARTS (shared template assets, rendered once) ─────────────
+    story += _section("Grade Distribution", ST)
+    g_img = _pil_to_rl(Image.open(io.BytesIO(_grade_chart_png(grade_counts))),
+                       usable_w * 0.75, 55 * mm)
+    g_img.hAlign = "CENTER"
+    story += [g_img, Spacer(1, 6)]
+
+    story += _section("Fleet Severity Distribution", ST)
+    s_img = _pil_to_rl(Image.open(io.BytesIO(_severity_chart_png(tuple(sev_totals.values())))),
+                       usable_w * 0.75, 55 * mm)
+    s_img.hAlign = "CENTER"
+    story += [s_img, Spacer(1, 6)]
+
+    # ─── MISSION TABLE ──────────────────────────────────────────────
+    story += _section("Mission Register", ST)
+    hdr = ST["tbl_hdr"]
+    rows = [[Paragraph(h, hdr) for h in
+             ("Mission", "Vessel", "Mode", "Risk", "Grade", "Dets", "Crit.", "Report")]]
+    ordered = sorted(missions, key=lambda m: (m["risk_score"], m["mission_id"]))
+    for m in ordered:
+        crit = sum(1 for d in m["detections"] if d.get("severity") == "Critical")
+        rows.append([
+            Paragraph(m["mission_id"], ST["tbl_cell_bold"]),
+            Paragraph(m["vessel"], ST["tbl_cell"]),
+            Paragraph(m["mode"].upper(), ST["tbl_cell"]),
+            Paragraph(str(m["risk_score"]), ST["tbl_cell"]),
+            Paragraph(f"<font color='{GRADE_COL.get(m['grade'], TEXT_DARK).hexval()}'>"
+                      f"<b>{m['grade']}</b></font>", ST["tbl_cell"]),
+            Paragraph(str(len(m["detections"])), ST["tbl_cell"]),
+            Paragraph(str(crit), ST["tbl_cell"]),
+            Paragraph(Path(files.get(m["mission_id"], "")).name or "—", ST["body_sm"]),
+        ])
+    fixed = (26 + 32 + 20 + 12 + 13 + 12 + 12) * mm
+    tbl = Table(rows, repeatRows=1, colWidths=[26 * mm, 32 * mm, 20 * mm, 12 * mm,
+                                               13 * mm, 12 * mm, 12 * mm, usable_w - fixed])
+    tbl.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), NAVY),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [WHITE, PANEL]),
+        ("BOX",        (0, 0), (-1, -1), 0.5, BORDER),
+        ("INNERGRID",  (0, 0), (-1, -1), 0.25, BORDER),
+        ("VALIGN",     (0, 0), (-1, -1), "MIDDLE"),
+        ("LEFTPADDING",   (0, 0), (-1, -1), 5),
+        ("RIGHTPADDING",  (0, 0), (-1, -1), 5),
+        ("TOPPADDING",    (0, 0), (-1, -1), 4),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+    ]))
+    story += [tbl, Spacer(1, 16)]
+
+    story.append(_section_line())
+    story.append(Paragraph(
+        "All findings must be verified by a certified marine surveyor before "
+        "operational decisions are made. This report is generated by an AI system "
+        "and is advisory in nature.<br/>"
+        "<b>NautiCAI  |  Singapore Maritime AI Systems Pte. Ltd.  |  Est. 2024</b>",
+        ST["disclaimer"]))
+
+    doc.build(
+        story,
+        onFirstPage=lambda c, d: _header_footer(c, d, meta),
+        onLaterPages=lambda c, d: _header_footer(c, d, meta),
+    )
+    buf.seek(0)
+    return buf.getvalue()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# BATCH ENTRY POINT
+# ═══════════════════════════════════════════════════════════════════
+def build_fleet(source, out_dir="reports", workers=None, campaign="Fleet Campaign",
+                serial_baseline=False, log=print):
+    """
+    Render every mission PDF across ``workers`` processes, then the fleet summary.
+    Returns a dict with output paths and timing (wall, summed per-mission CPU
+    time and the resulting parallel speedup).
+    """
+    missions = load_missions(source) if not isinstance(source, list) else source
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    serial_wall = None
+    if serial_baseline:
+        t0 = time.perf_counter()
+        for m in missions:
+            render_mission(m, out_dir)
+        serial_wall = time.perf_counter() - t0
+
+    files, task_s, failed = {}, 0.0, {}
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futs = {pool.submit(render_mission, m, out_dir): m["mission_id"] for m in missions}
+        for i, fut in enumerate(as_completed(futs), 1):
+            mid = futs[fut]
+            try:
+                _, path, secs = fut.result()
+                files[mid] = path
+                task_s += secs
+                log(f"  [{i}/{len(missions)}] {mid} · {secs:.2f}s")
+            except Exception as e:
+                failed[mid] = str(e)
+                log(f"  [{i}/{len(missions)}] {mid} · FAILED: {e}")
+    wall = time.perf_counter() - t0
+
+    t1 = time.perf_counter()
+    ok = [m for m in missions if m["mission_id"] in files]
+    summary_path = out_dir / f"NautiCAI_Fleet_Summary_{datetime.datetime.now().strftime('%Y%m%d')}.pdf"
+    with open(summary_path, "wb") as f:
+        f.write(build_fleet_pdf(ok, campaign, files))
+    summary_s = time.perf_counter() - t1
+
+    baseline = serial_wall if serial_wall is not None else task_s
+    return {
+        "missions": len(missions),
+        "rendered": len(files),
+        "failed": failed,
+        "files": files,
+        "summary": str(summary_path),
+        "workers": workers,
+        "parallel_wall_s": round(wall, 3),
+        "serial_s": round(baseline, 3),
+        "serial_measured": serial_wall is not None,
+        "speedup": round(baseline / wall, 2) if wall > 0 else None,
+        "summary_s": round(summary_s, 3),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="NautiCAI batch fleet report builder")
+    ap.add_argument("source", help="missions directory or manifest (.json / .jsonl)")
+    ap.add_argument("-o", "--out", default="reports", help="output directory")
+    ap.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    ap.add_argument("--campaign", default="Fleet Campaign", help="campaign title for the summary")
+    ap.add_argument("--serial-baseline", action="store_true",
+                    help="also render serially first to measure true speedup")
+    args = ap.parse_args(argv)
+
+    print(f"📂 Loading missions from {args.source}…")
+    res = build_fleet(args.source, args.out, args.workers, args.campaign, args.serial_baseline)
+    print(f"\n✅ {res['rendered']}/{res['missions']} mission PDFs → {args.out}")
+    print(f"✅ Fleet summary → {res['summary']} ({res['summary_s']:.2f}s)")
+    label = "serial (measured)" if res["serial_measured"] else "serial (sum of tasks)"
+    print(f"⚡ {res['workers']} workers · parallel {res['parallel_wall_s']:.2f}s · "
+          f"{label} {res['serial_s']:.2f}s · speedup ×{res['speedup']}")
+    if res["failed"]:
+        print(f"⚠️  {len(res['failed'])} mission(s) failed: {', '.join(res['failed'])}")
+    return 1 if res["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
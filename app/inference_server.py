@@ -0,0 +1,223 @@
+"""
+NautiCAI — Local Inference Server
+Keeps one YOLO model warm and serves detections over HTTP. Concurrent requests
+are coalesced into micro-batches (one ``model.predict`` per batch) inside a
+short time window, so several dashboards / ROV consoles can share one model.
+
+    python app/nauticai.py serve --port 8765 --window-ms 10 --max-batch 16
+    NAUTICAI_INFERENCE_URL=http://127.0.0.1:8765 streamlit run app/streamlit_app.py
+
+Endpoints
+    POST /detect?conf=0.25&iou=0.45&imgsz=640
+        body: an image file, or a .npy HxWx3 RGB array (Content-Type: application/x-npy)
+    POST /detect_batch
+        body: {"images": [<base64 image>, ...], "conf": .., "iou": .., "imgsz": ..}
+    GET  /health
+        model path, batching counters and warm-up / latency figures
+    GET  /metrics
+        Prometheus text: stage histograms + batching gauges
+
+Responses carry the same detection dicts as ``engine._detect_real``.
+"""
+
+import io, json, time, queue, base64, logging, threading
+from concurrent.futures import Future
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+from PIL import Image
+
+import engine
+import telemetry
+
+log = logging.getLogger("nauticai.server")
+
+MAX_BODY = 64 * 1024 * 1024
+REQUEST_TIMEOUT = 60
+
+
+# ═══════════════════════════════════════════════════════════════════
+# MICRO-BATCHING
+# ═══════════════════════════════════════════════════════════════════
+class MicroBatcher:
+    """
+    Collects single-image requests on a queue. The first request opens a window
+    of ``window_ms``; everything that arrives before it closes (up to
+    ``max_batch``) runs in one ``engine.detect_batch`` call per (conf, iou, imgsz).
+    """
+
+    def __init__(self, model_path=None, window_ms=10, max_batch=16):
+        self.model_path = str(model_path or engine.MODEL_PATH)
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self.stats = {"requests": 0, "batches": 0, "largest_batch": 0, "infer_s": 0.0}
+        self._q = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name="nauticai-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, img, conf_thr, iou_thr, imgsz=None):
+        fut = Future()
+        self._q.put((img, round(float(conf_thr), 4), round(float(iou_thr), 4),
+                     engine.parse_imgsz(imgsz), fut))
+        return fut
+
+    def detect(self, img, conf_thr, iou_thr, imgsz=None, timeout=REQUEST_TIMEOUT):
+        return self.submit(img, conf_thr, iou_thr, imgsz).result(timeout)
+
+    def close(self):
+        self._q.put(None)
+        self._thread.join(timeout=5)
+
+    def _collect(self, first):
+        items, deadline = [first], time.monotonic() + self.window
+        while len(items) < self.max_batch:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                item = self._q.get(timeout=left)
+            except queue.Empty:
+                break
+            if item is None:
+                self._q.put(None)
+                break
+            items.append(item)
+        return items
+
+    def _run(self, group, conf_thr, iou_thr, imgsz):
+        t0 = time.perf_counter()
+        try:
+            results = engine.detect_batch([g[0] for g in group], conf_thr, iou_thr,
+                                          self.model_path, imgsz)
+        except Exception as e:
+            log.warning("batch of %d failed: %s", len(group), e)
+            for g in group:
+                g[4].set_exception(e)
+            return
+        telemetry.observe("detect_batch", time.perf_counter() - t0)
+        with self._lock:
+            self.stats["requests"] += len(group)
+            self.stats["batches"] += 1
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(group))
+            self.stats["infer_s"] += time.perf_counter() - t0
+        for g, dets in zip(group, results):
+            g[4].set_result(dets)
+
+    def _loop(self):
+        while True:
+            first = self._q.get()
+            if first is None:
+                return
+            groups = {}
+            for item in self._collect(first):
+                groups.setdefault(item[1:4], []).append(item)
+            for (conf_thr, iou_thr, imgsz), group in groups.items():
+                self._run(group, conf_thr, iou_thr, imgsz)
+
+    def snapshot(self):
+        with self._lock:
+            s = dict(self.stats)
+        s["mean_batch"] = round(s["requests"] / s["batches"], 2) if s["batches"] else 0.0
+        s["infer_s"] = round(s["infer_s"], 3)
+        return s
+
+
+# ═══════════════════════════════════════════════════════════════════
+# HTTP
+# ═══════════════════════════════════════════════════════════════════
+def decode_image(body, content_type=""):
+    """Request body -> RGB PIL image (.npy arrays are taken as-is, files are decoded)."""
+    if "npy" in content_type:
+        return Image.fromarray(np.load(io.BytesIO(body), allow_pickle=False).astype(np.uint8))
+    return Image.open(io.BytesIO(body)).convert("RGB")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "NautiCAI/1.0"
+
+    def log_message(self, fmt, *args):
+        log.debug("%s " + fmt, self.address_string(), *args)
+
+    def _reply(self, code, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        if n <= 0 or n > MAX_BODY:
+            raise ValueError(f"body must be 1 B – {MAX_BODY // 2**20} MB")
+        return self.rfile.read(n)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/metrics":
+            snap = self.server.batcher.snapshot()
+            body = telemetry.prometheus_text({
+                "server_requests": (snap["requests"], "Images detected by the server."),
+                "server_batches": (snap["batches"], "Micro-batches run."),
+                "server_mean_batch": (snap["mean_batch"], "Mean images per micro-batch."),
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            return self.wfile.write(body)
+        if path != "/health":
+            return self._reply(404, {"error": "not found"})
+        self._reply(200, {"status": "ok", "model": self.server.batcher.model_path,
+                          "window_ms": self.server.batcher.window * 1000,
+                          "max_batch": self.server.batcher.max_batch,
+                          **self.server.batcher.snapshot(),
+                          "latency": engine.latency_report(self.server.batcher.model_path)})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        batcher = self.server.batcher
+        try:
+            if url.path == "/detect":
+                img = decode_image(self._body(), self.headers.get("Content-Type", ""))
+                dets = batcher.detect(img, float(q.get("conf", 0.25)), float(q.get("iou", 0.45)),
+                                      q.get("imgsz"))
+                return self._reply(200, {"detections": dets})
+            if url.path == "/detect_batch":
+                req = json.loads(self._body())
+                conf_thr, iou_thr = float(req.get("conf", 0.25)), float(req.get("iou", 0.45))
+                futs = [batcher.submit(decode_image(base64.b64decode(b)), conf_thr, iou_thr,
+                                       req.get("imgsz"))
+                        for b in req["images"]]
+                return self._reply(200, {"results": [f.result(REQUEST_TIMEOUT) for f in futs]})
+            return self._reply(404, {"error": "not found"})
+        except (ValueError, KeyError, OSError) as e:
+            return self._reply(400, {"error": str(e)})
+        except Exception as e:
+            return self._reply(500, {"error": str(e)})
+
+
+def serve(host="127.0.0.1", port=8765, model_path=None, window_ms=10, max_batch=16):
+    """Load the model, then serve until interrupted."""
+    model_path = model_path or engine.MODEL_PATH
+    if not model_path:
+        raise SystemExit("No model weights found — place best.pt in the repo root or pass --download")
+    engine.load_yolo(str(model_path))
+    warm = engine.latency_report(model_path)
+    httpd = ThreadingHTTPServer((host, port), _Handler)
+    httpd.daemon_threads = True
+    httpd.batcher = MicroBatcher(model_path, window_ms, max_batch)
+    print(f"🛰️  NautiCAI inference server · {model_path} · http://{host}:{port} "
+          f"(window {window_ms} ms, max batch {max_batch})")
+    print(f"   warm-up {warm.get('passes')}× at {', '.join(warm.get('sizes', []))}: "
+          f"first {warm.get('first_ms')} ms → steady {warm.get('steady_ms')} ms")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        httpd.batcher.close()
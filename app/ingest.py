@@ -0,0 +1,106 @@
+"""
+NautiCAI — Image Ingestion
+Reads the header first and decodes straight to the working resolution, so a
+200 MB panorama never exists in memory at full size when it isn't needed.
+JPEGs use DCT-domain scaling (``cv2.IMREAD_REDUCED_COLOR_*`` / PIL ``draft``),
+which decodes at 1/2, 1/4 or 1/8 size directly; other formats are decoded then
+area-resized.
+
+``load_bgr`` returns the single BGR buffer the pipeline works on
+(``engine.full_enhance_bgr`` and YOLO read it as-is); ``load_rgb`` is the PIL
+equivalent for UI code that needs a PIL image.
+"""
+
+import io, os, contextlib
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+# Longest side the pipeline works at (detection itself runs at 640 px)
+MAX_SIDE = int(os.environ.get("NAUTICAI_MAX_SIDE", "4096"))
+# Pixel limit for trusted local panoramas / mosaics (OpenCV's own decode limit, 2^30 px).
+# Uploads keep Pillow's decompression-bomb guard; see ``large_images``.
+MAX_PIXELS = int(os.environ.get("NAUTICAI_MAX_PIXELS", str(1 << 30)))
+
+_REDUCED = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+            4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+
+@contextlib.contextmanager
+def large_images(max_pixels=MAX_PIXELS):
+    """Raise Pillow's decompression-bomb limit for the block (local survey files only)."""
+    old = Image.MAX_IMAGE_PIXELS
+    Image.MAX_IMAGE_PIXELS = max(old or 0, max_pixels)
+    try:
+        yield
+    finally:
+        Image.MAX_IMAGE_PIXELS = old
+
+
+def _bytes(src):
+    """Raw bytes of an uploaded file / file-like object (position restored)."""
+    if hasattr(src, "getvalue"):
+        return src.getvalue()
+    pos = src.tell()
+    data = src.read()
+    src.seek(pos)
+    return data
+
+
+def probe(src):
+    """``{width, height, format}`` from the file header only (no pixel decode)."""
+    f = src if isinstance(src, (str, Path)) else io.BytesIO(_bytes(src))
+    with Image.open(f) as im:
+        return {"width": im.width, "height": im.height, "format": im.format}
+
+
+def reduction(width, height, max_side=MAX_SIDE):
+    """Largest DCT scale factor (1/2/4/8) that still decodes to at least ``max_side``."""
+    f = 1
+    while f < 8 and max(width, height) / (f * 2) >= max_side:
+        f *= 2
+    return f
+
+
+def _fit(bgr, max_side):
+    h, w = bgr.shape[:2]
+    k = max_side / max(w, h)
+    if k >= 1:
+        return bgr
+    return cv2.resize(bgr, (max(1, round(w * k)), max(1, round(h * k))), interpolation=cv2.INTER_AREA)
+
+
+def load_bgr(src, max_side=MAX_SIDE):
+    """
+    Decode ``src`` (path or uploaded file) to a BGR array whose longest side
+    is at most ``max_side`` (None = full resolution).
+    """
+    info = probe(src)
+    f = reduction(info["width"], info["height"], max_side) if max_side else 1
+    flag = _REDUCED[f] if info["format"] == "JPEG" else cv2.IMREAD_COLOR
+    if isinstance(src, (str, Path)):
+        bgr = cv2.imread(str(src), flag)
+    else:
+        bgr = cv2.imdecode(np.frombuffer(_bytes(src), np.uint8), flag)
+    if bgr is None:
+        raise ValueError(f"could not decode image ({info['format']} {info['width']}×{info['height']})")
+    return _fit(bgr, max_side) if max_side else bgr
+
+
+def load_rgb(src, max_side=MAX_SIDE):
+    """
+    PIL RGB image at the working resolution (JPEG draft-mode decoding), EXIF
+    orientation applied as ``load_bgr`` (OpenCV) does.
+    """
+    f = src if isinstance(src, (str, Path)) else io.BytesIO(_bytes(src))
+    im = Image.open(f)
+    if max_side and max(im.size) > max_side:
+        if im.format == "JPEG":
+            k = reduction(im.width, im.height, max_side)
+            im.draft("RGB", (im.width // k, im.height // k))
+        im = ImageOps.exif_transpose(im).convert("RGB")
+        im.thumbnail((max_side, max_side), Image.LANCZOS)
+        return im
+    return ImageOps.exif_transpose(im).convert("RGB")
@@ -0,0 +1,332 @@
+"""
+NautiCAI — Persistent Mission History Store
+SQLite (WAL) repository for missions and per-finding detection rows.
+"""
+
+import os, json, sqlite3, threading, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DB_PATH = Path(os.environ.get("NAUTICAI_DB", ROOT / "data" / "missions.db"))
+
+ROLLING_N = 20          # missions in the rolling-mean window
+TREND_POINTS = 400      # trend buckets kept before pairwise compaction
+DET_COLS = ("det_id", "cls", "severity", "conf", "x1", "y1", "x2", "y2", "area", "frame")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS missions (
+    pk          INTEGER PRIMARY KEY,
+    id          TEXT NOT NULL UNIQUE,
+    vessel      TEXT NOT NULL DEFAULT 'Unknown',
+    date        TEXT NOT NULL,
+    score       INTEGER NOT NULL,
+    grade       TEXT NOT NULL,
+    detections  INTEGER NOT NULL DEFAULT 0,
+    mode        TEXT NOT NULL DEFAULT 'general',
+    src         TEXT UNIQUE,
+    created     REAL NOT NULL,
+    timings     TEXT            -- JSON {stage: ms} from telemetry.Trace
+);
+CREATE INDEX IF NOT EXISTS ix_missions_vessel ON missions(vessel);
+CREATE INDEX IF NOT EXISTS ix_missions_date   ON missions(date);
+CREATE INDEX IF NOT EXISTS ix_missions_grade  ON missions(grade);
+
+CREATE TABLE IF NOT EXISTS detections (
+    pk          INTEGER PRIMARY KEY,
+    mission_id  TEXT NOT NULL REFERENCES missions(id) ON DELETE CASCADE,
+    det_id      INTEGER,
+    cls         TEXT NOT NULL,
+    severity    TEXT NOT NULL,
+    conf        REAL NOT NULL,
+    x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER,
+    area        INTEGER,
+    frame       INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_detections_mission  ON detections(mission_id);
+CREATE INDEX IF NOT EXISTS ix_detections_severity ON detections(severity);
+
+-- Incrementally maintained aggregates (updated in the insert transaction)
+CREATE TABLE IF NOT EXISTS fleet_stats (
+    id          INTEGER PRIMARY KEY CHECK (id = 1),
+    missions    INTEGER NOT NULL,
+    score_sum   INTEGER NOT NULL,
+    detections  INTEGER NOT NULL,
+    critical    INTEGER NOT NULL,
+    window_sum  INTEGER NOT NULL,
+    window_n    INTEGER NOT NULL,
+    bucket_size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS group_stats (
+    kind        TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    missions    INTEGER NOT NULL,
+    score_sum   INTEGER NOT NULL,
+    detections  INTEGER NOT NULL,
+    critical    INTEGER NOT NULL,
+    last_score  INTEGER,
+    last_date   TEXT,
+    PRIMARY KEY (kind, key)
+);
+CREATE TABLE IF NOT EXISTS trend_buckets (
+    idx         INTEGER PRIMARY KEY,
+    n           INTEGER NOT NULL,
+    score_sum   INTEGER NOT NULL,
+    score_min   INTEGER NOT NULL,
+    score_max   INTEGER NOT NULL
+);
+"""
+
+
+class MissionStore:
+    """
+    Thread-safe mission repository. One connection per store, guarded by a lock
+    so it can be shared across Streamlit script runs via ``st.cache_resource``.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(str(path), check_same_thread=False)
+        self._con.row_factory = sqlite3.Row
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute("PRAGMA foreign_keys=ON")
+        self._con.executescript(SCHEMA)
+        if "timings" not in {r[1] for r in self._con.execute("PRAGMA table_info(missions)")}:
+            self._con.execute("ALTER TABLE missions ADD COLUMN timings TEXT")
+        if self._con.execute("SELECT 1 FROM fleet_stats").fetchone() is None:
+            self.rebuild_aggregates()
+
+    def close(self):
+        with self._lock:
+            self._con.close()
+
+    # ── Writes ───────────────────────────────────────────────────────
+    @staticmethod
+    def _mission_row(m):
+        return (
+            m["id"], m.get("vessel") or "Unknown", m["date"], int(m["score"]),
+            m["grade"], int(m.get("detections", 0)), m.get("mode", "general"),
+            m.get("_src") or m.get("src"), time.time(),
+            json.dumps(m["timings"]) if m.get("timings") else None,
+        )
+
+    @staticmethod
+    def _det_rows(mission_id, dets):
+        # int()/str() casts: synthetic detections carry numpy scalars sqlite can't bind
+        i = lambda v: None if v is None else int(v)
+        return [
+            (mission_id, i(d.get("id")), str(d["cls"]), d["severity"], float(d["conf"]),
+             i(d.get("x1")), i(d.get("y1")), i(d.get("x2")), i(d.get("y2")),
+             i(d.get("area")), i(d.get("frame")))
+            for d in dets
+        ]
+
+    def add_mission(self, mission, dets=None):
+        """Insert one mission (+ findings). Returns False if its id/src already exists."""
+        return self.add_missions([(mission, dets or [])]) == 1
+
+    def add_missions(self, batch, replace=False):
+        """
+        Batched insert of ``[(mission_dict, detections), ...]`` in a single
+        transaction. Missions whose ``id`` or ``_src`` already exist are skipped
+        together with their findings, or with ``replace`` overwritten (forced
+        re-runs). Returns the number of missions inserted.
+        """
+        inserted = replaced = 0
+        with self._lock, self._con:
+            for m, dets in batch:
+                if replace:
+                    replaced += self._con.execute(
+                        "DELETE FROM missions WHERE id=? OR src=?",
+                        (m["id"], m.get("_src") or m.get("src"))).rowcount
+                cur = self._con.execute(
+                    "INSERT OR IGNORE INTO missions "
+                    "(id, vessel, date, score, grade, detections, mode, src, created, timings) "
+                    "VALUES (?,?,?,?,?,?,?,?,?,?)", self._mission_row(m))
+                if cur.rowcount != 1:
+                    continue
+                inserted += 1
+                self._bump(m)
+                if dets:
+                    self._con.executemany(
+                        "INSERT INTO detections "
+                        "(mission_id, det_id, cls, severity, conf, x1, y1, x2, y2, area, frame) "
+                        "VALUES (?,?,?,?,?,?,?,?,?,?,?)", self._det_rows(m["id"], dets))
+        if replaced:
+            self.rebuild_aggregates()       # incremental bumps don't subtract the old rows
+        return inserted
+
+    def delete_mission(self, mission_id):
+        with self._lock, self._con:
+            self._con.execute("DELETE FROM missions WHERE id=?", (mission_id,))
+        self.rebuild_aggregates()
+
+    # ── Aggregates ───────────────────────────────────────────────────
+    def _bump(self, m):
+        """O(1) aggregate update for one freshly inserted mission (lock held)."""
+        c = self._con
+        score, dets = int(m["score"]), int(m.get("detections", 0))
+        crit = int(m["grade"] == "D")
+        n, window_n, bucket = c.execute(
+            "SELECT missions, window_n, bucket_size FROM fleet_stats").fetchone()
+        leaving = 0
+        if window_n >= ROLLING_N:
+            # score that just dropped out of the window (pk index, newest row is m)
+            leaving = c.execute("SELECT score FROM missions ORDER BY pk DESC LIMIT 1 OFFSET ?",
+                                (ROLLING_N,)).fetchone()[0]
+        c.execute(
+            "UPDATE fleet_stats SET missions=missions+1, score_sum=score_sum+?, "
+            "detections=detections+?, critical=critical+?, window_sum=window_sum+?, "
+            "window_n=MIN(window_n+1, ?)",
+            (score, dets, crit, score - leaving, ROLLING_N))
+        for kind, key in (("vessel", m.get("vessel") or "Unknown"), ("mode", m.get("mode", "general"))):
+            c.execute(
+                "INSERT INTO group_stats VALUES (?,?,1,?,?,?,?,?) "
+                "ON CONFLICT(kind, key) DO UPDATE SET missions=missions+1, "
+                "score_sum=score_sum+excluded.score_sum, detections=detections+excluded.detections, "
+                "critical=critical+excluded.critical, last_score=excluded.last_score, "
+                "last_date=excluded.last_date",
+                (kind, key, score, dets, crit, score, m["date"]))
+        idx = n // bucket
+        c.execute(
+            "INSERT INTO trend_buckets VALUES (?,1,?,?,?) "
+            "ON CONFLICT(idx) DO UPDATE SET n=n+1, score_sum=score_sum+excluded.score_sum, "
+            "score_min=MIN(score_min, excluded.score_min), score_max=MAX(score_max, excluded.score_max)",
+            (idx, score, score, score))
+        if idx + 1 > 2 * TREND_POINTS:
+            self._compact_trend()
+
+    def _compact_trend(self):
+        """Halve the trend resolution by merging bucket pairs (amortised O(1) per insert)."""
+        c = self._con
+        rows = c.execute(
+            "SELECT idx/2, SUM(n), SUM(score_sum), MIN(score_min), MAX(score_max) "
+            "FROM trend_buckets GROUP BY idx/2").fetchall()
+        c.execute("DELETE FROM trend_buckets")
+        c.executemany("INSERT INTO trend_buckets VALUES (?,?,?,?,?)", rows)
+        c.execute("UPDATE fleet_stats SET bucket_size=bucket_size*2")
+
+    def rebuild_aggregates(self):
+        """Recompute every aggregate from the missions table (schema upgrade / deletes)."""
+        with self._lock, self._con:
+            c = self._con
+            c.execute("DELETE FROM fleet_stats")
+            c.execute("DELETE FROM group_stats")
+            c.execute("DELETE FROM trend_buckets")
+            n, ssum, dets, crit = c.execute(
+                "SELECT COUNT(*), COALESCE(SUM(score),0), COALESCE(SUM(detections),0), "
+                "COALESCE(SUM(grade='D'),0) FROM missions").fetchone()
+            wn, wsum = c.execute(
+                "SELECT COUNT(*), COALESCE(SUM(score),0) FROM "
+                "(SELECT score FROM missions ORDER BY pk DESC LIMIT ?)", (ROLLING_N,)).fetchone()
+            bucket = 1
+            while n > bucket * 2 * TREND_POINTS:
+                bucket *= 2
+            c.execute("INSERT INTO fleet_stats VALUES (1,?,?,?,?,?,?,?)",
+                      (n, ssum, dets, crit, wsum, wn, bucket))
+            for kind in ("vessel", "mode"):
+                c.execute(
+                    f"INSERT INTO group_stats SELECT '{kind}', {kind}, COUNT(*), SUM(score), "
+                    "SUM(detections), SUM(grade='D'), NULL, NULL "
+                    f"FROM missions GROUP BY {kind}")
+                c.execute(
+                    "UPDATE group_stats SET (last_score, last_date)=(SELECT score, date FROM missions "
+                    f"WHERE missions.{kind}=group_stats.key ORDER BY pk DESC LIMIT 1) WHERE kind=?",
+                    (kind,))
+            c.execute(
+                "INSERT INTO trend_buckets SELECT (rn-1)/?, COUNT(*), SUM(score), MIN(score), "
+                "MAX(score) FROM (SELECT score, ROW_NUMBER() OVER (ORDER BY pk) AS rn "
+                "FROM missions) GROUP BY (rn-1)/?", (bucket, bucket))
+
+    # ── Reads ────────────────────────────────────────────────────────
+    def has_source(self, src):
+        with self._lock:
+            return self._con.execute(
+                "SELECT 1 FROM missions WHERE src=? LIMIT 1", (src,)).fetchone() is not None
+
+    @staticmethod
+    def _where(vessel=None, grade=None, mode=None, date_from=None, date_to=None):
+        clauses, args = [], []
+        if vessel:
+            clauses.append("vessel=?"); args.append(vessel)
+        if grade:
+            grades = [grade] if isinstance(grade, str) else list(grade)
+            clauses.append(f"grade IN ({','.join('?' * len(grades))})"); args += grades
+        if mode:
+            clauses.append("mode=?"); args.append(mode)
+        if date_from:
+            clauses.append("date>=?"); args.append(date_from)
+        if date_to:
+            clauses.append("date<=?"); args.append(date_to)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def count(self, **filters):
+        where, args = self._where(**filters)
+        with self._lock:
+            return self._con.execute(f"SELECT COUNT(*) FROM missions{where}", args).fetchone()[0]
+
+    def page(self, page=0, page_size=50, newest_first=True, **filters):
+        """One page of missions as dicts, ordered by scan date (served by the date index)."""
+        where, args = self._where(**filters)
+        order = "DESC" if newest_first else "ASC"
+        sql = (f"SELECT id, vessel, date, score, grade, detections, mode FROM missions{where} "
+               f"ORDER BY date {order}, pk {order} LIMIT ? OFFSET ?")
+        with self._lock:
+            rows = self._con.execute(sql, args + [int(page_size), int(page) * int(page_size)]).fetchall()
+        return [dict(r) for r in rows]
+
+    def timings(self, limit=50):
+        """Stage timings of the latest ``limit`` timed missions, newest first."""
+        with self._lock:
+            rows = self._con.execute(
+                "SELECT id, mode, timings FROM missions WHERE timings IS NOT NULL "
+                "ORDER BY pk DESC LIMIT ?", (int(limit),)).fetchall()
+        return [dict(id=r[0], mode=r[1], **json.loads(r[2])) for r in rows]
+
+    def vessels(self):
+        with self._lock:
+            return [r[0] for r in self._con.execute(
+                "SELECT DISTINCT vessel FROM missions ORDER BY vessel")]
+
+    def trend(self):
+        """
+        Downsampled risk-score series: one ``(first_index, mean, min, max)`` per
+        bucket, at most ``2 * TREND_POINTS`` points however many missions exist.
+        """
+        with self._lock:
+            bucket = self._con.execute("SELECT bucket_size FROM fleet_stats").fetchone()[0]
+            rows = self._con.execute(
+                "SELECT idx, n, score_sum, score_min, score_max FROM trend_buckets ORDER BY idx").fetchall()
+        return [(idx * bucket, ssum / n, lo, hi) for idx, n, ssum, lo, hi in rows]
+
+    def detections(self, mission_id, severity=None):
+        sql = f"SELECT {', '.join(DET_COLS)} FROM detections WHERE mission_id=?"
+        args = [mission_id]
+        if severity:
+            sql += " AND severity=?"; args.append(severity)
+        with self._lock:
+            rows = self._con.execute(sql + " ORDER BY pk", args).fetchall()
+        return [dict(r) for r in rows]
+
+    def summary(self):
+        """Fleet-level totals for the dashboard metric row (single-row read)."""
+        with self._lock:
+            n, ssum, dets, crit, wsum, wn = self._con.execute(
+                "SELECT missions, score_sum, detections, critical, window_sum, window_n "
+                "FROM fleet_stats").fetchone()
+        return {"missions": n, "avg_score": ssum // n if n else 0, "detections": dets,
+                "critical": crit, "rolling_avg": round(wsum / wn, 1) if wn else 0.0,
+                "rolling_n": wn}
+
+    def group_summary(self, kind):
+        """Per-vessel or per-mode rollup: ``kind`` is ``"vessel"`` or ``"mode"``."""
+        with self._lock:
+            rows = self._con.execute(
+                "SELECT key, missions, score_sum, detections, critical, last_score, last_date "
+                "FROM group_stats WHERE kind=? ORDER BY missions DESC", (kind,)).fetchall()
+        return [{kind: k, "missions": n, "avg_score": ssum // n, "detections": d,
+                 "critical": c, "last_score": ls, "last_date": ld}
+                for k, n, ssum, d, c, ls, ld in rows]
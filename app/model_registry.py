@@ -0,0 +1,177 @@
+"""
+NautiCAI — Model Registry
+Profiles the available YOLO weights at several input resolutions on this host
+and picks the (model, imgsz) pair that best fits a per-frame latency budget.
+Profiles are cached in ``data/model_profile.json`` keyed by host and weights,
+so they are measured once per machine.
+
+    from model_registry import select
+    choice = select(budget_ms=150)      # live video
+    choice = select()                   # stills — best accuracy
+"""
+
+import os, json, time, hashlib, platform
+
+import numpy as np
+
+import engine
+from engine import ROOT, MODEL_CANDIDATES
+
+PROFILE_PATH = ROOT / "data" / "model_profile.json"
+EVAL_PATH = ROOT / "data" / "eval_metrics.json"      # written by scripts/evaluate.py
+IMGSZ_CHOICES = (320, 480, 640)
+PROFILE_RUNS = 10
+
+# Stock COCO checkpoints don't know the defect classes; domain-trained weights always rank above them
+STOCK_WEIGHTS = {"yolov8n.pt", "yolov8s.pt", "yolov8m.pt", "yolov8l.pt", "yolov8x.pt"}
+
+BUDGETS = {
+    "Best accuracy (stills)": None,
+    "≤ 300 ms / frame": 300,
+    "≤ 150 ms / frame (live video)": 150,
+    "≤ 80 ms / frame": 80,
+}
+
+
+def host_key():
+    """Identifies the machine a profile was measured on."""
+    return "|".join([platform.node(), platform.machine(), platform.processor() or "",
+                     str(os.cpu_count())])
+
+
+def available_weights():
+    """Weight files in the repo root: the known candidates first, then any other ``*.pt``."""
+    seen, out = set(), []
+    for p in [ROOT / n for n in MODEL_CANDIDATES] + sorted(ROOT.glob("*.pt")):
+        if p.exists() and p.name not in seen:
+            seen.add(p.name)
+            out.append(p)
+    return out
+
+
+def _weights_key(path):
+    st_ = os.stat(path)
+    return hashlib.sha1(f"{path.name}|{st_.st_size}|{st_.st_mtime_ns}".encode()).hexdigest()[:12]
+
+
+def _load_cache():
+    try:
+        cache = json.loads(PROFILE_PATH.read_text(encoding="utf-8"))
+        return cache if cache.get("host") == host_key() else {"host": host_key(), "entries": {}}
+    except (OSError, ValueError):
+        return {"host": host_key(), "entries": {}}
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PROFILING
+# ═══════════════════════════════════════════════════════════════════
+def _params(model):
+    try:
+        return int(sum(p.numel() for p in model.model.parameters()))
+    except Exception:
+        return 0
+
+
+def profile_one(path, imgsz, runs=PROFILE_RUNS, frame=None):
+    """Warm ``path`` at ``imgsz`` then time ``runs`` predictions; returns one profile entry."""
+    model = engine.load_yolo(str(path))
+    h, w = (imgsz, imgsz) if isinstance(imgsz, int) else imgsz
+    if frame is None:
+        frame = np.random.default_rng(0).integers(0, 255, (h, w, 3), dtype=np.uint8)
+    engine.warm_up(model, passes=2, sizes=[imgsz])
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        model.predict(frame, imgsz=imgsz, verbose=False)
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return {
+        "model": path.name,
+        "path": str(path),
+        "imgsz": imgsz,
+        "params": _params(model),
+        "domain": path.name not in STOCK_WEIGHTS,
+        "p50_ms": round(times[len(times) // 2], 1),
+        "p90_ms": round(times[min(len(times) - 1, int(len(times) * 0.9))], 1),
+    }
+
+
+def profile(weights=None, sizes=IMGSZ_CHOICES, runs=PROFILE_RUNS, force=False, log=print):
+    """
+    Profile every weights × size pair not already cached for this host.
+    Returns the list of entries (cached and new).
+    """
+    cache = _load_cache()
+    entries = cache["entries"]
+    out = []
+    for path in weights or available_weights():
+        wk = _weights_key(path)
+        for sz in sizes:
+            key = f"{wk}@{engine.fmt_imgsz(sz)}"
+            if force or key not in entries:
+                entries[key] = profile_one(path, sz, runs)
+                log(f"  {path.name:<14} @ {engine.fmt_imgsz(sz):>7} · p50 {entries[key]['p50_ms']:>7.1f} ms"
+                    f" · p90 {entries[key]['p90_ms']:>7.1f} ms")
+            out.append(entries[key])
+    cache["updated"] = time.strftime("%Y-%m-%d %H:%M")
+    PROFILE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    PROFILE_PATH.write_text(json.dumps(cache, indent=1), encoding="utf-8")
+    return out
+
+
+def cached_profile():
+    """Profile entries for the weights currently on disk (no measuring)."""
+    entries = _load_cache()["entries"]
+    out = []
+    for path in available_weights():
+        wk = _weights_key(path)
+        out += [e for k, e in entries.items() if k.startswith(wk + "@")]
+    return out
+
+
+def eval_metrics():
+    """Offline validation metrics from ``scripts/evaluate.py --save-app-metrics``, or None."""
+    try:
+        return json.loads(EVAL_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SELECTION
+# ═══════════════════════════════════════════════════════════════════
+def _accuracy_rank(e):
+    sz = e["imgsz"] if isinstance(e["imgsz"], int) else max(e["imgsz"])
+    return (e["domain"], e["params"], sz)
+
+
+def select(budget_ms=None, entries=None):
+    """
+    Choose ``{model, path, imgsz, p50_ms, p90_ms, budget_ms, reason}``.
+    With a budget, the most accurate entry whose p90 fits it wins (the fastest
+    entry if none fits); without one, the most accurate entry overall.
+    Falls back to the engine's default model when nothing has been profiled.
+    """
+    entries = cached_profile() if entries is None else entries
+    if not entries:
+        path = engine.MODEL_PATH
+        return {"model": path.name if path else None, "path": str(path) if path else None,
+                "imgsz": engine.DEFAULT_IMGSZ, "p50_ms": None, "p90_ms": None,
+                "budget_ms": budget_ms, "reason": "not profiled on this host — default model"}
+    if budget_ms is None:
+        best, reason = max(entries, key=_accuracy_rank), "best accuracy"
+    else:
+        fits = [e for e in entries if e["p90_ms"] <= budget_ms]
+        if fits:
+            best, reason = max(fits, key=_accuracy_rank), f"most accurate within ≤{budget_ms:g} ms"
+        else:
+            best, reason = min(entries, key=lambda e: e["p90_ms"]), f"nothing fits ≤{budget_ms:g} ms — fastest"
+    return dict(best, budget_ms=budget_ms, reason=reason)
+
+
+def describe(choice):
+    """One-line summary for the sidebar and reports."""
+    if not choice or not choice.get("model"):
+        return "Demo (no weights)"
+    lat = f" · p50 {choice['p50_ms']:.0f} ms" if choice.get("p50_ms") else ""
+    return f"{choice['model']} @ {engine.fmt_imgsz(choice['imgsz'])}{lat}"
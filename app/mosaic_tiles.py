@@ -0,0 +1,371 @@
+"""
+NautiCAI — Tiled Mosaic Inspection
+Out-of-core inspection of stitched hull mosaics that are far too large to load.
+The mosaic is read tile by tile (memory-mapped ``.npy`` / uncompressed TIFF, or
+chunked / pyramid TIFF through tifffile + zarr); tiles are enhanced and detected
+in worker processes, boxes are merged across tile seams, and the run writes a
+tiled heatmap pyramid plus downsampled overview images for the PDF.
+
+    python app/nauticai.py mosaic hull_survey.tif -o runs/mosaic -j 8 --pdf
+
+JPEG / PNG mosaics have no random access; they are decoded once into a ``.npy``
+memmap in the output folder and tiled from there.
+"""
+
+import json, math, time, datetime
+from functools import lru_cache
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+import matplotlib
+from scipy.ndimage import gaussian_filter
+
+import engine
+from engine import (full_enhance_bgr, annotate_image, build_heatmap, compute_risk,
+                    score_to_grade, sev_weight, cv_to_pil)
+from batch import DEFAULT_SETTINGS, mission_id_for, _init_worker, _atomic_json
+from worker_pool import tuned
+from telemetry import observe
+
+TILE = 1280             # detection tile side (full-resolution px)
+OVERLAP = 128           # tile overlap so seam defects are seen whole at least once
+BLOCK = 4096            # read block for overview generation
+OVERVIEW_SIDE = 2048    # longest side of the overview images used in the PDF
+PYRAMID_TILE = 512
+PYRAMID_MIN_SCALE = 4   # finest heatmap pyramid level = 1/4 of full resolution
+HEAT_SIGMA = 40         # heat kernel sigma at full resolution (px)
+EMPTY_FRAC = 0.05       # tiles with less non-black content than this are no-data
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SOURCES
+# ═══════════════════════════════════════════════════════════════════
+class MosaicSource:
+    """Random-access view of an ``H×W[×C]`` RGB array-like (memmap or zarr array)."""
+
+    def __init__(self, arr, path, close=None):
+        self.arr = arr
+        self.height, self.width = arr.shape[:2]
+        self.path = str(path)
+        self._close = close
+
+    def read(self, x, y, w, h):
+        """The ``w×h`` region at ``(x, y)`` as a BGR uint8 array."""
+        t = np.asarray(self.arr[y:y + h, x:x + w])
+        if t.ndim == 2:
+            t = np.repeat(t[..., None], 3, axis=2)
+        t = t[..., :3]
+        if t.dtype == np.uint16:
+            t = (t >> 8).astype(np.uint8)
+        elif t.dtype != np.uint8:
+            t = np.clip(t, 0, 255).astype(np.uint8)
+        return cv2.cvtColor(np.ascontiguousarray(t), cv2.COLOR_RGB2BGR)
+
+    def close(self):
+        if self._close:
+            self._close()
+
+
+def _open_tiff(path):
+    try:
+        import tifffile
+    except ImportError as e:
+        raise ImportError("TIFF mosaics need tifffile — pip install tifffile") from e
+    try:
+        return MosaicSource(tifffile.memmap(str(path), mode="r"), path)
+    except ValueError:          # compressed or tiled: not memory-mappable
+        pass
+    try:
+        import zarr
+    except ImportError as e:
+        raise ImportError("Compressed / tiled TIFF mosaics need zarr — pip install zarr") from e
+    store = tifffile.imread(str(path), aszarr=True)
+    z = zarr.open(store, mode="r")
+    arr = z if hasattr(z, "shape") else z["0"]      # pyramid TIFF: level 0 = full resolution
+    return MosaicSource(arr, path, store.close)
+
+
+def open_mosaic(path):
+    path = Path(path)
+    ext = path.suffix.lower()
+    if ext == ".npy":
+        return MosaicSource(np.load(path, mmap_mode="r"), path)
+    if ext in (".tif", ".tiff"):
+        return _open_tiff(path)
+    raise ValueError(f"{path.name}: no tiled access for {ext} — call prepare() first")
+
+
+def prepare(path, out_dir, log=print):
+    """
+    Path workers can tile from: ``.npy`` / TIFF as-is, anything else decoded
+    once (in this process) into ``out_dir/mosaic.npy``.
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".npy", ".tif", ".tiff"):
+        return path
+    cache = Path(out_dir) / "mosaic.npy"
+    if cache.exists() and cache.stat().st_mtime >= path.stat().st_mtime:
+        return cache
+    log(f"🧩 {path.name}: decoding once into {cache.name} for tiled access")
+    bgr = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    if bgr is None:
+        raise ValueError(f"could not decode {path}")
+    mm = np.lib.format.open_memmap(cache, mode="w+", dtype=np.uint8, shape=bgr.shape)
+    mm[:] = bgr[..., ::-1]
+    mm.flush()
+    del bgr, mm
+    return cache
+
+
+@lru_cache(maxsize=2)
+def _cached_source(path):
+    return open_mosaic(path)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# TILING / DETECTION (runs in worker processes)
+# ═══════════════════════════════════════════════════════════════════
+def tile_grid(width, height, tile=TILE, overlap=OVERLAP):
+    """Overlapping ``(x, y, w, h)`` tiles covering the whole mosaic."""
+    step = max(1, tile - overlap)
+    xs = range(0, max(width - overlap, 1), step)
+    ys = range(0, max(height - overlap, 1), step)
+    return [(x, y, min(tile, width - x), min(tile, height - y)) for y in ys for x in xs]
+
+
+def _tile_job(path, rect, s):
+    t0 = time.perf_counter()
+    x, y, w, h = rect
+    bgr = _cached_source(str(path)).read(x, y, w, h)
+    timings = {"decode": time.perf_counter() - t0}
+    if cv2.countNonZero(cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)) < EMPTY_FRAC * w * h:
+        return rect, [], timings
+    t1 = time.perf_counter()
+    enh = full_enhance_bgr(bgr, s["clahe"], s["green"], s["turbidity"],
+                           s["correct_turbidity"], s["edge"], s["clahe_clip"])
+    t2 = time.perf_counter()
+    timings["enhance"] = t2 - t1
+    if s["model"] or engine.MODEL_PATH:
+        # No synthetic fallback per tile: an empty tile is a clean patch of hull
+        dets = engine.detect_batch([enh], s["conf"], s["iou"], s["model"],
+                                   engine.parse_imgsz(s["imgsz"]))[0]
+    else:
+        dets = engine.run_detection(enh, s["conf"], s["iou"], s["mode"])
+    timings["detect"] = time.perf_counter() - t2
+    for d in dets:
+        d["x1"] += x; d["x2"] += x; d["y1"] += y; d["y2"] += y
+    return rect, dets, timings
+
+
+def merge_seams(dets, iou_thr=0.5, contain_thr=0.6, union=True):
+    """
+    Fuse duplicates from overlapping tiles. Same-class boxes that overlap by
+    IoU ≥ ``iou_thr``, or where one is mostly inside the other (a box cut off
+    at a tile edge), become one union box with the higher confidence
+    (``union=False`` keeps the most confident box as-is).
+    """
+    merged = []
+    by_cls = {}
+    for d in dets:
+        by_cls.setdefault(d["cls"], []).append(d)
+    for group in by_cls.values():
+        group.sort(key=lambda d: -d["conf"])
+        kept = np.zeros((0, 4), np.float64)
+        out = []
+        for d in group:
+            b = np.array([d["x1"], d["y1"], d["x2"], d["y2"]], np.float64)
+            if len(kept):
+                ix = np.clip(np.minimum(kept[:, 2], b[2]) - np.maximum(kept[:, 0], b[0]), 0, None)
+                iy = np.clip(np.minimum(kept[:, 3], b[3]) - np.maximum(kept[:, 1], b[1]), 0, None)
+                inter = ix * iy
+                a_k = (kept[:, 2] - kept[:, 0]) * (kept[:, 3] - kept[:, 1])
+                a_b = (b[2] - b[0]) * (b[3] - b[1])
+                iou = inter / np.maximum(a_k + a_b - inter, 1)
+                contain = inter / np.maximum(np.minimum(a_k, a_b), 1)
+                hit = np.flatnonzero((iou >= iou_thr) | (contain >= contain_thr))
+                if len(hit) and not union:
+                    continue
+                if len(hit):
+                    k = hit[np.argmax(iou[hit])]
+                    kept[k] = [min(kept[k, 0], b[0]), min(kept[k, 1], b[1]),
+                               max(kept[k, 2], b[2]), max(kept[k, 3], b[3])]
+                    continue
+            kept = np.vstack([kept, b])
+            out.append(d)
+        for d, b in zip(out, kept):
+            x1, y1, x2, y2 = map(int, b)
+            merged.append(dict(d, x1=x1, y1=y1, x2=x2, y2=y2, area=(x2 - x1) * (y2 - y1)))
+    merged.sort(key=lambda d: (d["y1"], d["x1"]))
+    for i, d in enumerate(merged, 1):
+        d["id"] = i
+    return merged
+
+
+# ═══════════════════════════════════════════════════════════════════
+# HEATMAP PYRAMID / OVERVIEW
+# ═══════════════════════════════════════════════════════════════════
+def write_heat_pyramid(dets, width, height, out_dir, tile=PYRAMID_TILE,
+                       min_scale=PYRAMID_MIN_SCALE, sigma=HEAT_SIGMA):
+    """
+    RGBA heat tiles ``out_dir/<level>/<col>_<row>.png`` from level 0 (1/``min_scale``
+    of full size) up to a single tile. Tiles with no heat are not written. Values
+    are normalised so 1.0 is the peak of one Critical finding, which keeps
+    colours consistent across tiles and levels. Returns the pyramid manifest.
+    """
+    out_dir = Path(out_dir)
+    cmap = matplotlib.colormaps.get_cmap("plasma")
+    pts = np.array([((d["x1"] + d["x2"]) / 2, (d["y1"] + d["y2"]) / 2, sev_weight(d["severity"]))
+                    for d in dets], np.float64).reshape(-1, 3)
+    levels, scale, level = [], min_scale, 0
+    while True:
+        lw, lh = math.ceil(width / scale), math.ceil(height / scale)
+        cols, rows = math.ceil(lw / tile), math.ceil(lh / tile)
+        sig = max(1.5, sigma / scale)
+        pad = int(math.ceil(3 * sig))
+        norm = 2 * math.pi * sig * sig / sev_weight("Critical")
+        (out_dir / str(level)).mkdir(parents=True, exist_ok=True)
+        written = 0
+        lp = pts[:, :2] / scale
+        for r in range(rows):
+            for c in range(cols):
+                x0, y0 = c * tile, r * tile
+                tw, th = min(tile, lw - x0), min(tile, lh - y0)
+                sel = ((lp[:, 0] >= x0 - pad) & (lp[:, 0] < x0 + tw + pad) &
+                       (lp[:, 1] >= y0 - pad) & (lp[:, 1] < y0 + th + pad))
+                if not sel.any():
+                    continue
+                heat = np.zeros((th + 2 * pad, tw + 2 * pad), np.float32)
+                ix = (lp[sel, 0] - x0 + pad).astype(int)
+                iy = (lp[sel, 1] - y0 + pad).astype(int)
+                np.add.at(heat, (iy, ix), pts[sel, 2])
+                v = np.clip(gaussian_filter(heat, sig)[pad:pad + th, pad:pad + tw] * norm, 0, 1)
+                rgba = (cmap(v) * 255).astype(np.uint8)
+                rgba[..., 3] = (v * 200).astype(np.uint8)
+                cv2.imwrite(str(out_dir / str(level) / f"{c}_{r}.png"),
+                            cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGRA))
+                written += 1
+        levels.append({"level": level, "scale": scale, "width": lw, "height": lh,
+                       "cols": cols, "rows": rows, "tiles": written})
+        if cols == 1 and rows == 1:
+            break
+        scale *= 2
+        level += 1
+    manifest = {"width": width, "height": height, "tile": tile, "levels": levels}
+    with open(out_dir / "pyramid.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def overview(src, max_side=OVERVIEW_SIDE, block=BLOCK):
+    """Downsampled BGR overview built block by block (never holds the full mosaic)."""
+    k = min(1.0, max_side / max(src.width, src.height))
+    ow, oh = max(1, round(src.width * k)), max(1, round(src.height * k))
+    out = np.zeros((oh, ow, 3), np.uint8)
+    for y in range(0, src.height, block):
+        for x in range(0, src.width, block):
+            w, h = min(block, src.width - x), min(block, src.height - y)
+            tx0, ty0 = round(x * k), round(y * k)
+            tw, th = round((x + w) * k) - tx0, round((y + h) * k) - ty0
+            if tw > 0 and th > 0:
+                out[ty0:ty0 + th, tx0:tx0 + tw] = cv2.resize(src.read(x, y, w, h), (tw, th),
+                                                            interpolation=cv2.INTER_AREA)
+    return out, k
+
+
+def _scaled(dets, k):
+    out = []
+    for d in dets:
+        x1, y1, x2, y2 = (int(d[c] * k) for c in ("x1", "y1", "x2", "y2"))
+        x2, y2 = max(x2, x1 + 2), max(y2, y1 + 2)
+        out.append(dict(d, x1=x1, y1=y1, x2=x2, y2=y2, area=(x2 - x1) * (y2 - y1)))
+    return out
+
+
+# ═══════════════════════════════════════════════════════════════════
+# DRIVER
+# ═══════════════════════════════════════════════════════════════════
+def inspect_mosaic(path, out_dir, workers=None, settings=None, tile=TILE, overlap=OVERLAP,
+                   pdf=False, store=None, log=print):
+    """
+    Tile, detect, merge and summarise one mosaic. Writes ``detections.json``,
+    detection CSV / Parquet, overview images, ``heatmap/`` pyramid and
+    (optionally) ``report.pdf`` under ``out_dir``; returns the summary dict.
+    """
+    s = dict(DEFAULT_SETTINGS, mode="hull", **(settings or {}))
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+
+    src_path = prepare(path, out_dir, log)
+    src = open_mosaic(src_path)
+    rects = tile_grid(src.width, src.height, tile, overlap)
+    log(f"🧩 {Path(path).name}: {src.width}×{src.height} px · {len(rects)} tiles of {tile} px "
+        f"({overlap} px overlap)")
+
+    workers, threads = tuned(workers)
+    raw, stage_s = [], {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(threads, s["model"])) as pool:
+        futs = [pool.submit(_tile_job, str(src_path), r, s) for r in rects]
+        for i, fut in enumerate(as_completed(futs), 1):
+            _, dets, timings = fut.result()
+            raw += dets
+            for stage, sec in timings.items():
+                stage_s[stage] = stage_s.get(stage, 0.0) + sec
+                observe(stage, sec)
+            if i % 50 == 0 or i == len(futs):
+                log(f"  [{i}/{len(futs)}] tiles · {len(raw)} raw detections")
+    tiles_s = time.perf_counter() - t0
+
+    dets = merge_seams(raw)
+    risk = compute_risk(dets)
+    grade = score_to_grade(risk)
+    mid = mission_id_for(Path(path).name, s["mode"])
+    log(f"  seams merged: {len(raw)} → {len(dets)} detections · risk {risk}/100 · grade {grade}")
+
+    pyramid = write_heat_pyramid(dets, src.width, src.height, out_dir / "heatmap")
+    ov_bgr, k = overview(src)
+    src.close()
+    ov = cv_to_pil(ov_bgr)
+    ov_dets = _scaled(dets, k)
+    ann = annotate_image(ov, ov_dets)
+    hmap = build_heatmap(ov, ov_dets)
+    ov.save(out_dir / "overview.jpg", quality=90)
+    ann.save(out_dir / "overview_annotated.jpg", quality=90)
+    hmap.save(out_dir / "overview_heatmap.jpg", quality=90)
+
+    from export import export_detections
+    try:
+        outputs = export_detections(out_dir, dets, mid, s["vessel"])
+    except ImportError:
+        outputs = export_detections(out_dir, dets, mid, s["vessel"], ("csv",))
+    outputs = {f: str(p) for f, p in outputs.items()}
+
+    if pdf:
+        from pdf_report import build_pdf
+        p = out_dir / "report.pdf"
+        with open(p, "wb") as f:
+            f.write(build_pdf(mid, s["vessel"], s["inspector"], s["mode"], dets, ov, ann, hmap,
+                              risk, grade, s["conf"], s["iou"], model_info=s.get("model_info")))
+        outputs["pdf"] = str(p)
+
+    summary = {
+        "mosaic": str(path), "mission_id": mid, "width": src.width, "height": src.height,
+        "tile": tile, "overlap": overlap, "tiles": len(rects), "workers": workers,
+        "raw_detections": len(raw), "detections": len(dets), "risk_score": risk, "grade": grade,
+        "overview_scale": k, "pyramid_levels": len(pyramid["levels"]),
+        "tiles_s": round(tiles_s, 3), "wall_s": round(time.perf_counter() - t0, 3),
+        "stage_s": {k_: round(v, 3) for k_, v in stage_s.items()},
+        "settings": s, "outputs": outputs,
+    }
+    _atomic_json(out_dir / "detections.json", {"mission_id": mid, "detections": dets})
+    _atomic_json(out_dir / "summary.json", summary)
+    if store is not None:
+        store.add_mission({"id": mid, "vessel": s["vessel"],
+                           "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+                           "score": risk, "grade": grade, "detections": len(dets),
+                           "mode": "mosaic/hull", "_src": f"mosaic_{Path(path).name}_{src.width}x{src.height}",
+                           "timings": {k_: round(v * 1000, 1) for k_, v in stage_s.items()}}, dets)
+    return summary
@@ -0,0 +1,255 @@
+"""
+NautiCAI — Command-line / library entry point
+
+    python app/nauticai.py inspect survey_dump/ -o runs/inspect -j 8 --mode hull --annotate --pdf
+    python app/nauticai.py fleet-report missions/ -o reports/
+    python app/nauticai.py serve --port 8765
+    python app/nauticai.py pool-bench --images samples/ -n 64
+    python app/nauticai.py models --profile --budget-ms 150
+    python app/nauticai.py bench -o bench.json --compare bench_baseline.json
+    python app/nauticai.py mosaic hull_survey.tif -o runs/mosaic -j 8 --pdf
+
+Library use (from the app/ directory or with app/ on sys.path):
+
+    from nauticai import full_enhance, run_detection, annotate_image, run_batch
+"""
+import os, sys, argparse
+
+from engine import full_enhance, run_detection, annotate_image, ensure_model
+from batch import run_batch, DEFAULT_SETTINGS
+
+__all__ = ["full_enhance", "run_detection", "annotate_image", "run_batch"]   # library use, see above
+
+
+def _cmd_inspect(args):
+    settings = {
+        "mode": args.mode, "conf": args.conf, "iou": args.iou,
+        "clahe": not args.no_clahe, "clahe_clip": args.clahe_clip,
+        "green": not args.no_green, "edge": args.edge,
+        "turbidity": args.turbidity, "sample_every": args.sample_every,
+        "vessel": args.vessel, "inspector": args.inspector, "roi": not args.no_roi,
+    }
+    if args.download:
+        ensure_model()
+    if args.imgsz:
+        settings["imgsz"] = args.imgsz
+    if args.budget_ms is not None or args.best_accuracy:
+        from model_registry import select, describe
+        choice = select(args.budget_ms)
+        settings.update(model=choice["path"], imgsz=choice["imgsz"], model_info=choice)
+        print(f"🧠 {describe(choice)} — {choice['reason']}")
+    store = None
+    if args.record:
+        from mission_store import MissionStore, DB_PATH
+        store = MissionStore(args.db or DB_PATH)
+    res = run_batch(args.source, args.out, args.workers, settings,
+                    annotate=args.annotate, pdf=args.pdf, force=args.force, store=store,
+                    threads=args.threads)
+    print(f"\n✅ {res['processed']} processed · {res['skipped']} skipped · "
+          f"{len(res['failed'])} failed · {res['wall_s']:.1f}s "
+          f"({res['assets_per_s'] or 0:.2f} assets/s, {res['workers']} workers × {res['threads']} threads)")
+    print(f"✅ Results → {args.out}/results · summary → {args.out}/summary.json")
+    return 1 if res["failed"] else 0
+
+
+def _cmd_fleet_report(args):
+    import fleet_report
+    return fleet_report.main(args.rest)
+
+
+def _cmd_serve(args):
+    from inference_server import serve
+    serve(args.host, args.port, args.model or (ensure_model() if args.download else None),
+          args.window_ms, args.max_batch)
+    return 0
+
+
+def _cmd_pool_bench(args):
+    import worker_pool
+    if args.download:
+        ensure_model()
+    grid = None
+    if args.workers or args.threads:
+        grid = [(w, t) for w in (args.workers or [1]) for t in (args.threads or [1])]
+    imgs = worker_pool.bench_images(args.images, args.n)
+    print(f"⏱️  Sweeping workers × threads over {len(imgs)} images ({os.cpu_count()} cores)")
+    rows = worker_pool.sweep(imgs, grid, args.conf, args.iou, args.model, save=not args.no_save)
+    best = rows[0]
+    print(f"\n✅ Best: {best['workers']} workers × {best['threads']} threads · {best['imgs_per_s']} img/s")
+    if not args.no_save:
+        print(f"✅ Saved → {worker_pool.POOL_CONFIG} (used by inspect and InferencePool by default)")
+    return 0
+
+
+def _cmd_models(args):
+    import model_registry as mr
+    if args.download:
+        ensure_model()
+    entries = (mr.profile(sizes=args.sizes, runs=args.runs, force=args.force) if args.profile
+               else mr.cached_profile())
+    if not entries:
+        print("No profile for this host yet — run with --profile")
+    for e in sorted(entries, key=lambda e: (e["model"], str(e["imgsz"]))):
+        print(f"  {e['model']:<14} @ {str(e['imgsz']):>5} · p50 {e['p50_ms']:>7.1f} ms · "
+              f"p90 {e['p90_ms']:>7.1f} ms · {e['params'] / 1e6:.1f} M params")
+    choice = mr.select(args.budget_ms, entries)
+    print(f"\n✅ {mr.describe(choice)} — {choice['reason']}")
+    return 0
+
+
+def _cmd_bench(args):
+    import json, benchmark
+    if args.download:
+        ensure_model()
+    res = [tuple(map(int, r.lower().split("x"))) for r in args.resolutions]
+    print(f"⏱️  Benchmarking {', '.join(args.stages)} · {len(res)} resolutions · densities {args.densities}")
+    report = benchmark.run(args.images, res, args.densities, args.runs, args.pdf_runs, args.stages)
+    benchmark.print_table(report)
+    if args.out:
+        print(f"✅ Results → {benchmark.write(report, args.out)}")
+    if not args.compare:
+        return 0
+    with open(args.compare, "r", encoding="utf-8") as f:
+        rows = benchmark.compare(report, json.load(f), args.tolerance)
+    bad = [r for r in rows if r["regression"]]
+    for r in rows:
+        flag = "❌ REGRESSION" if r["regression"] else ""
+        print(f"  {r['case']:<28} {r['stage']:<9} {r['base']:>9.2f} → {r['now']:>9.2f} ms "
+              f"({r['change'] * 100:+.1f}%) {flag}")
+    print(f"\n{'❌' if bad else '✅'} {len(bad)} regression(s) over {args.tolerance * 100:.0f}% "
+          f"across {len(rows)} matched cases")
+    return 1 if bad else 0
+
+
+def _cmd_mosaic(args):
+    from mosaic_tiles import inspect_mosaic
+    if args.download:
+        ensure_model()
+    settings = {"conf": args.conf, "iou": args.iou, "clahe_clip": args.clahe_clip,
+                "turbidity": args.turbidity, "vessel": args.vessel, "inspector": args.inspector}
+    if args.imgsz:
+        settings["imgsz"] = args.imgsz
+    store = None
+    if args.record:
+        from mission_store import MissionStore, DB_PATH
+        store = MissionStore(args.db or DB_PATH)
+    res = inspect_mosaic(args.source, args.out, args.workers, settings, args.tile, args.overlap,
+                         pdf=args.pdf, store=store)
+    print(f"\n✅ {res['detections']} detections ({res['raw_detections']} before seam merge) · "
+          f"risk {res['risk_score']}/100 · grade {res['grade']} · {res['tiles']} tiles in {res['wall_s']:.1f}s")
+    print(f"✅ Heatmap pyramid → {args.out}/heatmap · overview + summary → {args.out}")
+    return 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="nauticai", description="NautiCAI headless inspection tools")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("inspect", help="batch-inspect a directory of images and videos")
+    p.add_argument("source", help="directory (searched recursively) or a single file")
+    p.add_argument("-o", "--out", default="runs/inspect", help="output directory")
+    p.add_argument("-j", "--workers", type=int, default=None,
+                   help="worker processes (default: pool-bench optimum, else all cores)")
+    p.add_argument("--threads", type=int, default=None, help="intra-op threads per worker")
+    p.add_argument("--mode", default=DEFAULT_SETTINGS["mode"],
+                   choices=["hull", "pipeline", "cable", "port", "general"])
+    p.add_argument("--conf", type=float, default=DEFAULT_SETTINGS["conf"])
+    p.add_argument("--iou", type=float, default=DEFAULT_SETTINGS["iou"])
+    p.add_argument("--clahe-clip", type=float, default=DEFAULT_SETTINGS["clahe_clip"])
+    p.add_argument("--no-clahe", action="store_true")
+    p.add_argument("--no-green", action="store_true")
+    p.add_argument("--edge", action="store_true")
+    p.add_argument("--no-roi", action="store_true", help="pipeline/cable: run on the full frame, not the asset band")
+    p.add_argument("--turbidity", type=float, default=0.0)
+    p.add_argument("--sample-every", type=int, default=DEFAULT_SETTINGS["sample_every"],
+                   help="video: analyse every N-th frame")
+    p.add_argument("--vessel", default=DEFAULT_SETTINGS["vessel"])
+    p.add_argument("--inspector", default=DEFAULT_SETTINGS["inspector"])
+    p.add_argument("--annotate", action="store_true", help="write annotated JPEGs")
+    p.add_argument("--pdf", action="store_true", help="write a PDF report per asset")
+    p.add_argument("--force", action="store_true", help="reprocess assets that are already done")
+    p.add_argument("--record", action="store_true", help="record results in the mission history DB")
+    p.add_argument("--db", default=None, help="mission history DB path (with --record)")
+    p.add_argument("--download", action="store_true", help="fetch best.pt from Hugging Face if missing")
+    p.add_argument("--imgsz", default=None, help="inference size, e.g. 640 or 384x640")
+    p.add_argument("--budget-ms", type=float, default=None,
+                   help="pick model + imgsz from the host profile to fit this per-frame budget")
+    p.add_argument("--best-accuracy", action="store_true", help="pick the most accurate profiled model")
+    p.set_defaults(func=_cmd_inspect)
+
+    p = sub.add_parser("fleet-report", help="batch per-mission PDFs + fleet summary", add_help=False)
+    p.add_argument("rest", nargs=argparse.REMAINDER)
+    p.set_defaults(func=_cmd_fleet_report)
+
+    p = sub.add_parser("serve", help="local inference server with a warm model and micro-batching")
+    p.add_argument("--host", default="127.0.0.1", help="bind address (default: localhost only)")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--model", default=None, help="weights file (default: auto-detected)")
+    p.add_argument("--window-ms", type=float, default=10, help="micro-batch collection window")
+    p.add_argument("--max-batch", type=int, default=16)
+    p.add_argument("--download", action="store_true", help="fetch best.pt from Hugging Face if missing")
+    p.set_defaults(func=_cmd_serve)
+
+    p = sub.add_parser("pool-bench", help="sweep worker processes × threads for inference throughput")
+    p.add_argument("--images", default=None, help="image directory (default: random 640 px frames)")
+    p.add_argument("-n", type=int, default=64, help="images per configuration")
+    p.add_argument("--workers", type=int, nargs="+", default=None, help="worker counts to try")
+    p.add_argument("--threads", type=int, nargs="+", default=None, help="thread counts to try")
+    p.add_argument("--conf", type=float, default=DEFAULT_SETTINGS["conf"])
+    p.add_argument("--iou", type=float, default=DEFAULT_SETTINGS["iou"])
+    p.add_argument("--model", default=None, help="weights file (default: auto-detected)")
+    p.add_argument("--no-save", action="store_true", help="don't write data/pool_config.json")
+    p.add_argument("--download", action="store_true", help="fetch best.pt from Hugging Face if missing")
+    p.set_defaults(func=_cmd_pool_bench)
+
+    p = sub.add_parser("models", help="profile weights × input sizes and show the budgeted choice")
+    p.add_argument("--profile", action="store_true", help="measure missing entries (cached per host)")
+    p.add_argument("--force", action="store_true", help="re-measure cached entries")
+    p.add_argument("--sizes", type=int, nargs="+", default=[320, 480, 640])
+    p.add_argument("--runs", type=int, default=10)
+    p.add_argument("--budget-ms", type=float, default=None, help="per-frame latency budget")
+    p.add_argument("--download", action="store_true", help="fetch best.pt from Hugging Face if missing")
+    p.set_defaults(func=_cmd_models)
+
+    import benchmark
+    p = sub.add_parser("bench", help="per-stage latency / throughput / peak RSS benchmark")
+    p.add_argument("--images", default=None, help="fixture images to add to the synthetic frames")
+    p.add_argument("--resolutions", nargs="+", default=[f"{w}x{h}" for w, h in benchmark.RESOLUTIONS])
+    p.add_argument("--densities", type=int, nargs="+", default=list(benchmark.DENSITIES),
+                   help="detections per frame for annotate / heatmap / pdf")
+    p.add_argument("--stages", nargs="+", default=list(benchmark.STAGES), choices=benchmark.STAGES)
+    p.add_argument("--runs", type=int, default=10)
+    p.add_argument("--pdf-runs", type=int, default=2)
+    p.add_argument("-o", "--out", default=None, help="write the JSON report here")
+    p.add_argument("--compare", default=None, help="baseline JSON; exit 1 on regressions")
+    p.add_argument("--tolerance", type=float, default=benchmark.TOLERANCE, help="allowed p50 growth")
+    p.add_argument("--download", action="store_true", help="fetch best.pt from Hugging Face if missing")
+    p.set_defaults(func=_cmd_bench)
+
+    import mosaic_tiles
+    p = sub.add_parser("mosaic", help="tiled, out-of-core inspection of a gigapixel hull mosaic")
+    p.add_argument("source", help="mosaic (.tif/.tiff incl. pyramid TIFF, .npy, or any image)")
+    p.add_argument("-o", "--out", default="runs/mosaic", help="output directory")
+    p.add_argument("-j", "--workers", type=int, default=None,
+                   help="worker processes (default: pool-bench optimum, else all cores)")
+    p.add_argument("--tile", type=int, default=mosaic_tiles.TILE, help="tile side in px")
+    p.add_argument("--overlap", type=int, default=mosaic_tiles.OVERLAP, help="tile overlap in px")
+    p.add_argument("--conf", type=float, default=DEFAULT_SETTINGS["conf"])
+    p.add_argument("--iou", type=float, default=DEFAULT_SETTINGS["iou"])
+    p.add_argument("--clahe-clip", type=float, default=DEFAULT_SETTINGS["clahe_clip"])
+    p.add_argument("--turbidity", type=float, default=0.0)
+    p.add_argument("--imgsz", default=None, help="inference size, e.g. 640 or 1280")
+    p.add_argument("--vessel", default=DEFAULT_SETTINGS["vessel"])
+    p.add_argument("--inspector", default=DEFAULT_SETTINGS["inspector"])
+    p.add_argument("--pdf", action="store_true", help="write report.pdf from the overview images")
+    p.add_argument("--record", action="store_true", help="record the mission in the history DB")
+    p.add_argument("--db", default=None, help="mission history DB path (with --record)")
+    p.add_argument("--download", action="store_true", help="fetch best.pt from Hugging Face if missing")
+    p.set_defaults(func=_cmd_mosaic)
+
+    args = ap.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,7 @@ Clean, print-ready layout · Helvetica typography · Header/Footer · Page numbe
 """
 
 import io, datetime, hashlib
+from functools import lru_cache
 import numpy as np
 from PIL import Image
 import qrcode, matplotlib
@@ -61,6 +62,7 @@ GRADE_COL = {
 # ═══════════════════════════════════════════════════════════════════
 # STYLES
 # ═══════════════════════════════════════════════════════════════════
+@lru_cache(maxsize=1)
 def _styles():
     def S(name, **kw):
         return ParagraphStyle(name, **kw)
@@ -136,6 +138,33 @@ def _section_line():
                       spaceAfter=6, spaceBefore=2)
 
 
+@lru_cache(maxsize=64)
+def _severity_chart_png(values, labels=("Critical", "High", "Medium", "Low")):
+    """Render the severity bar chart once per distinct count tuple -> PNG bytes."""
+    fig, ax = plt.subplots(figsize=(6.5, 2.4), facecolor="white")
+    ax.set_facecolor("#FAFBFC")
+    bar_colors = ["#DC2626", "#EA580C", "#2563EB", "#16A34A"]
+    bars = ax.bar(labels, values, color=bar_colors, width=0.5,
+                  edgecolor="#E2E8F0", linewidth=0.8)
+    ax.set_ylabel("Count", fontsize=9, color="#475569")
+    ax.tick_params(colors="#475569", labelsize=9)
+    for spine in ax.spines.values():
+        spine.set_color("#E2E8F0")
+    ax.spines["top"].set_visible(False)
+    ax.spines["right"].set_visible(False)
+    ax.yaxis.grid(True, alpha=0.3, color="#CBD5E1")
+    for bar, val in zip(bars, values):
+        if val:
+            ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 0.08,
+                    str(val), ha="center", color="#1E293B", fontsize=11,
+                    fontweight="bold")
+    fig.tight_layout(pad=1.2)
+    chart_buf = io.BytesIO()
+    fig.savefig(chart_buf, format="png", dpi=140, facecolor="white")
+    plt.close(fig)
+    return chart_buf.getvalue()
+
+
 def _section(title, ST):
     """Return [heading, accent line] for a new section."""
     return [
@@ -198,9 +227,12 @@ def build_pdf(
     mission_id, vessel, inspector, mode,
     dets, orig_img, annot_img, hmap_img,
     risk_score, grade, conf_thr, iou_thr,
+    model_info=None,
 ):
     """
     Generate a professional, print-ready PDF inspection report.
+    ``model_info`` is a ``model_registry.select()`` choice (model, imgsz,
+    latency, budget) recorded in the Mission Details table.
     Returns: bytes
     """
     buf = io.BytesIO()
@@ -210,7 +242,7 @@ def build_pdf(
     meta = {
         "mission_id": mission_id,
         "vessel": vessel or "N/A",
-        "model": "YOLOv8s",
+        "model": (model_info or {}).get("model") or "YOLOv8s",
         "date": ts,
     }
 
@@ -272,9 +304,19 @@ def build_pdf(
     meta_data = [
         ["Mission ID", mission_id, "Vessel", vessel or "N/A"],
         ["Inspector", inspector, "Scan Mode", mode.upper()],
-        ["Date / Time", ts, "Model", "YOLOv8s"],
+        ["Date / Time", ts, "Model", meta["model"]],
         ["Conf. Threshold", f"{conf_thr:.2f}", "IoU Threshold", f"{iou_thr:.2f}"],
     ]
+    if model_info:
+        sz = model_info.get("imgsz")
+        lat = model_info.get("p50_ms")
+        budget = model_info.get("budget_ms")
+        meta_data.append([
+            "Input Size", f"{sz if isinstance(sz, int) else 'x'.join(map(str, sz or ()))} px",
+            "Latency (p50)",
+            (f"{lat:.0f} ms" if lat else "not profiled")
+            + (f"  (budget {budget:g} ms)" if budget else ""),
+        ])
     meta_tbl = Table(meta_data, colWidths=[34 * mm, 54 * mm, 34 * mm, 54 * mm])
     meta_tbl.setStyle(TableStyle([
         ("FONTNAME",  (0, 0), (0, -1), "Helvetica-Bold"),
@@ -487,31 +529,7 @@ def build_pdf(
     # ─── SEVERITY DISTRIBUTION CHART ─────────────────────────────────
     story += _section("Severity Distribution", ST)
 
-    fig, ax = plt.subplots(figsize=(6.5, 2.4), facecolor="white")
-    ax.set_facecolor("#FAFBFC")
-    bar_colors = ["#DC2626", "#EA580C", "#2563EB", "#16A34A"]
-    labels = list(sev_counts.keys())
-    values = list(sev_counts.values())
-    bars = ax.bar(labels, values, color=bar_colors, width=0.5,
-                  edgecolor="#E2E8F0", linewidth=0.8)
-    ax.set_ylabel("Count", fontsize=9, color="#475569")
-    ax.tick_params(colors="#475569", labelsize=9)
-    for spine in ax.spines.values():
-        spine.set_color("#E2E8F0")
-    ax.spines["top"].set_visible(False)
-    ax.spines["right"].set_visible(False)
-    ax.yaxis.grid(True, alpha=0.3, color="#CBD5E1")
-    for bar, val in zip(bars, values):
-        if val:
-            ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 0.08,
-                    str(val), ha="center", color="#1E293B", fontsize=11,
-                    fontweight="bold")
-    fig.tight_layout(pad=1.2)
-    chart_buf = io.BytesIO()
-    fig.savefig(chart_buf, format="png", dpi=140, facecolor="white")
-    plt.close(fig)
-    chart_buf.seek(0)
-
+    chart_buf = io.BytesIO(_severity_chart_png(tuple(sev_counts.values())))
     chart_img = _pil_to_rl(Image.open(chart_buf), usable_w * 0.75, 55 * mm)
     chart_img.hAlign = "CENTER"
     story.append(chart_img)
@@ -2,86 +2,30 @@
 NautiCAI — Underwater Infrastructure Inspection Copilot
 Run: streamlit run app/streamlit_app.py
 """
-import io, os, math, time, uuid, datetime, tempfile
+import io, os, math, time, uuid, datetime, tempfile, contextlib
 from pathlib import Path
-import cv2, numpy as np
+import cv2
 import streamlit as st
-from PIL import Image, ImageDraw, ImageFont, ImageEnhance
 import qrcode, matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
-from scipy.ndimage import gaussian_filter
-from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
-from reportlab.lib.units import mm
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
-from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer,
-    Table, TableStyle, Image as RLImage, HRFlowable, PageBreak)
 
 from pdf_report import build_pdf
-from huggingface_hub import hf_hub_download
+from mission_store import MissionStore, DB_PATH
+from export import detection_columns, export_detections, write_missions_parquet, CSV_COLUMNS
+import engine, model_registry, telemetry, ingest
+from video_mosaic import VideoMosaic
+from engine import (ROOT,
+    pil_to_cv, cv_to_pil, score_to_grade, compute_risk,
+    apply_clahe, apply_green_water, apply_turbidity,
+    apply_edge_estimator, apply_marine_snow, full_enhance, full_enhance_bgr, annotate_image, build_heatmap)
 
-ROOT = Path(__file__).resolve().parent.parent
 APP  = Path(__file__).resolve().parent
+EXPORTS = ROOT / "exports"
 
-# Auto-download model from Hugging Face
-if not os.path.exists(ROOT / "best.pt"):
-    print("Downloading model from Hugging Face...")
-    hf_hub_download(
-        repo_id="aishwarya252525/nauticai-yolov8",
-        filename="best.pt",
-        local_dir=str(ROOT),
-        local_dir_use_symlinks=False
-    )
-
-def _find_model():
-    for n in ["best.pt","yolov8s.pt","yolov8n.pt"]:
-        p = ROOT/n
-        if p.exists(): return p
-    return None
-MODEL_PATH = _find_model()
-
-DEFECT_CLASSES = [
-    "Corrosion","Crack","Marine Growth","Biofouling","Paint Damage","Pitting",
-    "Weld Defect","Anode Damage","Coating Failure","Dent","Deformation","Fracture",
-    "Spalling","Scaling","Disbondment","CP Failure","Leakage","Blockage","Foreign Object",
-    "Free Span","No Defect",
-]
-SEVERITY_MAP = {
-    "Corrosion":"Critical","Crack":"Critical","Fracture":"Critical","Leakage":"Critical",
-    "Marine Growth":"High","Biofouling":"High","Weld Defect":"High","Anode Damage":"High",
-    "CP Failure":"High","Pitting":"Medium","Paint Damage":"Medium","Coating Failure":"Medium",
-    "Deformation":"Medium","Blockage":"Medium","Dent":"Low","Scaling":"Low",
-    "Spalling":"Low","Disbondment":"Low","Foreign Object":"Low",
-    "Free Span":"Critical","No Defect":"Low",
-}
-CLASS_REMAP = {
-    "pipeline": "Corrosion",
-    "concrete": "Marine Growth",
-    "hull": "Paint Damage",
-    "propeller": "Biofouling",
-    "anode": "Anode Damage",
-    "leakage": "Leakage",
-    "anomaly": "Crack",
-    "biofouling": "Biofouling",
-    "bilge_keel": "Coating Failure",
-    "draft_mark": "Paint Damage",
-    "ropeguard": "Foreign Object",
-    "rudder": "Deformation",
-    "sea_chest": "Blockage",
-    "thruster_blades": "Weld Defect",
-    "thruster_grating": "Disbondment",
-    "flange": "Weld Defect",
-    "buoy": "Foreign Object",
-    "bend_restrictor": "Deformation",
-    "pipe_coupling": "Coating Failure",
-    "free_span": "Free Span",
-    "healthy": "No Defect",
-}
-SEV_COLORS = {"Critical":(220,50,50),"High":(255,165,0),"Medium":(0,180,255),"Low":(0,220,130)}
-PIPELINE_DEFECTS = ["Corrosion","Crack","Coating Failure","Pitting","Leakage","Weld Defect","Blockage"]
-CABLE_DEFECTS    = ["Fracture","Deformation","Foreign Object","Biofouling","Marine Growth","Dent"]
+# Auto-download model from Hugging Face (not needed when a shared inference server is configured)
+MODEL_PATH = engine.MODEL_PATH if engine.INFERENCE_URL else engine.ensure_model()
 
 st.set_page_config(
     page_title="NautiCAI · Underwater Inspection Copilot",
@@ -372,23 +316,40 @@ div[data-testid="stVerticalBlock"] > div:has(> div[data-testid="stHorizontalBloc
 def _init():
     d=dict(detections=[],annotated_img=None,original_img=None,enhanced_img=None,
            risk_score=0,grade="N/A",mission_id=f"M-{uuid.uuid4().hex[:6].upper()}",
-           vessel_name="",scan_time="",last_pdf=None,last_pdf_fname="",mission_history=[],
+           vessel_name="",scan_time="",last_pdf=None,last_pdf_fname="",
            hull_pdf=None,hull_pdf_fname="",
            pipe_pdf=None,pipe_pdf_fname="",
-           cable_pdf=None,cable_pdf_fname="")
+           cable_pdf=None,cable_pdf_fname="",
+           last_timings=None,last_profile=None)
     for k,v in d.items():
         if k not in st.session_state: st.session_state[k]=v
 _init()
 
+@st.cache_resource
+def get_mission_store(path=str(DB_PATH)):
+    return MissionStore(path)
+missions=get_mission_store()
+
+@st.cache_data(show_spinner=False)
+def render_trend_png(version):
+    """Trend chart from the store's downsampled buckets; re-rendered only when ``version`` changes."""
+    pts=missions.trend()
+    x=[p[0] for p in pts];mean=[p[1] for p in pts]
+    fig_d,ax_d=plt.subplots(figsize=(9,3),facecolor="#071427");ax_d.set_facecolor("#071427")
+    ax_d.plot(x,mean,color="#4cc9ff",linewidth=2,marker="o" if len(pts)<=60 else None,markersize=5)
+    ax_d.fill_between(x,[p[2] for p in pts],[p[3] for p in pts],alpha=.08,color="#4cc9ff")
+    for val,lbl,c2 in [(76,"Grade A","#34d399"),(51,"Grade B","#4cc9ff"),(26,"Grade C","#fbbf24")]:
+        ax_d.axhline(val,color=c2,linewidth=1,linestyle="--",alpha=.4,label=lbl)
+    ax_d.legend(fontsize=8,facecolor="#071427",labelcolor="#7f97b2")
+    ax_d.set_ylabel("Risk Score",color="#7f97b2",fontsize=10);ax_d.tick_params(colors="#7f97b2")
+    for sp in ax_d.spines.values(): sp.set_color("#1e3050")
+    fig_d.tight_layout();buf=io.BytesIO();fig_d.savefig(buf,format="png",dpi=110,facecolor="#071427");plt.close(fig_d)
+    return buf.getvalue()
+
 # ══════════════════════════════════════════════════════════════════════════
 # HELPERS
 # ══════════════════════════════════════════════════════════════════════════
-def pil_to_cv(img): return cv2.cvtColor(np.array(img.convert("RGB")),cv2.COLOR_RGB2BGR)
-def cv_to_pil(arr): return Image.fromarray(cv2.cvtColor(arr,cv2.COLOR_BGR2RGB))
-def score_to_grade(s): return "A" if s>=76 else "B" if s>=51 else "C" if s>=26 else "D"
 def grade_color_rl(g): return {"A":colors.HexColor("#34d399"),"B":colors.HexColor("#38bdf8"),"C":colors.HexColor("#fbbf24"),"D":colors.HexColor("#f87171")}.get(g,colors.grey)
-def sev_weight(s): return {"Critical":25,"High":12,"Medium":6,"Low":2}.get(s,0)
-def compute_risk(dets): return max(0,min(100,100-sum(sev_weight(d["severity"]) for d in dets)))
 def make_qr(data):
     qr=qrcode.QRCode(version=None,error_correction=qrcode.constants.ERROR_CORRECT_M,box_size=10,border=4)
     qr.add_data(data);qr.make(fit=True)
@@ -442,150 +403,21 @@ def ui_card_close():
     st.markdown('</div></div>', unsafe_allow_html=True)
 
 # ══════════════════════════════════════════════════════════════════════════
-# VISIBILITY PIPELINE
-# ══════════════════════════════════════════════════════════════════════════
-def apply_clahe(bgr,clip=3.0,grid=8):
-    lab=cv2.cvtColor(bgr,cv2.COLOR_BGR2LAB);l,a,b=cv2.split(lab)
-    l=cv2.createCLAHE(clipLimit=clip,tileGridSize=(grid,grid)).apply(l)
-    return cv2.cvtColor(cv2.merge([l,a,b]),cv2.COLOR_LAB2BGR)
-def apply_green_water(bgr,s=0.6):
-    o=bgr.astype(np.float32)
-    o[:,:,1]=np.clip(o[:,:,1]*(1+.4*s),0,255);o[:,:,0]=np.clip(o[:,:,0]*(1-.3*s),0,255);o[:,:,2]=np.clip(o[:,:,2]*(1+.15*s),0,255)
-    return o.astype(np.uint8)
-def apply_turbidity(bgr,level=0.4):
-    if level<.01: return bgr
-    bl=cv2.GaussianBlur(bgr,(0,0),sigmaX=level*12);sim=cv2.addWeighted(bgr,1-level*.7,bl,level*.7,0)
-    t=sim.astype(np.float32)
-    t[:,:,1]=np.clip(t[:,:,1]*(1+level*.35),0,255);t[:,:,0]=np.clip(t[:,:,0]*(1-level*.2),0,255);t[:,:,2]=np.clip(t[:,:,2]*(1-level*.3),0,255)
-    return np.clip(t*(1-level*.25),0,255).astype(np.uint8)
-def apply_turbidity_correction(bgr,level=0.4):
-    o=bgr.astype(np.float32)
-    o[:,:,0]=np.clip(o[:,:,0]/max(.01,1-level*.2),0,255);o[:,:,1]=np.clip(o[:,:,1]/max(.01,1+level*.35),0,255);o[:,:,2]=np.clip(o[:,:,2]/max(.01,1-level*.3),0,255)
-    return np.clip(o/max(.01,1-level*.25),0,255).astype(np.uint8)
-def apply_edge_estimator(bgr):
-    gray=cv2.cvtColor(bgr,cv2.COLOR_BGR2GRAY);edges=cv2.Canny(gray,50,150)
-    ec=cv2.cvtColor(edges,cv2.COLOR_GRAY2BGR);ec[:,:,0]=0;ec[:,:,2]=0;ec[:,:,1]=edges
-    return cv2.addWeighted(bgr,.75,ec,.8,0)
-def apply_marine_snow(pil_img, intensity=0.5):
-    img_array = np.array(pil_img)
-    num_particles = int(300 * intensity)
-    for _ in range(num_particles):
-        x = np.random.randint(0, img_array.shape[1])
-        y = np.random.randint(0, img_array.shape[0])
-        radius = np.random.randint(1, 4)
-        brightness = np.random.randint(150, 255)
-        cv2.circle(img_array, (x, y), radius,
-                  (brightness, brightness, brightness), -1)
-    return Image.fromarray(img_array)
-def full_enhance(pil_img,use_clahe,use_green,turb_in,corr_turb,use_edge,clahe_clip=3.0):
-    bgr=pil_to_cv(pil_img)
-    if turb_in>.01: bgr=apply_turbidity(bgr,turb_in)
-    if corr_turb and turb_in>.01: bgr=apply_turbidity_correction(bgr,turb_in*.85)
-    if use_green: bgr=apply_green_water(bgr)
-    if use_clahe: bgr=apply_clahe(bgr,clip=clahe_clip)
-    if use_edge:  bgr=apply_edge_estimator(bgr)
-    return cv_to_pil(bgr)
-
-# ══════════════════════════════════════════════════════════════════════════
-# DETECTION
+# DETECTION (engine.py — Streamlit wrappers)
 # ══════════════════════════════════════════════════════════════════════════
 @st.cache_resource(show_spinner="Loading YOLO model…")
-def load_yolo(path):
-    from ultralytics import YOLO
-    return YOLO(path)
-def _detect_real(img,conf_thr,iou_thr):
-    try:
-        model=load_yolo(str(MODEL_PATH));results=model.predict(img,conf=conf_thr,iou=iou_thr,verbose=False)[0];dets=[]
-        det_id=0
-        for i,box in enumerate(results.boxes):
-            x1,y1,x2,y2=map(int,box.xyxy[0].tolist());conf=float(box.conf[0]);cls_i=int(box.cls[0])
-            # Skip boxes covering more than 70% of image
-            img_w,img_h=img.width if hasattr(img,'width') else img.shape[1],img.height if hasattr(img,'height') else img.shape[0]
-            box_area=(x2-x1)*(y2-y1);img_area=img_w*img_h;coverage=box_area/img_area if img_area>0 else 0
-            if coverage>0.50 or coverage<0.005:
-                continue
-            cls_name=model.names.get(cls_i,DEFECT_CLASSES[cls_i%len(DEFECT_CLASSES)])
-            cls=CLASS_REMAP.get(cls_name,CLASS_REMAP.get(cls_name.lower(),cls_name));sev=SEVERITY_MAP.get(cls,"Medium")
-            det_id+=1
-            dets.append(dict(id=det_id,cls=cls,severity=sev,conf=conf,x1=x1,y1=y1,x2=x2,y2=y2,area=box_area))
-        return dets
-    except Exception as e:
-        st.warning(f"YOLO error: {e}"); return []
-def _detect_synthetic(img,conf_thr,pool):
-    w,h=img.size;rng=np.random.default_rng(sum(img.tobytes()[:64]));n=rng.integers(3,9);dets=[]
-    for i in range(n):
-        cx,cy=rng.integers(60,w-60),rng.integers(60,h-60);bw,bh=rng.integers(40,w//4),rng.integers(30,h//5)
-        conf=rng.uniform(conf_thr,.98);cls=rng.choice(pool);sev=SEVERITY_MAP.get(cls,"Medium")
-        x1,y1=max(0,cx-bw//2),max(0,cy-bh//2);x2,y2=min(w,cx+bw//2),min(h,cy+bh//2)
-        dets.append(dict(id=i+1,cls=cls,severity=sev,conf=float(conf),x1=x1,y1=y1,x2=x2,y2=y2,area=(x2-x1)*(y2-y1)))
-    return dets
-def run_detection(img,conf_thr,iou_thr,mode):
-    pool=(PIPELINE_DEFECTS if mode=="pipeline" else CABLE_DEFECTS if mode=="cable" else DEFECT_CLASSES)
-    if MODEL_PATH:
-        dets=_detect_real(img,conf_thr,iou_thr)
-        if dets: return dets
-    return _detect_synthetic(img,conf_thr,pool)
-
-# ══════════════════════════════════════════════════════════════════════════
-# ANNOTATION + HEATMAP
-# ══════════════════════════════════════════════════════════════════════════
-def annotate_image(pil_img,dets):
-    # Convert to RGBA for transparency support
-    img = pil_img.copy().convert("RGBA")
-    overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
-    draw = ImageDraw.Draw(overlay)
-
-    SEVERITY_COLORS = {
-        "Critical": (255, 50, 50),
-        "High": (255, 165, 0),
-        "Medium": (30, 144, 255),
-        "Low": (50, 205, 50)
-    }
-
-    for det in dets:
-        x1 = int(det['x1'])
-        y1 = int(det['y1'])
-        x2 = int(det['x2'])
-        y2 = int(det['y2'])
-        sev = det.get('severity', 'Medium')
-        color = SEVERITY_COLORS.get(sev, (30, 144, 255))
-
-        # Transparent fill
-        draw.rectangle(
-            [x1, y1, x2, y2],
-            fill=(*color, 40),      # 40 = very transparent
-            outline=(*color, 255),  # solid border
-            width=3
-        )
-
-        # Label text
-        label = f"[{det['id']:02d}] {det['cls']} {det['conf']*100:.0f}%"
-        draw.rectangle([x1, y1-20, x1+len(label)*7, y1],
-                      fill=(*color, 200))
-        draw.text((x1+2, y1-18), label, fill=(255,255,255,255))
-
-    # Blend overlay onto original
-    result = Image.alpha_composite(img, overlay)
-    return result.convert("RGB")
-
-def build_heatmap(img,dets):
-    W,H=img.size;heat=np.zeros((H,W),dtype=np.float32)
-    # Place all weighted detection centres on the heat array first
-    for d in dets:
-        cx=min(W-1,max(0,(d["x1"]+d["x2"])//2));cy=min(H-1,max(0,(d["y1"]+d["y2"])//2))
-        heat[cy,cx]+=float(sev_weight(d["severity"]))
-    # Apply a single gaussian filter (fast even for thousands of detections)
-    if heat.max()>0:
-        avg_area=np.mean([d.get("area",3000) for d in dets]) if dets else 3000
-        sig=max(30,math.sqrt(avg_area)*.35)
-        heat=gaussian_filter(heat,sigma=sig)
-        heat=(heat/heat.max()*255).astype(np.uint8)
-    cmap=matplotlib.colormaps.get_cmap("plasma")
-    hmap=(cmap(heat/255.0)[:,:,:3]*255).astype(np.uint8)
-    dark=ImageEnhance.Brightness(img).enhance(.4)
-    return Image.blend(dark,Image.fromarray(hmap).resize((W,H)),alpha=.62)
-
-# PDF report builder is now in pdf_report.py (imported at top)
+def load_yolo(path): return engine.load_yolo(path)
+def run_detection(img,conf_thr,iou_thr,mode,info=None):
+    if engine.INFERENCE_URL:
+        return engine.run_detection(img,conf_thr,iou_thr,mode,on_error=lambda e: st.warning(f"YOLO error: {e}"))
+    path=MODEL_CHOICE["path"]
+    if path: load_yolo(path)
+    return engine.run_detection(img,conf_thr,iou_thr,mode,model_path=path,imgsz=MODEL_CHOICE["imgsz"],roi=use_roi,
+                                on_error=lambda e: st.warning(f"YOLO error: {e}"),info=info)
+def roi_caption(info,img):
+    """Caption for the ROI band the detector was actually run on (nothing when ROI wasn't applied)."""
+    r=info.get("roi")
+    if r: st.caption(f"ROI: {(r[2]-r[0])*(r[3]-r[1])/(img.width*img.height)*100:.0f}% of frame analysed")
 
 # ══════════════════════════════════════════════════════════════════════════
 # SIDEBAR
@@ -611,14 +443,35 @@ with st.sidebar:
 
     st.markdown("<div style='height:10px'></div>", unsafe_allow_html=True)
 
-    if MODEL_PATH:
-      st.info(f"🧠 `{MODEL_PATH.name}` · Active")
+    MODEL_CHOICE={"model":None,"path":None,"imgsz":engine.DEFAULT_IMGSZ,"reason":"remote"}
+    if engine.INFERENCE_URL:
+      st.info(f"🛰️ Inference server · `{engine.INFERENCE_URL}`")
+    elif MODEL_PATH:
+      budget_lbl=st.selectbox("Latency budget",list(model_registry.BUDGETS),
+                              help="Picks the model and input size profiled on this host that fits the budget")
+      MODEL_CHOICE=model_registry.select(model_registry.BUDGETS[budget_lbl])
+      st.info(f"🧠 `{model_registry.describe(MODEL_CHOICE)}` · Active")
+      st.caption(MODEL_CHOICE["reason"])
+      if st.button("⏱️ Profile models on this host",use_container_width=True):
+          with st.spinner("Profiling weights × input sizes…"):
+              model_registry.profile(log=lambda *_: None)
+          st.rerun()
+      # Load + warm up now so the operator's first scan runs at steady-state speed
+      load_yolo(MODEL_CHOICE["path"]);lat=engine.latency_report(MODEL_CHOICE["path"])
+      if lat.get("first_ms"):
+          st.caption(f"Warm-up {lat['passes']}× @ {', '.join(lat['sizes'])}: first {lat['first_ms']:.0f} ms → "
+                     f"steady {lat['steady_ms'] or lat['first_ms']:.0f} ms"
+                     +(f" · first scan {lat['first_scan_ms']:.0f} ms · median {lat['median_scan_ms']:.0f} ms" if lat.get("scans") else ""))
     else:
         st.warning("⚠️ No model — demo mode")
 
     st.markdown("#### Detection Engine")
-    conf_thr=st.slider("Confidence Threshold",0.05,0.95,0.25,0.05)
-    iou_thr =st.slider("IoU Threshold",0.10,0.90,0.45,0.05)
+    conf_thr=st.slider("Confidence Threshold",0.05,0.95,float(engine.DETECT_CONFIG["conf"]),0.05)
+    iou_thr =st.slider("IoU Threshold",0.10,0.90,float(engine.DETECT_CONFIG["iou"]),0.05)
+    if engine.DETECT_CONFIG_PATH.exists():
+        st.caption(f"Defaults tuned by sweep · coverage {engine.COVERAGE_MIN:g}–{engine.COVERAGE_MAX:g}")
+    use_roi =st.toggle("ROI Inference (Pipeline / Cable)",value=engine.ROI_ENABLED,
+                       help="Detect only inside the band of dominant straight edges — faster, fewer seabed false positives")
     st.divider()
     st.markdown("#### Severity Filter")
     sev_filter=st.selectbox("Display mode",["All Detections","Critical Only","High+","Medium+"])
@@ -640,6 +493,10 @@ with st.sidebar:
         ["hull","pipeline","cable","port","general"],
         format_func=lambda x:{"hull":"Hull Inspection","pipeline":"Pipeline","cable":"Subsea Cable","port":"Port Infra","general":"General"}[x]
     )
+    st.divider()
+    st.markdown("#### Diagnostics")
+    profile_scan=st.toggle("Profile Scans",value=False,help="Capture a cProfile / pyinstrument report for each Infrastructure Scan")
+    profile_kind=st.selectbox("Profiler",["cprofile","pyinstrument"],disabled=not profile_scan)
 
 # ══════════════════════════════════════════════════════════════════════════
 # TOP BAR
@@ -675,31 +532,40 @@ with tab_scan:
     ui_card_close()
 
     if uploaded and go:
-        pil_orig=Image.open(uploaded).convert("RGB");st.session_state.original_img=pil_orig
         prog=st.progress(0,"Initialising…")
-        with st.spinner("Applying visibility filters…"):
-            prog.progress(20)
-            enhanced=full_enhance(pil_orig,use_clahe,use_green,turbidity_in,corr_turb,use_edge,clahe_clip)
-            if marine_snow:
-                enhanced=apply_marine_snow(enhanced,intensity=0.5)
-            st.session_state.enhanced_img=enhanced
-        with st.spinner("Running YOLOv8 detection…"):
-            prog.progress(55)
-            dets=run_detection(enhanced,conf_thr,iou_thr,scan_mode)
-        SEV_RANK={"Critical":4,"High":3,"Medium":2,"Low":1}
-        if sev_filter=="Critical Only": dets=[d for d in dets if d["severity"]=="Critical"]
-        elif sev_filter=="High+":       dets=[d for d in dets if SEV_RANK[d["severity"]]>=3]
-        elif sev_filter=="Medium+":     dets=[d for d in dets if SEV_RANK[d["severity"]]>=2]
-        with st.spinner("Annotating image…"):
-            prog.progress(80)
-            annotated=annotate_image(enhanced,dets)
+        # Progress advances by each finished stage's share of the expected scan time (running means)
+        _stages=("decode","enhance","detect","annotate");_exp={k:telemetry.mean_ms(k) or 1.0 for k in _stages}
+        def _tick(stage,ms,tr):
+            done=sum(_exp[k] for k in tr.timings if k in _exp)
+            prog.progress(min(done/sum(_exp.values()),.99),f"{stage} · {ms:.0f} ms")
+        trace=telemetry.Trace(on_span=_tick)
+        with (telemetry.capture_profile(profile_kind) if profile_scan else contextlib.nullcontext({})) as _prof:
+            with trace.span("decode"):
+                # One BGR buffer at working resolution; enhancement and YOLO read it directly
+                bgr=ingest.load_bgr(uploaded);pil_orig=cv_to_pil(bgr);st.session_state.original_img=pil_orig
+            with st.spinner("Applying visibility filters…"), trace.span("enhance"):
+                enh_bgr=full_enhance_bgr(bgr,use_clahe,use_green,turbidity_in,corr_turb,use_edge,clahe_clip)
+                enhanced=cv_to_pil(enh_bgr)
+                if marine_snow:
+                    enhanced=apply_marine_snow(enhanced,intensity=0.5);enh_bgr=pil_to_cv(enhanced)
+                st.session_state.enhanced_img=enhanced
+            with st.spinner("Running YOLOv8 detection…"), trace.span("detect"):
+                dets=run_detection(enh_bgr,conf_thr,iou_thr,scan_mode)
+            SEV_RANK={"Critical":4,"High":3,"Medium":2,"Low":1}
+            if sev_filter=="Critical Only": dets=[d for d in dets if d["severity"]=="Critical"]
+            elif sev_filter=="High+":       dets=[d for d in dets if SEV_RANK[d["severity"]]>=3]
+            elif sev_filter=="Medium+":     dets=[d for d in dets if SEV_RANK[d["severity"]]>=2]
+            with st.spinner("Annotating image…"), trace.span("annotate"):
+                annotated=annotate_image(enhanced,dets)
+        st.session_state.update(last_timings=trace.as_dict(),last_profile=_prof.get("text"))
+        telemetry.write_metrics(extra={"missions":missions.count()})
         risk=compute_risk(dets);grade=score_to_grade(risk)
         st.session_state.update(detections=dets,annotated_img=annotated,risk_score=risk,grade=grade,
             vessel_name=vessel_name,scan_time=datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
             mission_id=f"M-{uuid.uuid4().hex[:6].upper()}",last_pdf=None,last_pdf_fname="")
-        st.session_state.mission_history.append(dict(id=st.session_state.mission_id,
+        missions.add_mission(dict(id=st.session_state.mission_id,
             vessel=vessel_name or "Unknown",date=st.session_state.scan_time,
-            score=risk,grade=grade,detections=len(dets),mode=scan_mode))
+            score=risk,grade=grade,detections=len(dets),mode=scan_mode,timings=trace.as_dict()),dets)
         prog.progress(100);time.sleep(.3);prog.empty()
         st.success(f"Scan complete — {len(dets)} anomalies detected · Risk {risk}/100 · Grade {grade}")
 
@@ -723,9 +589,26 @@ with tab_scan:
             if st.session_state.annotated_img:
                 st.image(st.session_state.annotated_img,caption="Annotated Output",use_container_width=True)
         with cb:
-            st.image(build_heatmap(st.session_state.enhanced_img,dets),caption="Risk Heatmap",use_container_width=True)
+            with telemetry.span("heatmap"):
+                _scan_hmap=build_heatmap(st.session_state.enhanced_img,dets)
+            st.image(_scan_hmap,caption="Risk Heatmap",use_container_width=True)
         ui_card_close()
 
+        with st.expander("⏱️ Performance"):
+            _lt=st.session_state.last_timings
+            if _lt:
+                _tc=st.columns(len(_lt))
+                for col_t,(k,v) in zip(_tc,_lt.items()): col_t.metric(k.title(),f"{v:.0f} ms")
+            _hist=missions.timings(50)
+            if _hist:
+                import pandas as pd
+                _hdf=pd.DataFrame(_hist).drop(columns=["id"])
+                st.caption(f"Mean stage time over the last {len(_hdf)} timed missions (ms)")
+                st.dataframe(_hdf.groupby("mode").mean(numeric_only=True).round(1),use_container_width=True)
+            st.caption(f"Prometheus metrics → `{telemetry.METRICS_PATH}`")
+            if st.session_state.last_profile:
+                st.code(st.session_state.last_profile[:20000],language="text")
+
         msg=("Critical — Immediate action required" if grade=="D"
              else "High Risk — Maintenance within 7 days" if grade=="C"
              else "Moderate Risk" if grade=="B" else "Healthy")
@@ -793,7 +676,7 @@ with tab_hull:
     ui_card_close()
 
     if h_up:
-        h_img=Image.open(h_up).convert("RGB")
+        h_img=ingest.load_rgb(h_up)
         st.markdown("<div style='height:10px'></div>", unsafe_allow_html=True)
 
         ui_card_open()
@@ -806,21 +689,23 @@ with tab_hull:
         ui_card_close()
 
         st.markdown("<div style='height:10px'></div>", unsafe_allow_html=True)
+        hull_tr=telemetry.Trace()
         with st.spinner("Running hull detection…"):
-            enh=full_enhance(h_img,use_clahe,use_green,turbidity_in,corr_turb,use_edge,clahe_clip)
-            if marine_snow:
-                enh=apply_marine_snow(enh,intensity=0.5)
-            hd=run_detection(enh,conf_thr,iou_thr,"hull")
-            ha=annotate_image(enh,hd)
+            with hull_tr.span("enhance"):
+                enh=full_enhance(h_img,use_clahe,use_green,turbidity_in,corr_turb,use_edge,clahe_clip)
+                if marine_snow:
+                    enh=apply_marine_snow(enh,intensity=0.5)
+            with hull_tr.span("detect"): hd=run_detection(enh,conf_thr,iou_thr,"hull")
+            with hull_tr.span("annotate"): ha=annotate_image(enh,hd)
         rh=compute_risk(hd);gh=score_to_grade(rh)
-        hull_hmap=build_heatmap(enh,hd)
+        with hull_tr.span("heatmap"): hull_hmap=build_heatmap(enh,hd)
 
         # Log hull inspection to mission history (dedup by file identity)
         _hull_key=f"hull_{h_up.name}_{h_up.size}"
-        if not any(m.get("_src")==_hull_key for m in st.session_state.mission_history):
+        if not missions.has_source(_hull_key):
             hull_scan_time=datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
             hull_mission_id=f"HULL-{uuid.uuid4().hex[:6].upper()}"
-            st.session_state.mission_history.append(dict(
+            missions.add_mission(dict(
                 id=hull_mission_id,
                 vessel=vessel_name or "Unknown",
                 date=hull_scan_time,
@@ -828,7 +713,8 @@ with tab_hull:
                 detections=len(hd),
                 mode="hull",
                 _src=_hull_key,
-            ))
+                timings=hull_tr.as_dict(),
+            ),hd)
 
         ui_card_open()
         ch1,ch2,ch3=st.columns(3)
@@ -849,7 +735,7 @@ with tab_hull:
                         hull_mid,
                         vessel_name or "Unknown",
                         inspector, "hull", hd, h_img, ha, hull_hmap,
-                        rh, gh, conf_thr, iou_thr
+                        rh, gh, conf_thr, iou_thr, model_info=MODEL_CHOICE
                     )
                     st.session_state.hull_pdf=hull_pdf_bytes
                     st.session_state.hull_pdf_fname=(
@@ -897,23 +783,27 @@ with tab_video:
         c1,c2,c3,c4=st.columns(4)
         c1.metric("Total Frames",total);c2.metric("FPS",f"{fps_v:.1f}");c3.metric("Resolution",f"{wv}×{hv}");c4.metric("Duration",f"{total/fps_v:.1f}s")
         sample_n=st.slider("Sample every N frames",5,30,10)
+        use_mosaic=st.toggle("Build hull mosaic",value=scan_mode=="hull",help="Register sampled frames into one mosaic (ORB + homography) and report every defect at its place on the asset")
         if st.button("Analyse Video",type="primary",use_container_width=True):
             prog2=st.progress(0);frames=[];all_video_dets=[];fn=0;det_id_offset=0
-            first_pil_frame=None
+            first_pil_frame=None;vm=VideoMosaic() if use_mosaic else None
+            video_tr=telemetry.Trace()   # stage totals over all sampled frames
             while True:
-                ret,frame=cap.read()
+                with video_tr.span("decode"): ret,frame=cap.read()
                 if not ret: break
                 if fn%sample_n==0:
-                    pf=cv_to_pil(frame)
-                    if first_pil_frame is None: first_pil_frame=pf
-                    ef=full_enhance(pf,use_clahe,use_green,turbidity_in,corr_turb,use_edge)
-                    df_v=run_detection(ef,conf_thr,iou_thr,scan_mode)
+                    if first_pil_frame is None: first_pil_frame=cv_to_pil(frame)
+                    with video_tr.span("enhance"): eb=full_enhance_bgr(frame,use_clahe,use_green,turbidity_in,corr_turb,use_edge)
+                    with video_tr.span("detect"): df_v=run_detection(eb,conf_thr,iou_thr,scan_mode)
+                    ef=cv_to_pil(eb)
                     # Re-number detection IDs globally across all frames
                     for d in df_v:
                         det_id_offset+=1; d["id"]=det_id_offset
                         d["frame"]=fn
                     all_video_dets.extend(df_v)
-                    af=annotate_image(ef,df_v)
+                    if vm is not None:
+                        with video_tr.span("mosaic"): vm.add(eb,df_v,fn,original=frame)
+                    with video_tr.span("annotate"): af=annotate_image(ef,df_v)
                     frames.append((fn,af,df_v,ef));prog2.progress(min(fn/max(total,1),.99))
                 fn+=1
             cap.release()
@@ -928,12 +818,25 @@ with tab_video:
                 nd2=sum(1 for d in all_video_dets if d.get("frame")==fn2)
                 col_f.image(ann2,caption=f"Frame {fn2} · {nd2} det.",use_container_width=True)
 
+            # ── Hull mosaic: one asset image with every defect at its position ──
+            mos=None
+            if vm is not None and vm.registered>=2:
+                with st.spinner("Rendering hull mosaic…"), video_tr.span("mosaic"): mos=vm.render()
+                cm1,cm2=st.columns(2)
+                cm1.image(mos["annotated"],caption=f"Hull mosaic · {len(mos['detections'])} defects ({mos['raw_detections']} sightings)",use_container_width=True)
+                cm2.image(mos["heatmap"],caption="Mosaic risk heatmap",use_container_width=True)
+                st.caption(f"{mos['registered']}/{mos['frames']} sampled frames registered"+(f" · {mos['lost']} could not be matched and were placed on the previous frame" if mos["lost"] else ""))
+            elif vm is not None and frames:
+                st.info("Too few frames could be registered for a mosaic — reporting the best single frame instead.")
+
             # ── Write results to session state so Report tab picks them up ──
             # Pick the frame with the most detections as representative
+            # (the mosaic, when built, replaces it: merged detections in mosaic coordinates)
             if frames:
                 best_frame=max(frames,key=lambda f:len(f[2]))
                 best_annot=best_frame[1]   # annotated PIL
                 best_enhanced=best_frame[3] # enhanced PIL
+                if mos: all_video_dets,best_annot,first_pil_frame,best_enhanced=mos["detections"],mos["annotated"],mos["original"],mos["mosaic"]
                 risk_v=compute_risk(all_video_dets);grade_v=score_to_grade(risk_v)
                 st.session_state.update(
                     detections=all_video_dets,
@@ -948,14 +851,15 @@ with tab_video:
                     last_pdf=None,
                     last_pdf_fname="",
                 )
-                st.session_state.mission_history.append(dict(
+                missions.add_mission(dict(
                     id=st.session_state.mission_id,
                     vessel=vessel_name or "Unknown",
                     date=st.session_state.scan_time,
                     score=risk_v,grade=grade_v,
                     detections=len(all_video_dets),
                     mode=f"video/{scan_mode}",
-                ))
+                    timings=video_tr.as_dict(),
+                ),all_video_dets)
         ui_card_close()
 
 # ─── PIPELINE ────────────────────────────────────────────────────────────
@@ -978,7 +882,7 @@ with tab_pipe:
     ui_card_close()
 
     if p_up:
-        p_img=Image.open(p_up).convert("RGB")
+        p_img=ingest.load_rgb(p_up)
         st.markdown("<div style='height:10px'></div>", unsafe_allow_html=True)
 
         ui_card_open()
@@ -986,18 +890,21 @@ with tab_pipe:
         with col_po: st.image(p_img,caption="Original",use_container_width=True)
         with col_pa:
             with st.spinner("Running pipeline detection…"):
-                pe=full_enhance(p_img,use_clahe,use_green,turbidity_in,corr_turb,use_edge,clahe_clip)
-                pd_=run_detection(pe,conf_thr,iou_thr,"pipeline");pa=annotate_image(pe,pd_)
+                pipe_tr=telemetry.Trace()
+                with pipe_tr.span("enhance"): pe=full_enhance(p_img,use_clahe,use_green,turbidity_in,corr_turb,use_edge,clahe_clip)
+                with pipe_tr.span("detect"): pipe_info={};pd_=run_detection(pe,conf_thr,iou_thr,"pipeline",info=pipe_info)
+                with pipe_tr.span("annotate"): pa=annotate_image(pe,pd_)
             st.image(pa,caption="Annotated Output",use_container_width=True)
+            roi_caption(pipe_info,pe)
         rp=compute_risk(pd_);gp=score_to_grade(rp)
-        pipe_hmap=build_heatmap(pe,pd_)
+        with pipe_tr.span("heatmap"): pipe_hmap=build_heatmap(pe,pd_)
 
         # Log pipeline inspection to mission history (dedup by file identity)
         _pipe_key=f"pipe_{p_up.name}_{p_up.size}"
-        if not any(m.get("_src")==_pipe_key for m in st.session_state.mission_history):
+        if not missions.has_source(_pipe_key):
             pipe_scan_time=datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
             pipe_mission_id=f"PIPE-{uuid.uuid4().hex[:6].upper()}"
-            st.session_state.mission_history.append(dict(
+            missions.add_mission(dict(
                 id=pipe_mission_id,
                 vessel=vessel_name or "Unknown",
                 date=pipe_scan_time,
@@ -1005,7 +912,8 @@ with tab_pipe:
                 detections=len(pd_),
                 mode="pipeline",
                 _src=_pipe_key,
-            ))
+                timings=pipe_tr.as_dict(),
+            ),pd_)
 
         c1,c2,c3=st.columns(3);c1.metric("Risk Score",f"{rp}/100");c2.metric("Grade",gp);c3.metric("Anomalies",len(pd_))
         st.markdown("""<div style='font-size:11px;font-weight:800;color:var(--muted2);letter-spacing:.8px;text-transform:uppercase;margin:14px 0 8px'>Detection Results</div>""",unsafe_allow_html=True)
@@ -1025,7 +933,7 @@ with tab_pipe:
                         pipe_mid,
                         vessel_name or "Unknown",
                         inspector, "pipeline", pd_, p_img, pa, pipe_hmap,
-                        rp, gp, conf_thr, iou_thr
+                        rp, gp, conf_thr, iou_thr, model_info=MODEL_CHOICE
                     )
                     st.session_state.pipe_pdf=pipe_pdf_bytes
                     st.session_state.pipe_pdf_fname=(
@@ -1056,24 +964,27 @@ with tab_cable:
     ui_card_close()
 
     if c_up:
-        c_img=Image.open(c_up).convert("RGB")
+        c_img=ingest.load_rgb(c_up)
         ui_card_open()
         cc1,cc2=st.columns(2)
         with cc1: st.image(c_img,caption="Original",use_container_width=True)
         with cc2:
             with st.spinner("Running cable detection…"):
-                ce=full_enhance(c_img,use_clahe,use_green,turbidity_in,corr_turb,True)
-                cd=run_detection(ce,conf_thr,iou_thr,"cable");ca=annotate_image(ce,cd)
+                cable_tr=telemetry.Trace()
+                with cable_tr.span("enhance"): ce=full_enhance(c_img,use_clahe,use_green,turbidity_in,corr_turb,True)
+                with cable_tr.span("detect"): cable_info={};cd=run_detection(ce,conf_thr,iou_thr,"cable",info=cable_info)
+                with cable_tr.span("annotate"): ca=annotate_image(ce,cd)
             st.image(ca,caption=f"{len(cd)} anomalies detected",use_container_width=True)
+            roi_caption(cable_info,ce)
         rc=compute_risk(cd);gc=score_to_grade(rc)
-        cable_hmap=build_heatmap(ce,cd)
+        with cable_tr.span("heatmap"): cable_hmap=build_heatmap(ce,cd)
 
         # Log cable inspection to mission history (dedup by file identity)
         _cable_key=f"cable_{c_up.name}_{c_up.size}"
-        if not any(m.get("_src")==_cable_key for m in st.session_state.mission_history):
+        if not missions.has_source(_cable_key):
             cable_scan_time=datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
             cable_mission_id=f"CABLE-{uuid.uuid4().hex[:6].upper()}"
-            st.session_state.mission_history.append(dict(
+            missions.add_mission(dict(
                 id=cable_mission_id,
                 vessel=vessel_name or "Unknown",
                 date=cable_scan_time,
@@ -1081,7 +992,8 @@ with tab_cable:
                 detections=len(cd),
                 mode="cable",
                 _src=_cable_key,
-            ))
+                timings=cable_tr.as_dict(),
+            ),cd)
 
         cx1,cx2,cx3=st.columns(3);cx1.metric("Risk Score",f"{rc}/100");cx2.metric("Grade",gc);cx3.metric("Anomalies",len(cd))
         import pandas as pd
@@ -1100,7 +1012,7 @@ with tab_cable:
                         cable_mid,
                         vessel_name or "Unknown",
                         inspector, "cable", cd, c_img, ca, cable_hmap,
-                        rc, gc, conf_thr, iou_thr
+                        rc, gc, conf_thr, iou_thr, model_info=MODEL_CHOICE
                     )
                     st.session_state.cable_pdf=cable_pdf_bytes
                     st.session_state.cable_pdf_fname=(
@@ -1136,39 +1048,58 @@ with tab_dash:
     )
     st.divider()
 
-    history=st.session_state.mission_history
-    if history:
+    summary=missions.summary()
+    if summary["missions"]:
         import pandas as pd
-        df_h=pd.DataFrame([{k:v for k,v in m.items() if k!="_src"} for m in history])
-        df_h.columns=[c.upper() for c in df_h.columns]
         ui_card_open()
         c1,c2,c3,c4=st.columns(4)
-        c1.metric("Total Missions",len(history))
-        c2.metric("Avg Risk Score",f"{sum(m['score'] for m in history)//len(history)}/100")
-        c3.metric("Total Detections",sum(m['detections'] for m in history))
-        c4.metric("Critical Missions",sum(1 for m in history if m['grade']=="D"))
+        c1.metric("Total Missions",summary["missions"])
+        c2.metric("Avg Risk Score",f"{summary['avg_score']}/100",
+                  delta=f"{summary['rolling_avg']-summary['avg_score']:+.1f} last {summary['rolling_n']}")
+        c3.metric("Total Detections",summary["detections"])
+        c4.metric("Critical Missions",summary["critical"])
         st.divider()
+        f1,f2,f3=st.columns([2,2,1])
+        with f1: f_vessel=st.selectbox("Vessel",["All"]+missions.vessels(),key="dash_vessel")
+        with f2: f_grade=st.multiselect("Grade",["A","B","C","D"],key="dash_grade")
+        filters=dict(vessel=None if f_vessel=="All" else f_vessel,grade=f_grade or None)
+        n_rows=missions.count(**filters);page_size=50
+        with f3: page=st.number_input("Page",1,max(1,math.ceil(n_rows/page_size)),1,key="dash_page")
+        df_h=pd.DataFrame(missions.page(page-1,page_size,**filters))
+        df_h.columns=[c.upper() for c in df_h.columns]
         st.dataframe(df_h,hide_index=True,use_container_width=True)
-        if len(history)>1:
-            fig_d,ax_d=plt.subplots(figsize=(9,3),facecolor="#071427");ax_d.set_facecolor("#071427")
-            x=range(len(history))
-            ax_d.plot(x,[m["score"] for m in history],color="#4cc9ff",linewidth=2,marker="o",markersize=5)
-            ax_d.fill_between(x,[m["score"] for m in history],alpha=.08,color="#4cc9ff")
-            for val,lbl,c2 in [(76,"Grade A","#34d399"),(51,"Grade B","#4cc9ff"),(26,"Grade C","#fbbf24")]:
-                ax_d.axhline(val,color=c2,linewidth=1,linestyle="--",alpha=.4,label=lbl)
-            ax_d.legend(fontsize=8,facecolor="#071427",labelcolor="#7f97b2")
-            ax_d.set_ylabel("Risk Score",color="#7f97b2",fontsize=10);ax_d.tick_params(colors="#7f97b2")
-            for sp in ax_d.spines.values(): sp.set_color("#1e3050")
-            fig_d.tight_layout();st.pyplot(fig_d,use_container_width=True)
+        st.caption(f"{n_rows} missions · page {page} of {max(1,math.ceil(n_rows/page_size))} · {DB_PATH.name}")
+        if summary["missions"]>1:
+            st.image(render_trend_png((summary["missions"],summary["avg_score"],summary["rolling_avg"])),use_container_width=True)
+        with st.expander("Per-vessel and per-mode summary"):
+            g1,g2=st.columns(2)
+            with g1: st.dataframe(pd.DataFrame(missions.group_summary("vessel")),hide_index=True,use_container_width=True)
+            with g2: st.dataframe(pd.DataFrame(missions.group_summary("mode")),hide_index=True,use_container_width=True)
+        if st.button("Export mission history (Parquet)",key="dash_export"):
+            try:
+                EXPORTS.mkdir(parents=True,exist_ok=True)
+                _mp=write_missions_parquet(EXPORTS/"NautiCAI_missions.parquet",missions,**filters)
+                with open(_mp,"rb") as fh:
+                    st.download_button("⬇️  Download missions.parquet",data=fh,file_name=_mp.name,
+                        mime="application/vnd.apache.parquet",key="dash_export_dl")
+            except ImportError as e:
+                st.warning(str(e))
         ui_card_close()
     else:
         st.info("No missions yet — run a scan on the Infrastructure Scan tab.")
 
-    with st.expander("Model Performance Metrics — YOLOv8s"):
-        mets={"Precision":.942,"Recall":.891,"mAP@0.5":.914,"mAP@0.5:0.95":.783,"F1 Score":.916}
+    ev=model_registry.eval_metrics()
+    with st.expander(f"Model Performance Metrics — {ev['model'] if ev else 'YOLOv8s'}"):
+        if ev: mets={"Precision":ev["precision"],"Recall":ev["recall"],"mAP@0.5":ev["map50"],"mAP@0.5:0.95":ev["map"],"F1 Score":ev["f1"]}
+        else:  mets={"Precision":.942,"Recall":.891,"mAP@0.5":.914,"mAP@0.5:0.95":.783,"F1 Score":.916}
         cols_m=st.columns(len(mets))
         for col_m,(k,v) in zip(cols_m,mets.items()): col_m.metric(k,f"{v*100:.1f}%")
-        st.caption(f"Model: `{MODEL_PATH.name if MODEL_PATH else 'Demo'}` · Inference: 28ms @ 640×640")
+        if ev: st.caption(f"Evaluated {ev['date']} on {ev['images']} `{ev['split']}` images ({ev['instances']} boxes) · "
+                          f"conf {ev['conf']} · IoU {ev['iou']} · coverage filter {'on' if ev.get('coverage') else 'off'}")
+        else:  st.caption("Reference figures — run `python scripts/evaluate.py --save-app-metrics` to measure the current weights.")
+        lat=engine.latency_report(MODEL_CHOICE["path"]) if MODEL_CHOICE["path"] else {}
+        st.caption(f"Model: `{MODEL_CHOICE['model'] or 'Demo'}` · Inference: "
+                   f"{lat.get('median_scan_ms') or lat.get('steady_ms') or '—'} ms @ {engine.fmt_imgsz(engine.MODE_IMGSZ.get(scan_mode) or MODEL_CHOICE['imgsz'])}")
 
 # ─── REPORT ──────────────────────────────────────────────────────────────
 with tab_report:
@@ -1203,21 +1134,21 @@ with tab_report:
 | Scan Time | `{st.session_state.scan_time}` |
 | Risk Score | `{risk}/100 (Grade {grade})` |
 | Detections | `{len(dets)}` |
-| Model | `{MODEL_PATH.name if MODEL_PATH else 'Demo'}` |
+| Model | `{'Inference server' if engine.INFERENCE_URL else model_registry.describe(MODEL_CHOICE)}` |
             """)
         ui_card_close()
 
         st.markdown("<div style='height:10px'></div>", unsafe_allow_html=True)
         ui_card_open()
         if st.button("📄  Generate PDF Report",type="primary",use_container_width=True):
-            with st.spinner("Building PDF report…"):
+            with st.spinner("Building PDF report…"), telemetry.span("pdf"):
                 try:
                     hmap=build_heatmap(enh,dets) if incl_heatmap else None
                     pdf_bytes=build_pdf(
                         st.session_state.mission_id,
                         st.session_state.vessel_name or "Unknown",
                         inspector, scan_mode, dets, orig, ann, hmap,
-                        risk, grade, conf_thr, iou_thr
+                        risk, grade, conf_thr, iou_thr, model_info=MODEL_CHOICE
                     )
                     st.session_state.last_pdf=pdf_bytes
                     st.session_state.last_pdf_fname=(
@@ -1270,14 +1201,30 @@ with tab_report:
 
         st.markdown("<div style='height:10px'></div>", unsafe_allow_html=True)
         ui_card_open()
-        st.markdown("##### CSV Data Export")
+        st.markdown("##### Data Export — CSV · Parquet")
         import pandas as pd
-        df_csv=pd.DataFrame([{"mission_id":st.session_state.mission_id,"vessel":st.session_state.vessel_name,
-            "class":d["cls"],"severity":d["severity"],"confidence":round(d["conf"],4),
-            "x1":d["x1"],"y1":d["y1"],"x2":d["x2"],"y2":d["y2"],"area_px":d.get("area",0)} for d in dets])
+        _mid,_vsl=st.session_state.mission_id,st.session_state.vessel_name
+        df_csv=pd.DataFrame({k:v for k,v in detection_columns(dets[:500],_mid,_vsl).items() if k in CSV_COLUMNS})
         st.dataframe(df_csv,hide_index=True,use_container_width=True)
-        st.download_button("⬇️  Download CSV",data=df_csv.to_csv(index=False).encode(),
-            file_name=f"NautiCAI_{st.session_state.mission_id}.csv",mime="text/csv",use_container_width=True)
+        if len(dets)>500: st.caption(f"Showing first 500 of {len(dets):,} detections — the export contains all rows.")
+        if st.button("Prepare CSV + Parquet export",use_container_width=True,key="export_btn"):
+            with st.spinner("Writing export files…"):
+                try:
+                    st.session_state.export_files=export_detections(EXPORTS,dets,_mid,_vsl)
+                except ImportError as e:
+                    st.session_state.export_files=export_detections(EXPORTS,dets,_mid,_vsl,formats=("csv",))
+                    st.warning(str(e))
+        _files=st.session_state.get("export_files") or {}
+        if _files and Path(_files.get("csv","")).stem.endswith(_mid):
+            e1,e2=st.columns(2)
+            with open(_files["csv"],"rb") as fh:
+                e1.download_button("⬇️  Download CSV",data=fh,file_name=Path(_files["csv"]).name,
+                    mime="text/csv",use_container_width=True)
+            if "parquet" in _files:
+                with open(_files["parquet"],"rb") as fh:
+                    e2.download_button("⬇️  Download Parquet",data=fh,file_name=Path(_files["parquet"]).name,
+                        mime="application/vnd.apache.parquet",use_container_width=True)
+            st.caption(f"Saved to `{EXPORTS}`")
         ui_card_close()
 
 # ─── ROADMAP ─────────────────────────────────────────────────────────────
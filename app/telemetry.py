@@ -0,0 +1,175 @@
+"""
+NautiCAI — Pipeline Telemetry
+Lightweight spans around each inspection stage. A ``Trace`` collects one scan's
+stage timings (stored with its mission record); every span also feeds
+process-wide histograms exported in Prometheus text format, either to a file
+(``data/metrics.prom``, for a node-exporter textfile collector) or via the
+inference server's ``GET /metrics``.
+
+    tr = Trace()
+    with tr.span("enhance"):
+        enh = full_enhance(...)
+    tr.as_dict()    # {"enhance": 41.2, "total": 41.2}
+
+Single scans can be profiled with ``capture_profile`` (cProfile, or
+pyinstrument when installed).
+"""
+
+import os, io, sys, time, threading
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+METRICS_PATH = Path(os.environ.get("NAUTICAI_METRICS", ROOT / "data" / "metrics.prom"))
+
+STAGES = ("decode", "enhance", "detect", "annotate", "heatmap", "export", "pdf")
+BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_hist = {}      # stage -> [count, sum_s, [bucket counts]]
+
+
+def observe(stage, seconds):
+    """Record one stage duration in the process-wide histograms."""
+    with _lock:
+        h = _hist.setdefault(stage, [0, 0.0, [0] * len(BUCKETS_S)])
+        h[0] += 1
+        h[1] += seconds
+        for i, le in enumerate(BUCKETS_S):
+            if seconds <= le:
+                h[2][i] += 1
+
+
+@contextmanager
+def span(stage, trace=None):
+    """Time the block as ``stage``; adds to ``trace`` when given."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        observe(stage, dt)
+        if trace is not None:
+            trace.add(stage, dt * 1000)
+
+
+class Trace:
+    """
+    Stage timings (ms) for one scan. ``on_span(stage, ms, trace)`` is called as
+    each span closes, e.g. to drive a progress bar.
+    """
+
+    def __init__(self, on_span=None):
+        self.timings = {}
+        self.on_span = on_span
+
+    def span(self, stage):
+        return span(stage, self)
+
+    def add(self, stage, ms):
+        self.timings[stage] = self.timings.get(stage, 0.0) + ms
+        if self.on_span:
+            self.on_span(stage, ms, self)
+
+    @property
+    def total_ms(self):
+        return sum(self.timings.values())
+
+    def as_dict(self):
+        d = {k: round(v, 1) for k, v in self.timings.items()}
+        d["total"] = round(self.total_ms, 1)
+        return d
+
+
+def mean_ms(stage):
+    """Mean duration of ``stage`` in this process so far, or None."""
+    with _lock:
+        h = _hist.get(stage)
+        return h[1] / h[0] * 1000 if h and h[0] else None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (MB)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return round(psutil.Process().memory_info().peak_wset / 2**20, 1)
+        except (ImportError, AttributeError):
+            return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PROMETHEUS EXPORT
+# ═══════════════════════════════════════════════════════════════════
+def prometheus_text(extra=None):
+    """
+    Stage histograms as Prometheus text exposition. ``extra`` adds gauges:
+    ``{"name": value}`` or ``{"name": (value, "help text")}``.
+    """
+    out = ["# HELP nauticai_stage_duration_seconds Inspection pipeline stage duration.",
+           "# TYPE nauticai_stage_duration_seconds histogram"]
+    with _lock:
+        snap = {k: (v[0], v[1], list(v[2])) for k, v in _hist.items()}
+    for stage, (count, total, buckets) in sorted(snap.items()):
+        for le, n in zip(BUCKETS_S, buckets):
+            out.append(f'nauticai_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {n}')
+        out.append(f'nauticai_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        out.append(f'nauticai_stage_duration_seconds_sum{{stage="{stage}"}} {total:.6f}')
+        out.append(f'nauticai_stage_duration_seconds_count{{stage="{stage}"}} {count}')
+    for name, val in (extra or {}).items():
+        val, help_ = val if isinstance(val, tuple) else (val, name)
+        out += [f"# HELP nauticai_{name} {help_}", f"# TYPE nauticai_{name} gauge",
+                f"nauticai_{name} {val}"]
+    return "\n".join(out) + "\n"
+
+
+def write_metrics(path=None, extra=None):
+    """Atomically (re)write the Prometheus text file. Returns its path."""
+    path = Path(path or METRICS_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(prometheus_text(extra), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PROFILING (opt-in, single scans)
+# ═══════════════════════════════════════════════════════════════════
+@contextmanager
+def capture_profile(kind="cprofile", top=40):
+    """
+    Profile the block. Yields a dict that is filled on exit with ``text`` (a
+    cumulative-time report) and, for pyinstrument, ``html``. Falls back to
+    cProfile when pyinstrument isn't installed.
+    """
+    result = {"kind": kind}
+    if kind == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            kind = result["kind"] = "cprofile"
+        else:
+            prof = Profiler()
+            prof.start()
+            try:
+                yield result
+            finally:
+                prof.stop()
+                result["text"] = prof.output_text(unicode=True)
+                result["html"] = prof.output_html()
+            return
+    import cProfile, pstats
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield result
+    finally:
+        prof.disable()
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+        result["text"] = buf.getvalue()
@@ -0,0 +1,160 @@
+"""
+NautiCAI — Video Hull Mosaicking
+CPU-only incremental mosaic of the sampled frames of an ROV pass. Each frame is
+registered to the previous one (ORB features + ratio test + RANSAC homography)
+and the chain maps every frame into the first frame's coordinates. Detections
+are projected into that shared space, repeated sightings of the same defect are
+merged, and one annotated mosaic plus heatmap replace hundreds of frames.
+
+    vm = VideoMosaic()
+    for fn, frame in sampled_frames:
+        vm.add(enhanced, run_detection(enhanced, ...), fn, original=frame)
+    res = vm.render()   # {"mosaic", "original", "annotated", "heatmap", "detections", ...}
+"""
+
+import math
+
+import cv2
+import numpy as np
+
+from engine import annotate_image, build_heatmap, cv_to_pil
+from mosaic_tiles import merge_seams
+
+WORK_W = 640            # registration and mosaic frames are kept at this width
+MAX_SIDE = 4096         # longest side of the rendered mosaic
+N_FEATURES = 1500
+RATIO = 0.75            # Lowe ratio test
+MIN_INLIERS = 25
+MAX_SCALE_STEP = 1.5    # reject frame-to-frame zoom beyond this (bad registration)
+JPEG_Q = 85             # frames are held JPEG-encoded until render
+
+
+def _sane(M):
+    """Plausible frame-to-frame motion: bounded zoom, no mirroring, mild perspective."""
+    det = np.linalg.det(M[:2, :2])
+    return 1 / MAX_SCALE_STEP < det < MAX_SCALE_STEP and np.abs(M[2, :2]).max() < 2e-3
+
+
+def _jpg(bgr):
+    return cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, JPEG_Q])[1]
+
+
+class VideoMosaic:
+    """
+    Accumulates registered frames and their detections. Frames that can't be
+    registered (motion blur, open water) are placed on the previous frame and
+    counted in ``lost``.
+    """
+
+    def __init__(self, work_w=WORK_W, max_side=MAX_SIDE, n_features=N_FEATURES,
+                 min_inliers=MIN_INLIERS):
+        self.work_w = work_w
+        self.max_side = max_side
+        self.min_inliers = min_inliers
+        self.orb = cv2.ORB_create(n_features)
+        self.bf = cv2.BFMatcher(cv2.NORM_HAMMING)
+        self.frames = []        # (frame no, H frame->mosaic, (w, h), enhanced jpg, original jpg)
+        self.dets = []          # detections in mosaic (work-scale) coordinates
+        self.lost = 0
+        self._prev = None
+        self._H = np.eye(3)
+
+    @property
+    def registered(self):
+        return len(self.frames) - self.lost
+
+    def _match(self, kp, des):
+        pkp, pdes = self._prev
+        if des is None or pdes is None or len(kp) < self.min_inliers:
+            return None
+        good = [p[0] for p in self.bf.knnMatch(des, pdes, k=2)
+                if len(p) == 2 and p[0].distance < RATIO * p[1].distance]
+        if len(good) < self.min_inliers:
+            return None
+        src = np.float32([kp[m.queryIdx].pt for m in good])
+        dst = np.float32([pkp[m.trainIdx].pt for m in good])
+        M, inliers = cv2.findHomography(src, dst, cv2.RANSAC, 3.0)
+        if M is None or int(inliers.sum()) < self.min_inliers or not _sane(M):
+            return None
+        return M
+
+    def add(self, bgr, dets, frame=None, original=None):
+        """
+        Register one sampled frame (BGR, as detected on) and project its
+        detections. Returns True when the frame was registered.
+        """
+        h, w = bgr.shape[:2]
+        k = min(1.0, self.work_w / w)
+        small = cv2.resize(bgr, (round(w * k), round(h * k)), interpolation=cv2.INTER_AREA) if k < 1 else bgr
+        kp, des = self.orb.detectAndCompute(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), None)
+        ok = True
+        if self._prev is not None:
+            M = self._match(kp, des)
+            if M is None:
+                ok, M = False, np.eye(3)
+                self.lost += 1
+            self._H = self._H @ M
+        self._prev = (kp, des)
+
+        orig = small if original is None else cv2.resize(original, small.shape[1::-1],
+                                                         interpolation=cv2.INTER_AREA)
+        self.frames.append((frame, self._H.copy(), small.shape[1::-1], _jpg(small), _jpg(orig)))
+        A = self._H @ np.diag([k, k, 1.0])
+        for d in dets:
+            pts = np.float32([[d["x1"], d["y1"]], [d["x2"], d["y1"]],
+                              [d["x2"], d["y2"]], [d["x1"], d["y2"]]]).reshape(-1, 1, 2)
+            q = cv2.perspectiveTransform(pts, A).reshape(-1, 2)
+            self.dets.append(dict(d, frame=d.get("frame", frame), _box=(*q.min(0), *q.max(0))))
+        return ok
+
+    def render(self):
+        """
+        Warp every frame onto one canvas (later frames on top) and return
+        ``{mosaic, original, annotated, heatmap}`` PIL images, the merged
+        ``detections`` in mosaic pixels, and frame / registration counts.
+        None when no frame was added.
+        """
+        if not self.frames:
+            return None
+        corners = []
+        for _, H, (fw, fh), _, _ in self.frames:
+            c = np.float32([[0, 0], [fw, 0], [fw, fh], [0, fh]]).reshape(-1, 1, 2)
+            corners.append(cv2.perspectiveTransform(c, H).reshape(-1, 2))
+        corners = np.vstack(corners)
+        x0, y0 = corners.min(0)
+        bw, bh = corners.max(0) - (x0, y0)
+        z = min(1.0, self.max_side / max(bw, bh, 1))
+        T = np.array([[z, 0, -x0 * z], [0, z, -y0 * z], [0, 0, 1]])
+        size = (max(1, math.ceil(bw * z)), max(1, math.ceil(bh * z)))
+
+        canvas = np.zeros((size[1], size[0], 3), np.uint8)
+        canvas_orig = np.zeros_like(canvas)
+        for _, H, _, jpg, ojpg in self.frames:
+            A = T @ H
+            enh, orig = cv2.imdecode(jpg, cv2.IMREAD_COLOR), cv2.imdecode(ojpg, cv2.IMREAD_COLOR)
+            mask = cv2.warpPerspective(np.full(enh.shape[:2], 255, np.uint8), A, size,
+                                       flags=cv2.INTER_NEAREST) > 0
+            canvas[mask] = cv2.warpPerspective(enh, A, size)[mask]
+            canvas_orig[mask] = cv2.warpPerspective(orig, A, size)[mask]
+
+        dets = []
+        for d in self.dets:
+            bx1, by1, bx2, by2 = d["_box"]
+            x1, y1 = int((bx1 - x0) * z), int((by1 - y0) * z)
+            x2, y2 = max(int((bx2 - x0) * z), x1 + 2), max(int((by2 - y0) * z), y1 + 2)
+            dets.append({**{k_: v for k_, v in d.items() if k_ != "_box"},
+                         "x1": x1, "y1": y1, "x2": x2, "y2": y2, "area": (x2 - x1) * (y2 - y1)})
+        dets = merge_seams(dets, union=False)
+
+        mosaic = cv_to_pil(canvas)
+        return {
+            "mosaic": mosaic,
+            "original": cv_to_pil(canvas_orig),
+            "annotated": annotate_image(mosaic, dets),
+            "heatmap": build_heatmap(mosaic, dets),
+            "detections": dets,
+            "raw_detections": len(self.dets),
+            "frames": len(self.frames),
+            "registered": self.registered,
+            "lost": self.lost,
+        }
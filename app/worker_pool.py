@@ -0,0 +1,160 @@
+"""
+NautiCAI — Process-Pool Inference
+N worker processes, each holding its own YOLO instance with a fixed intra-op
+thread budget, plus a dispatcher that spreads images / frames across them.
+``sweep`` benchmarks workers × threads and stores the fastest configuration
+for this machine in ``data/pool_config.json``; the pool and the batch CLI use
+it by default.
+"""
+
+import os, json, time, platform
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import engine
+from engine import ROOT
+
+POOL_CONFIG = ROOT / "data" / "pool_config.json"
+_THREAD_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+def set_threads(n):
+    """Pin this process's intra-op threads (torch + OpenCV + BLAS) to ``n``."""
+    if not n:
+        return
+    for var in _THREAD_VARS:
+        os.environ[var] = str(n)
+    try:
+        import torch
+        torch.set_num_threads(n)
+        torch.set_num_interop_threads(1)
+    except (ImportError, RuntimeError):
+        pass
+    import cv2
+    cv2.setNumThreads(n)
+
+
+def tuned(workers=None, threads=None):
+    """
+    ``(workers, threads)`` to use: explicit values win, then the swept optimum
+    from ``POOL_CONFIG``, then one thread per core split evenly over workers.
+    """
+    cores = os.cpu_count() or 1
+    if workers is None and threads is None:
+        try:
+            cfg = json.loads(POOL_CONFIG.read_text(encoding="utf-8"))
+            if cfg.get("cpu_count") == cores:
+                return cfg["workers"], cfg["threads"]
+        except (OSError, ValueError, KeyError):
+            pass
+    if workers is None:
+        workers = max(1, cores // (threads or 1)) if threads else cores
+    if threads is None:
+        threads = max(1, cores // workers)
+    return workers, threads
+
+
+# ═══════════════════════════════════════════════════════════════════
+# WORKERS
+# ═══════════════════════════════════════════════════════════════════
+def _worker_init(model_path, threads):
+    set_threads(threads)
+    engine.load_yolo(str(model_path))
+
+
+def _worker_detect(img, conf_thr, iou_thr, model_path):
+    return engine.detect_batch([img], conf_thr, iou_thr, model_path)[0]
+
+
+class InferencePool:
+    """
+    Dispatches ``detect`` calls over ``workers`` processes with ``threads``
+    intra-op threads each. Images are sent as numpy BGR arrays (cheap to pickle).
+
+        with InferencePool() as pool:
+            all_dets = pool.map(frames, 0.25, 0.45)
+    """
+
+    def __init__(self, workers=None, threads=None, model_path=None):
+        self.model_path = str(model_path or engine.MODEL_PATH or "")
+        if not self.model_path:
+            raise RuntimeError("InferencePool needs model weights — none found")
+        self.workers, self.threads = tuned(workers, threads)
+        # spawn: every worker starts clean, with its own torch thread pool
+        self._ex = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp.get_context("spawn"),
+                                       initializer=_worker_init,
+                                       initargs=(self.model_path, self.threads))
+
+    def submit(self, img, conf_thr, iou_thr):
+        arr = engine.pil_to_cv(img) if hasattr(img, "convert") else img
+        return self._ex.submit(_worker_detect, arr, conf_thr, iou_thr, self.model_path)
+
+    def map(self, imgs, conf_thr, iou_thr):
+        """Detection lists in input order."""
+        futs = [self.submit(im, conf_thr, iou_thr) for im in imgs]
+        return [f.result() for f in futs]
+
+    def warm(self):
+        """Block until every worker has loaded its model."""
+        blank = np.zeros((64, 64, 3), np.uint8)
+        self.map([blank] * self.workers, 0.99, 0.5)
+
+    def close(self):
+        self._ex.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# BENCHMARK
+# ═══════════════════════════════════════════════════════════════════
+def bench_images(src=None, n=64, size=640):
+    """Up to ``n`` images from ``src`` (BGR arrays), or random frames when none given."""
+    if src:
+        from batch import discover
+        from ingest import load_bgr
+        paths = [p for p, _, kind in discover(src) if kind == "image"][:n]
+        return [load_bgr(p) for p in paths]
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (size, size, 3), dtype=np.uint8) for _ in range(n)]
+
+
+def _grid(cores):
+    counts = sorted({1, 2, 4, 8, 16, cores} & set(range(1, cores + 1)))
+    return [(w, t) for w in counts for t in counts if w * t <= cores]
+
+
+def sweep(imgs, grid=None, conf_thr=0.25, iou_thr=0.45, model_path=None, save=True, log=print):
+    """
+    Time ``InferencePool.map`` over ``imgs`` for each (workers, threads) pair
+    (default: powers of two up to the core count, never oversubscribed).
+    Returns the result table with the best row first; ``save`` writes the best
+    configuration to ``POOL_CONFIG``.
+    """
+    cores = os.cpu_count() or 1
+    rows = []
+    for workers, threads in grid or _grid(cores):
+        with InferencePool(workers, threads, model_path) as pool:
+            pool.warm()
+            t0 = time.perf_counter()
+            pool.map(imgs, conf_thr, iou_thr)
+            wall = time.perf_counter() - t0
+        row = {"workers": workers, "threads": threads, "images": len(imgs),
+               "wall_s": round(wall, 3), "imgs_per_s": round(len(imgs) / wall, 2)}
+        rows.append(row)
+        log(f"  {workers:>2} workers × {threads:>2} threads · {row['imgs_per_s']:>7.2f} img/s")
+    rows.sort(key=lambda r: -r["imgs_per_s"])
+    if save and rows:
+        POOL_CONFIG.parent.mkdir(parents=True, exist_ok=True)
+        POOL_CONFIG.write_text(json.dumps({
+            "workers": rows[0]["workers"], "threads": rows[0]["threads"],
+            "imgs_per_s": rows[0]["imgs_per_s"], "cpu_count": cores,
+            "machine": platform.node(), "model": str(model_path or engine.MODEL_PATH),
+            "sweep": rows}, indent=1), encoding="utf-8")
+    return rows
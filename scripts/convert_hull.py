@@ -1,6 +1,25 @@
-import os, shutil, glob
+"""
+NautiCAI — Class-folder → YOLO converter
+Turns a classification-style dataset (split/class_name/*.jpg) into YOLO
+detection format with one whole-image box per image. The default mapping is the
+hull dataset (dataset 6); any other folder layout can be converted by passing
+its own class mapping.
+
+Images are linked rather than copied where possible (see dataset_io.py). Work
+is spread over a thread pool in batches, and per-split / per-class counts are
+collected during the pass.
+
+    python scripts/convert_hull.py
+    python scripts/convert_hull.py --src data/corrosion_cls --dst data/corrosion_yolo \
+        --classes "Pitting=0,Uniform=1"
+    python scripts/convert_hull.py --src data/other_cls --dst data/other_yolo --auto-classes
+"""
+import os, argparse
+from collections import Counter
 from pathlib import Path
 
+from dataset_io import LINK_MODES, IO_WORKERS, place, make_dirs, parallel_map
+
 HULL_CLASSES = {
     "Bilge Keel":       0,
     "Draft Mark":       1,
@@ -13,27 +32,107 @@ HULL_CLASSES = {
     "Thruster Grating": 8,
 }
 
-src  = Path("data/dataset6_hull")
-dst  = Path("data/dataset6_hull_yolo")
-
-for split in ["train", "valid", "test"]:
-    (dst / split / "images").mkdir(parents=True, exist_ok=True)
-    (dst / split / "labels").mkdir(parents=True, exist_ok=True)
-    
-    for cls_name, cls_id in HULL_CLASSES.items():
-        cls_dir = src / split / cls_name
-        if not cls_dir.exists():
-            continue
-        for img_path in cls_dir.glob("*.jpg"):
-            # Copy image
-            dst_img = dst / split / "images" / img_path.name
-            shutil.copy2(img_path, dst_img)
-            # Create YOLO label (whole image bounding box)
-            dst_lbl = dst / split / "labels" / (img_path.stem + ".txt")
-            with open(dst_lbl, "w") as f:
-                f.write(f"{cls_id} 0.5 0.5 1.0 1.0\n")
-
-print("✅ Hull dataset converted!")
-for split in ["train", "valid", "test"]:
-    n = len(list((dst/split/"images").glob("*")))
-    print(f"{split}: {n} images")
\ No newline at end of file
+SRC        = Path("data/dataset6_hull")
+DST        = Path("data/dataset6_hull_yolo")
+SPLITS     = ["train", "valid", "test"]
+IMAGE_EXT  = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+WHOLE_IMG  = "0.5 0.5 1.0 1.0"     # YOLO cx cy w h covering the whole image
+BATCH      = 256                   # images per worker task
+
+# ── Class mappings ───────────────────────────────────────────────────────────
+def parse_classes(spec):
+    """``"Name A=0,Name B=1"`` → ``{"Name A": 0, "Name B": 1}``."""
+    out = {}
+    for item in spec.split(","):
+        name, _, idx = item.rpartition("=")
+        if not name:
+            raise ValueError(f"bad class mapping {item!r} — expected name=id")
+        out[name.strip()] = int(idx)
+    return out
+
+def discover_classes(src, splits=SPLITS):
+    """Sorted class-folder names found under any split → consecutive ids."""
+    names = set()
+    for split in splits:
+        if (Path(src) / split).is_dir():
+            with os.scandir(Path(src) / split) as it:
+                names.update(e.name for e in it if e.is_dir())
+    return {name: i for i, name in enumerate(sorted(names))}
+
+# ── Conversion ───────────────────────────────────────────────────────────────
+def collect(src, dst, class_map, splits=SPLITS):
+    """``(split, cls_name, cls_id, src_img, dst_img, dst_lbl)`` for every image."""
+    jobs = []
+    for split in splits:
+        for cls_name, cls_id in class_map.items():
+            cls_dir = Path(src) / split / cls_name
+            if not cls_dir.is_dir():
+                continue
+            with os.scandir(cls_dir) as it:
+                for e in it:
+                    stem, ext = os.path.splitext(e.name)
+                    if e.is_file() and ext.lower() in IMAGE_EXT:
+                        jobs.append((split, cls_name, cls_id, e.path,
+                                     Path(dst) / split / "images" / e.name,
+                                     Path(dst) / split / "labels" / (stem + ".txt")))
+    return jobs
+
+def _convert_batch(batch, link, box):
+    counts, methods = Counter(), Counter()
+    labels = []
+    for split, cls_name, cls_id, src_img, dst_img, dst_lbl in batch:
+        methods[place(src_img, dst_img, link)] += 1
+        labels.append((dst_lbl, f"{cls_id} {box}\n"))
+        counts[(split, cls_name)] += 1
+    # One label file per image (YOLO layout); the text is constant per class
+    for path, text in labels:
+        with open(path, "w") as f:
+            f.write(text)
+    return counts, methods
+
+def convert(src=SRC, dst=DST, class_map=None, splits=SPLITS, workers=IO_WORKERS,
+            link="auto", box=WHOLE_IMG, batch=BATCH, log=print):
+    """Convert ``src`` into YOLO format under ``dst``; returns ``{(split, class): images}``."""
+    class_map = class_map or HULL_CLASSES
+    make_dirs(Path(dst) / split / kind for split in splits for kind in ("images", "labels"))
+    jobs    = collect(src, dst, class_map, splits)
+    batches = [jobs[i:i + batch] for i in range(0, len(jobs), batch)]
+    log(f"📂 {len(jobs)} images · {len(class_map)} classes · {workers} workers · link={link}")
+    results, secs = parallel_map(lambda b: _convert_batch(b, link, box), batches, workers,
+                                 log, every=max(1, 2000 // batch), unit="batches")
+    counts, methods = Counter(), Counter()
+    for c, m in results:
+        counts.update(c)
+        methods.update(m)
+    log(f"✅ Converted {len(jobs)} images in {secs:.1f}s ({len(jobs) / max(secs, 1e-9):.0f} images/s)"
+        + "".join(f" · {n} {how}" for how, n in methods.most_common()))
+    return counts
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Convert a class-folder dataset to YOLO format")
+    ap.add_argument("--src", default=str(SRC), help="dataset root with split/class_name/ folders")
+    ap.add_argument("--dst", default=str(DST), help="YOLO output root")
+    ap.add_argument("--splits", nargs="+", default=SPLITS)
+    ap.add_argument("--classes", default=None, help='folder → id mapping, e.g. "Hull=0,Rudder=1"')
+    ap.add_argument("--auto-classes", action="store_true",
+                    help="map every class folder found, in sorted order")
+    ap.add_argument("--workers", type=int, default=IO_WORKERS, help="I/O threads")
+    ap.add_argument("--link", choices=LINK_MODES, default="auto",
+                    help="auto = hardlink, else reflink, else copy")
+    args = ap.parse_args()
+
+    if args.classes:
+        class_map = parse_classes(args.classes)
+    elif args.auto_classes:
+        class_map = discover_classes(args.src, args.splits)
+    else:
+        class_map = HULL_CLASSES
+    counts = convert(Path(args.src), Path(args.dst), class_map, args.splits, args.workers, args.link)
+
+    print("✅ Hull dataset converted!" if class_map is HULL_CLASSES else "✅ Dataset converted!")
+    for split in args.splits:
+        n = sum(v for (s, _), v in counts.items() if s == split)
+        print(f"{split}: {n} images")
+        for cls_name in class_map:
+            if counts[(split, cls_name)]:
+                print(f"   {cls_name}: {counts[(split, cls_name)]}")
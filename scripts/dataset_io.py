@@ -0,0 +1,88 @@
+"""
+NautiCAI — Dataset file helpers
+Shared by the dataset scripts: placing images by hardlink / reflink / copy,
+creating output directories once up front, and a thread-pool runner that
+reports throughput.
+
+Hardlinked images share storage with the source dataset. Edit files in
+data/merged only by replacing them, never in place.
+"""
+
+import os, sys, shutil, time, errno
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+LINK_MODES = ("auto", "hardlink", "reflink", "copy")
+IO_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+_FICLONE = 0x40049409       # Linux ioctl: share extents (btrfs, XFS, bcachefs)
+_no_link = set()            # (src device, dst device) pairs where hardlinks failed
+# errnos meaning "this filesystem pair can't hardlink"; anything else is per-file
+_LINK_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP}
+
+
+def _reflink(src, dst):
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflink only supported on Linux here")
+    import fcntl
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+    except OSError:
+        if os.path.exists(dst):
+            os.unlink(dst)
+        raise
+    shutil.copystat(src, dst)
+
+
+def place(src, dst, mode="auto"):
+    """
+    Put ``src`` at ``dst`` (replacing it) by the cheapest means allowed by
+    ``mode``. ``auto`` tries hardlink → reflink → copy. Returns the method used.
+    """
+    if os.path.lexists(dst):
+        os.unlink(dst)
+    if mode in ("auto", "hardlink"):
+        key = (os.stat(src).st_dev, os.stat(os.path.dirname(dst) or ".").st_dev)
+        if mode == "hardlink" or key not in _no_link:
+            try:
+                os.link(src, dst)
+                return "hardlink"
+            except OSError as e:
+                if mode == "hardlink":
+                    raise
+                if e.errno in _LINK_UNSUPPORTED:
+                    _no_link.add(key)   # cross-device / unsupported: don't retry per file
+    if mode in ("auto", "reflink"):
+        try:
+            _reflink(src, dst)
+            return "reflink"
+        except OSError:
+            if mode == "reflink":
+                raise
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def make_dirs(paths):
+    """Create each distinct directory once."""
+    for d in sorted({str(p) for p in paths}):
+        os.makedirs(d, exist_ok=True)
+
+
+def parallel_map(fn, items, workers=IO_WORKERS, log=print, every=2000, unit="files"):
+    """
+    Run ``fn(item)`` over ``items`` on a thread pool (the work is I/O bound).
+    Results come back in completion order. Progress and throughput are logged
+    every ``every`` items. Returns ``(results, seconds)``.
+    """
+    items = list(items)
+    t0 = time.perf_counter()
+    out = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        futs = [ex.submit(fn, it) for it in items]
+        for i, fut in enumerate(as_completed(futs), 1):
+            out.append(fut.result())
+            if i % every == 0 and i < len(items):
+                dt = time.perf_counter() - t0
+                log(f"   … {i}/{len(items)} {unit} ({i / dt:.0f} {unit}/s)")
+    return out, time.perf_counter() - t0
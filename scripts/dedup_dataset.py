@@ -0,0 +1,230 @@
+"""
+NautiCAI — Dataset deduplication (perceptual hashing)
+Finds near-identical images in data/merged: overlapping Roboflow sources, the
+two marine-growth sets, augmented exports, and train ↔ val/test leaks.
+
+1. 63-bit pHash per image (DCT of a 32×32 grey thumbnail), computed in
+   parallel and cached by file size/mtime.
+2. Near-duplicate clusters around kept representatives. In keep-priority
+   order (training copy first, so val/test only hold unseen images, then the
+   largest image), each image not yet clustered takes everything within
+   ``--threshold`` of it (Hamming distance, BK-tree range query). Every
+   dropped image is a near-duplicate of the kept one, so a chain of slowly
+   changing ROV frames is thinned, not collapsed to a single frame.
+
+The rest are reported, quarantined (moved with their labels to
+data/merged_quarantine/) or deleted. Removed outputs go into
+data/merged/.dedup_exclude.txt, which merge_datasets.py honours on later runs.
+
+    python scripts/dedup_dataset.py                       # report only
+    python scripts/dedup_dataset.py --action quarantine -j 8
+"""
+import os, json, shutil, argparse
+from collections import defaultdict
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+MERGED     = Path("data/merged")
+QUARANTINE = Path("data/merged_quarantine")
+EXCLUDE    = ".dedup_exclude.txt"
+HASH_CACHE = ".phash_cache.json"
+REPORT     = ".dedup_report.json"
+SPLITS     = ["train", "val", "test"]          # keep-priority order for cross-split clusters
+IMAGE_EXT  = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+THRESHOLD  = 6                                 # max Hamming distance (of 63 bits)
+CHUNK      = 256
+
+# ── Perceptual hash ──────────────────────────────────────────────────────────
+def phash_grey(grey):
+    """63-bit DCT hash (8×8 low frequencies minus DC) of a greyscale image."""
+    small = cv2.resize(grey, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low   = cv2.dct(small)[:8, :8].flatten()
+    bits  = low[1:] > np.median(low[1:])           # DC term carries brightness only
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+def _hash_chunk(paths):
+    """Worker: ``(path, hash, approx. pixel count)``; hash is None for unreadable files."""
+    out = []
+    for p in paths:
+        grey = cv2.imread(p, cv2.IMREAD_REDUCED_GRAYSCALE_4)     # 1/4-scale decode is plenty for a 32 px hash
+        out.append((p, None, 0) if grey is None else (p, phash_grey(grey), grey.size * 16))
+    return out
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+# ── BK-tree ──────────────────────────────────────────────────────────────────
+class BKTree:
+    """Metric tree over Hamming distance; range queries touch a small fraction of nodes."""
+
+    def __init__(self):
+        self.root = None            # [hash, ids, {distance: child}]
+
+    def add(self, h, item):
+        if self.root is None:
+            self.root = [h, [item], {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, [item], {}]
+                return
+            node = child
+
+    def query(self, h, radius):
+        """Items whose hash is within ``radius`` of ``h``."""
+        out, stack = [], [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= radius:
+                out += node[1]
+            for dist, child in node[2].items():
+                if d - radius <= dist <= d + radius:
+                    stack.append(child)
+        return out
+
+# ── Pipeline ─────────────────────────────────────────────────────────────────
+def list_images(merged=MERGED, splits=SPLITS):
+    out = []
+    for split in splits:
+        d = Path(merged) / "images" / split
+        if d.is_dir():
+            with os.scandir(d) as it:
+                out += [(split, e.path) for e in it
+                        if e.is_file() and os.path.splitext(e.name)[1].lower() in IMAGE_EXT]
+    return out
+
+def hash_images(images, merged=MERGED, workers=None, log=print):
+    """``{path: (hash, pixels)}``, reusing cached hashes for unchanged files."""
+    cache_path = Path(merged) / HASH_CACHE
+    try:
+        cache = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        cache = {}
+    result, todo, sigs = {}, [], {}
+    for _, p in images:
+        st = os.stat(p)
+        sigs[p] = [st.st_size, st.st_mtime_ns]
+        c = cache.get(p)
+        if c and c["sig"] == sigs[p]:
+            result[p] = (c["hash"], c["pixels"])
+        else:
+            todo.append(p)
+    log(f"🔎 {len(images)} images · {len(images) - len(todo)} hashes cached · {len(todo)} to compute")
+    chunks = [todo[i:i + CHUNK] for i in range(0, len(todo), CHUNK)]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        for batch in ex.map(_hash_chunk, chunks):
+            for p, h, px in batch:
+                if h is not None:
+                    result[p] = (h, px)
+    cache = {p: {"sig": sigs[p], "hash": h, "pixels": px} for p, (h, px) in result.items()}
+    tmp = cache_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(cache), encoding="utf-8")
+    os.replace(tmp, cache_path)
+    return result
+
+def _priority(p, split_of, hashes, rank):
+    return (rank.get(split_of.get(p), 0), -hashes[p][1], p)
+
+def clusters(hashes, threshold=THRESHOLD, split_of=None, splits=SPLITS):
+    """
+    Leader clustering: in keep-priority order, each unclustered image takes
+    every unclustered image within ``threshold`` of it. The leader comes
+    first in its group, and every member is within ``threshold`` of it.
+    """
+    split_of, rank = split_of or {}, {s: i for i, s in enumerate(splits)}
+    paths = sorted(hashes, key=lambda p: _priority(p, split_of, hashes, rank))
+    tree = BKTree()
+    for i, p in enumerate(paths):
+        tree.add(hashes[p][0], i)
+    taken, groups = [False] * len(paths), []
+    for i, p in enumerate(paths):
+        if taken[i]:
+            continue
+        members = sorted(j for j in tree.query(hashes[p][0], threshold) if not taken[j])
+        for j in members:
+            taken[j] = True
+        if len(members) > 1:
+            groups.append([paths[j] for j in members])
+    return groups
+
+def plan(groups, split_of, hashes, splits=SPLITS):
+    """Split each cluster into ``keep`` and ``drop``; flags clusters spanning splits as leaks."""
+    rank = {s: i for i, s in enumerate(splits)}
+    out = []
+    for g in groups:
+        g = sorted(g, key=lambda p: _priority(p, split_of, hashes, rank))
+        out.append({"keep": g[0], "drop": g[1:],
+                    "splits": sorted({split_of[p] for p in g}, key=rank.get),
+                    "leak": len({split_of[p] for p in g}) > 1})
+    return out
+
+def _label_of(img, merged):
+    rel = Path(img).relative_to(Path(merged) / "images")
+    return Path(merged) / "labels" / rel.with_suffix(".txt")
+
+def apply(decisions, action, merged=MERGED, quarantine=QUARANTINE, log=print):
+    """Quarantine or delete every ``drop`` image with its label; appends to the exclude list."""
+    removed = []
+    for d in decisions:
+        for img in d["drop"]:
+            lbl = _label_of(img, merged)
+            for src in (Path(img), lbl):
+                if not src.exists():
+                    continue
+                if action == "quarantine":
+                    dst = Path(quarantine) / src.relative_to(merged)
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.move(str(src), dst)
+                else:
+                    src.unlink()
+            removed.append(Path(img).relative_to(merged).as_posix())
+    if removed:
+        with open(Path(merged) / EXCLUDE, "a", encoding="utf-8") as f:
+            f.write("\n".join(removed) + "\n")
+    log(f"✅ {len(removed)} images {'moved to ' + str(quarantine) if action == 'quarantine' else 'deleted'}")
+    return removed
+
+def dedup(merged=MERGED, threshold=THRESHOLD, action="report", workers=None, splits=SPLITS, log=print):
+    images   = list_images(merged, splits)
+    split_of = dict((p, s) for s, p in images)
+    hashes   = hash_images(images, merged, workers, log)
+    groups   = clusters(hashes, threshold, split_of, splits)
+    decisions = plan(groups, split_of, hashes, splits)
+    n_drop  = sum(len(d["drop"]) for d in decisions)
+    n_leak  = sum(len([p for p in d["drop"] if split_of[p] != split_of[d["keep"]]]) for d in decisions)
+    per_split = defaultdict(int)
+    for d in decisions:
+        for p in d["drop"]:
+            per_split[split_of[p]] += 1
+    log(f"🧬 {len(groups)} near-duplicate clusters (distance ≤ {threshold}) · {n_drop} redundant images · "
+        f"{n_leak} cross-split leaks")
+    for s in splits:
+        if per_split[s]:
+            log(f"   {s}: {per_split[s]} to remove")
+    report = {"threshold": threshold, "images": len(images), "clusters": len(groups),
+              "redundant": n_drop, "leaks": n_leak, "decisions": decisions}
+    with open(Path(merged) / REPORT, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    if action != "report":
+        apply(decisions, action, merged, log=log)
+    return report
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Find and remove near-duplicate images in the merged dataset")
+    ap.add_argument("--merged", default=str(MERGED))
+    ap.add_argument("--threshold", type=int, default=THRESHOLD, help="max pHash Hamming distance")
+    ap.add_argument("--action", choices=["report", "quarantine", "delete"], default="report")
+    ap.add_argument("-j", "--workers", type=int, default=None, help="hashing processes")
+    args = ap.parse_args()
+    dedup(Path(args.merged), args.threshold, args.action, args.workers)
+    print(f"📄 Report → {Path(args.merged) / REPORT}")
@@ -0,0 +1,221 @@
+"""
+NautiCAI — Knowledge distillation to a CPU-sized model
+Trains a YOLOv8n student on data/merged with the trained YOLOv8s
+(``best.pt``) as teacher. The student keeps its normal detection loss and is
+also pulled towards the teacher's raw head outputs:
+
+* class logits — BCE against the teacher's temperature-softened scores;
+* box distributions — KL divergence between the DFL bins.
+
+Both are weighted per anchor by the teacher's confidence, so the background
+doesn't dominate. The student has the same 19 classes and head layout as the
+teacher.
+
+Afterwards teacher and student are scored with evaluate.py on the same split,
+and their single-image CPU latency is measured. The comparison goes to
+``<project>/<name>/distill_report.json``. With ``--install`` the student is
+copied to ``best_n.pt`` in the repo root, where the app's latency-budgeted
+model selection picks it up for live video.
+
+    python scripts/distill.py --teacher best.pt
+    python scripts/distill.py --set epochs=40 batch=32 --install
+    python scripts/distill.py --report-only --student runs/distill/nauticai_n/weights/best.pt
+"""
+import json, time, shutil, argparse
+from pathlib import Path
+
+import numpy as np
+
+from train import load_config, detect_device, detect_workers, data_loader_args, ThroughputLog, CPU_BATCH
+from evaluate import MERGED, predict_raw, ground_truth, evaluate
+
+TEACHER   = "best.pt"
+STUDENT   = "yolov8n.pt"
+INSTALL   = Path("best_n.pt")
+ALPHA     = 1.0             # weight of the distillation term against the detection loss
+TEMP      = 2.0             # softening temperature for logits and DFL bins
+LATENCY_RUNS = 50
+DEFAULTS  = {"project": "runs/distill", "name": "nauticai_n", "epochs": 80, "patience": 30}
+
+# ── Distillation loss ────────────────────────────────────────────────────────
+def _flat(out):
+    """
+    Raw Detect-head output → ``B×(4·reg_max+nc)×A``. Handles the eval-mode
+    ``(decoded, raw)`` tuple, the per-stride ``[B×no×H×W]`` list (ultralytics
+    ≤ 8.3) and the ``{"boxes", "scores", …}`` dict of 8.4 heads, including the
+    ``one2many`` / ``one2one`` pair of end-to-end heads (``one2many`` carries
+    the dense predictions).
+    """
+    import torch
+    if isinstance(out, tuple):
+        out = out[1]
+    if isinstance(out, dict):
+        out = out.get("one2many", out)
+        if "boxes" not in out or "scores" not in out:
+            raise TypeError(f"unsupported Detect head output keys {sorted(out)}")
+        return torch.cat([out["boxes"], out["scores"]], 1)
+    return torch.cat([f.flatten(2) for f in out], 2)
+
+class DistillLoss:
+    """
+    Wraps the student's ``v8DetectionLoss``; adds ``alpha`` × (logit BCE + DFL
+    KL) against the teacher on the same batch. Plain object, not a module, so
+    the teacher never ends up in the student's state dict or checkpoints.
+    """
+
+    def __init__(self, base, teacher, nc, reg_max, alpha=ALPHA, temperature=TEMP):
+        self.base, self.teacher = base, teacher
+        self.nc, self.reg_max = nc, reg_max
+        self.alpha, self.T = alpha, temperature
+        self.last_kd = 0.0
+
+    def __call__(self, preds, batch):
+        import torch
+        import torch.nn.functional as F
+        loss, items = self.base(preds, batch)
+        with torch.no_grad():
+            t_out = self.teacher(batch["img"])
+        s, t = _flat(preds).float(), _flat(t_out).float()
+        B, A, T, r = s.shape[0], s.shape[2], self.T, self.reg_max
+        s_box, s_cls = s.split((4 * r, self.nc), 1)
+        t_box, t_cls = t.split((4 * r, self.nc), 1)
+
+        t_prob = torch.sigmoid(t_cls / T)
+        weight = t_prob.amax(1)                                                    # B×A teacher confidence
+        norm = weight.sum().clamp(min=1.0)
+        cls_kd = F.binary_cross_entropy_with_logits(s_cls / T, t_prob, reduction="none").mean(1)
+        s_dfl = F.log_softmax(s_box.view(B, 4, r, A) / T, 2)
+        t_dfl = F.softmax(t_box.view(B, 4, r, A) / T, 2)
+        box_kd = (t_dfl * (t_dfl.clamp(min=1e-9).log() - s_dfl)).sum(2).mean(1)    # KL per anchor
+        kd = ((cls_kd + box_kd) * weight).sum() / norm * T * T
+        self.last_kd = float(kd.detach())
+        # v8DetectionLoss returns the batch-summed loss; scale the same way
+        return loss + self.alpha * kd * B, items
+
+def distill_trainer(teacher_path, alpha=ALPHA, temperature=TEMP, base=None):
+    """A ``DetectionTrainer`` (or ``base``) subclass that trains with ``DistillLoss``."""
+    from ultralytics.models.yolo.detect import DetectionTrainer
+    from ultralytics.nn.tasks import attempt_load_one_weight
+    from ultralytics.utils.loss import v8DetectionLoss
+
+    class DistillTrainer(base or DetectionTrainer):
+        def _setup_train(self, *args, **kwargs):
+            # Loaded first so AutoBatch can budget for it; the EMA copy (what gets saved) is
+            # taken from self.model only, so the teacher stays out of the checkpoints
+            teacher, _ = attempt_load_one_weight(str(teacher_path), device=self.device)
+            teacher = self.kd_teacher = teacher.float().eval()
+            for p in teacher.parameters():
+                p.requires_grad_(False)
+            super()._setup_train(*args, **kwargs)
+            student = self.model.module if hasattr(self.model, "module") else self.model
+            head_t, head_s = teacher.model[-1], student.model[-1]
+            if head_t.nc != head_s.nc or head_t.reg_max != head_s.reg_max:
+                raise ValueError(f"teacher has {head_t.nc} classes / reg_max {head_t.reg_max}, "
+                                 f"student {head_s.nc} / {head_s.reg_max} — train the student on the same data.yaml")
+            student.criterion = DistillLoss(v8DetectionLoss(student), teacher, head_s.nc, head_s.reg_max,
+                                            alpha, temperature)
+
+        def auto_batch(self, *args, **kwargs):
+            # batch=-1: AutoBatch profiles the student alone — scale by parameter share so the
+            # teacher's forward pass fits too
+            batch = super().auto_batch(*args, **kwargs)
+            s = sum(p.numel() for p in self.model.parameters())
+            t = sum(p.numel() for p in self.kd_teacher.parameters())
+            return max(1, int(batch * s / (s + t)))
+
+    return DistillTrainer
+
+# ── Comparison ───────────────────────────────────────────────────────────────
+def cpu_latency(weights, images, imgsz=640, runs=LATENCY_RUNS):
+    """Median / p90 single-image CPU latency (ms) over ``runs`` validation images, after warm-up."""
+    from ultralytics import YOLO
+    import cv2
+    model = YOLO(str(weights))
+    imgs = [cv2.imread(str(p)) for p in images[:runs]]
+    for img in imgs[:3]:
+        model.predict(img, imgsz=imgsz, device="cpu", verbose=False)
+    times = []
+    for img in imgs:
+        t0 = time.perf_counter()
+        model.predict(img, imgsz=imgsz, device="cpu", verbose=False)
+        times.append((time.perf_counter() - t0) * 1000)
+    params = sum(p.numel() for p in model.model.parameters())
+    return {"p50_ms": round(float(np.median(times)), 1), "p90_ms": round(float(np.percentile(times, 90)), 1),
+            "params_m": round(params / 1e6, 2)}
+
+def compare(teacher, student, split="val", imgsz=640, merged=MERGED, device=None, log=print):
+    """Accuracy (evaluate.py, app post-processing off) and CPU latency of both models."""
+    out = {}
+    for role, w in (("teacher", teacher), ("student", student)):
+        raw = predict_raw(w, split, imgsz, merged, device=device, log=log)
+        m = evaluate(raw, ground_truth(raw, merged, split))
+        out[role] = {"weights": str(w), "map50": round(m["map50"], 4), "map": round(m["map"], 4),
+                     "precision": round(m["precision"], 4), "recall": round(m["recall"], 4),
+                     "per_class_map50": {k: round(v["map50"], 4) for k, v in m["per_class"].items()},
+                     **cpu_latency(w, list(raw["files"]), imgsz)}
+    t, s = out["teacher"], out["student"]
+    out["speedup"] = round(t["p50_ms"] / max(s["p50_ms"], 1e-9), 2)
+    out["map50_retained"] = round(s["map50"] / max(t["map50"], 1e-9), 3)
+    # Classes the student lost most on (parity check)
+    out["weakest_classes"] = sorted(((c, round(s["per_class_map50"].get(c, 0.0) - v, 4))
+                                     for c, v in t["per_class_map50"].items()), key=lambda x: x[1])[:5]
+    return out
+
+def print_report(r, log=print):
+    log(f"\n{'model':<8} {'params':>8} {'mAP50':>7} {'mAP50-95':>9} {'CPU p50':>9} {'CPU p90':>9}")
+    for role in ("teacher", "student"):
+        v = r[role]
+        log(f"{role:<8} {v['params_m']:>7.2f}M {v['map50']:>7.3f} {v['map']:>9.3f} "
+            f"{v['p50_ms']:>7.1f}ms {v['p90_ms']:>7.1f}ms")
+    log(f"\n{r['speedup']}× faster on CPU · {r['map50_retained'] * 100:.1f}% of the teacher's mAP50")
+    log("Largest per-class mAP50 drops: " + ", ".join(f"{c} {d:+.3f}" for c, d in r["weakest_classes"]))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Distill best.pt into a YOLOv8n student and compare them")
+    ap.add_argument("--teacher", default=TEACHER)
+    ap.add_argument("--student", default=STUDENT, help="student start weights (or trained weights with --report-only)")
+    ap.add_argument("--config", default=str(Path(__file__).with_name("train.yaml")),
+                    help="training config shared with train.py")
+    ap.add_argument("--set", nargs="*", default=[], metavar="KEY=VALUE", help="override config values")
+    ap.add_argument("--alpha", type=float, default=ALPHA, help="distillation loss weight")
+    ap.add_argument("--temperature", type=float, default=TEMP)
+    ap.add_argument("--split", default="val", help="split for the comparison report")
+    ap.add_argument("--report-only", action="store_true", help="skip training, compare --student as is")
+    ap.add_argument("--install", action="store_true", help=f"copy the student to {INSTALL} for the app")
+    args = ap.parse_args()
+
+    cfg = load_config(args.config, args.set)
+    overridden = {item.partition("=")[0].strip() for item in args.set}
+    cfg.update({k: v for k, v in DEFAULTS.items() if k not in overridden})
+    for k in ("model", "image_cache", "resume"):          # train.py runner keys
+        cfg.pop(k, None)
+    run_dir = Path(cfg["project"]) / cfg["name"]
+    student = Path(args.student)
+
+    if not args.report_only:
+        from ultralytics import YOLO
+        loader = data_loader_args(cfg["imgsz"])
+        if cfg.get("device", "auto") == "auto":
+            cfg["device"] = detect_device()
+        if cfg.get("workers", "auto") == "auto":
+            cfg["workers"] = detect_workers(cfg["device"], bool(loader))
+        if cfg.get("batch", "auto") == "auto":
+            cfg["batch"] = CPU_BATCH if cfg["device"] in ("cpu", "mps") else -1
+        model = YOLO(args.student)
+        log = ThroughputLog(run_dir / "throughput.json")
+        log.epochs = []
+        log.register(model)
+        print(f"🎓 {args.teacher} → {args.student} · alpha {args.alpha} · T {args.temperature} · "
+              f"device {cfg['device']}")
+        model.train(**cfg, trainer=distill_trainer(args.teacher, args.alpha, args.temperature,
+                                                   loader.get("trainer")))
+        student = run_dir / "weights" / "best.pt"
+
+    report = compare(args.teacher, student, args.split, cfg["imgsz"])
+    print_report(report)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / "distill_report.json").write_text(json.dumps(report, indent=1), encoding="utf-8")
+    print(f"📄 Report → {run_dir / 'distill_report.json'}")
+    if args.install:
+        shutil.copy2(student, INSTALL)
+        print(f"✅ Student installed as {INSTALL}")
@@ -0,0 +1,313 @@
+"""
+NautiCAI — Offline evaluation harness
+Runs batched inference over one split of data/merged once and caches the raw
+candidates (conf ≥ 0.001, before NMS) to disk. Scoring is pure numpy:
+threshold → class-aware NMS → coverage filter → vectorized IoU matching →
+per-class precision, recall, mAP@0.5 and mAP@0.5:0.95. Re-scoring with other
+conf / IoU thresholds or the app's box-coverage filter takes seconds and needs
+no new inference.
+
+    python scripts/evaluate.py --weights best.pt --split val
+    python scripts/evaluate.py --conf 0.25 --iou 0.45 --coverage 0.005 0.50   # app settings
+    python scripts/evaluate.py --save-app-metrics                             # dashboard numbers
+
+Ground truth comes from the label index of label_stats.py (built on demand).
+The dashboard's "Model Performance Metrics" reads data/eval_metrics.json.
+"""
+import os, json, time, hashlib, argparse, datetime
+from pathlib import Path
+
+import numpy as np
+
+from label_stats import MERGED, IMAGE_EXT, INDEX, build_index, load_index, boxes_for
+from merge_datasets import FINAL_CLASSES
+
+CACHE_ROOT   = Path("runs/eval")
+APP_METRICS  = Path("data/eval_metrics.json")
+RAW_CONF     = 0.001            # candidates kept in the cache
+MAX_CAND     = 1000             # per image, highest confidence first
+BATCH        = 16
+IOU_THRS     = np.linspace(0.5, 0.95, 10)
+APP_COVERAGE = (0.005, 0.50)    # engine._parse_result box-coverage window
+
+# ── Raw prediction cache ─────────────────────────────────────────────────────
+def _model_key(weights, imgsz, merged, files):
+    """Weights file + imgsz + which images were run (dataset root, ``--limit``, file list)."""
+    st = os.stat(weights)
+    h = hashlib.sha1(f"{os.path.abspath(weights)}|{st.st_size}|{st.st_mtime_ns}|{imgsz}|"
+                     f"{Path(merged).resolve()}|{len(files)}|".encode())
+    h.update("\n".join(str(f) for f in files).encode())
+    return h.hexdigest()[:10]
+
+def cache_path(weights, split, imgsz, files, merged=MERGED, root=CACHE_ROOT):
+    return Path(root) / f"{Path(weights).stem}_{split}_{imgsz}_{_model_key(weights, imgsz, merged, files)}.npz"
+
+def _images(merged, split):
+    d = Path(merged) / "images" / split
+    with os.scandir(d) as it:
+        return sorted(e.path for e in it if e.is_file() and os.path.splitext(e.name)[1].lower() in IMAGE_EXT)
+
+def predict_raw(weights, split="val", imgsz=640, merged=MERGED, batch=BATCH, device=None,
+                limit=None, force=False, log=print):
+    """
+    Raw candidates for every image of ``split``, cached per (weights, imgsz,
+    image list). NMS is run with IoU 1.0 so nothing is suppressed; scoring
+    re-applies it.
+    """
+    files = _images(merged, split)[:limit]
+    path = cache_path(weights, split, imgsz, files, merged)
+    if path.exists() and not force:
+        return load_raw(path)
+    from ultralytics import YOLO
+    model = YOLO(str(weights))
+    cols = {k: [] for k in ("img", "cls", "conf", "x1", "y1", "x2", "y2")}
+    wh, ms = np.zeros((len(files), 2), np.int32), np.zeros(len(files), np.float32)
+    kw = {"device": device} if device is not None else {}
+    t0 = time.perf_counter()
+    for b in range(0, len(files), batch):
+        chunk = files[b:b + batch]
+        t1 = time.perf_counter()
+        results = model.predict(chunk, conf=RAW_CONF, iou=1.0, imgsz=imgsz, max_det=MAX_CAND,
+                                verbose=False, **kw)
+        per = (time.perf_counter() - t1) * 1000 / len(chunk)
+        for k, r in enumerate(results):
+            i = b + k
+            wh[i] = r.orig_shape[1], r.orig_shape[0]
+            ms[i] = per
+            xyxy = r.boxes.xyxy.cpu().numpy()
+            cols["img"].append(np.full(len(xyxy), i, np.int32))
+            cols["cls"].append(r.boxes.cls.cpu().numpy().astype(np.int16))
+            cols["conf"].append(r.boxes.conf.cpu().numpy().astype(np.float32))
+            for j, c in enumerate(("x1", "y1", "x2", "y2")):
+                cols[c].append(xyxy[:, j].astype(np.float32))
+        if (b // batch) % 20 == 0:
+            log(f"   … {min(b + batch, len(files))}/{len(files)} images")
+    raw = {k: np.concatenate(v) if v else np.zeros(0, np.int32 if k == "img" else np.float32)
+           for k, v in cols.items()}
+    raw.update(files=np.asarray(files), wh=wh, ms=ms, names=np.asarray(list(model.names.values())),
+               imgsz=np.int32(imgsz), weights=np.asarray(str(weights)))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(path, **raw)
+    log(f"✅ {len(files)} images · {len(raw['conf'])} raw candidates in {time.perf_counter() - t0:.1f}s → {path}")
+    return raw
+
+def load_raw(path):
+    with np.load(path) as z:
+        return {k: z[k] for k in z.files}
+
+# ── Post-processing (vectorized) ─────────────────────────────────────────────
+def box_iou(a, b):
+    """IoU matrix between ``a`` [N×4] and ``b`` [M×4] (xyxy)."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(2)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None] - inter, 1e-9)
+
+def nms(boxes, scores, classes, iou_thr):
+    """Class-aware greedy NMS; returns kept indices (highest score first)."""
+    order = np.argsort(-scores, kind="stable")
+    b, c = boxes[order], classes[order]
+    iou = np.triu(box_iou(b, b), 1) * (c[:, None] == c[None, :])
+    keep = np.ones(len(order), bool)
+    for i in range(len(order)):
+        if keep[i]:
+            keep[iou[i] > iou_thr] = False
+    return order[keep]
+
+def postprocess(raw, conf=0.001, iou=0.7, coverage=None, max_det=300):
+    """
+    Conf threshold and NMS on cached candidates, then the optional ``(min, max)``
+    box-coverage window (fraction of image area) — the order engine._parse_result
+    applies it in. Returns the kept columns, sorted by image, confidence first.
+    """
+    idx = np.flatnonzero(raw["conf"] >= conf)
+    idx = idx[np.argsort(raw["img"][idx], kind="stable")]
+    img = raw["img"][idx]
+    boxes = np.stack([raw["x1"], raw["y1"], raw["x2"], raw["y2"]], 1)
+    keep = []
+    if len(idx):
+        starts = np.flatnonzero(np.r_[True, img[1:] != img[:-1]])
+        for s, e in zip(starts, np.r_[starts[1:], len(idx)]):
+            j = idx[s:e]
+            keep.append(j[nms(boxes[j], raw["conf"][j], raw["cls"][j], iou)[:max_det]])
+    keep = np.concatenate(keep) if keep else np.zeros(0, np.int64)
+    det = {"img": raw["img"][keep], "cls": raw["cls"][keep], "conf": raw["conf"][keep], "box": boxes[keep]}
+    det["coverage"] = coverage_of(det, raw["wh"])
+    if coverage is not None:
+        det = select(det, (det["coverage"] >= coverage[0]) & (det["coverage"] <= coverage[1]))
+    return det
+
+def coverage_of(det, wh):
+    """Box area as a fraction of its image's area."""
+    b, wh = det["box"], wh[det["img"]].astype(np.float64)
+    return (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1]) / np.maximum(wh[:, 0] * wh[:, 1], 1)
+
+def select(det, mask):
+    return {k: v[mask] for k, v in det.items()}
+
+# ── Matching and metrics ─────────────────────────────────────────────────────
+def ground_truth(raw, merged=MERGED, split="val"):
+    """Per image GT ``(cls[N], xyxy[N×4])`` in pixels, aligned with ``raw["files"]``."""
+    if not (Path(merged) / INDEX).exists():
+        build_index(merged)
+    gt = boxes_for(load_index(merged), split)
+    out = []
+    for f, (w, h) in zip(raw["files"], raw["wh"]):
+        g = gt.get(Path(f).stem, np.zeros((0, 5), np.float32))
+        xyxy = np.stack([(g[:, 1] - g[:, 3] / 2) * w, (g[:, 2] - g[:, 4] / 2) * h,
+                         (g[:, 1] + g[:, 3] / 2) * w, (g[:, 2] + g[:, 4] / 2) * h], 1)
+        out.append((g[:, 0].astype(np.int16), xyxy))
+    return out
+
+def match(pred_cls, pred_box, pred_conf, gt_cls, gt_box, iou_thrs=IOU_THRS):
+    """
+    ``tp[N×T]``, COCO-style: predictions in confidence order each take the
+    best-IoU GT still free at every threshold. Because the order is by
+    confidence, raising the conf threshold only drops rows — the matches of
+    the remaining predictions don't change.
+    """
+    tp = np.zeros((len(pred_cls), len(iou_thrs)), bool)
+    if not len(pred_cls) or not len(gt_cls):
+        return tp
+    iou = box_iou(pred_box, gt_box) * (pred_cls[:, None] == gt_cls[None, :])
+    order = np.argsort(-pred_conf, kind="stable")
+    order = order[iou[order].max(1) >= iou_thrs[0]]        # only overlapping predictions can match
+    taken = np.zeros((len(iou_thrs), len(gt_cls)), bool)
+    rows = np.arange(len(iou_thrs))
+    for p in order:
+        ok = (iou[p][None, :] >= iou_thrs[:, None]) & ~taken
+        best = np.where(ok, iou[p][None, :], -1).argmax(1)
+        hit = ok[rows, best]
+        tp[p] = hit
+        taken[rows[hit], best[hit]] = True
+    return tp
+
+def match_all(det, gt, n_cls):
+    """Match post-processed detections against ``gt`` → ``(tp[N×T], GT count per class)``."""
+    tps = []
+    gt_counts = np.zeros(n_cls, np.int64)
+    starts = np.searchsorted(det["img"], np.arange(len(gt) + 1))
+    for i, (g_cls, g_box) in enumerate(gt):
+        s, e = starts[i], starts[i + 1]
+        tps.append(match(det["cls"][s:e], det["box"][s:e], det["conf"][s:e], g_cls, g_box))
+        gt_counts += np.bincount(g_cls, minlength=n_cls)[:n_cls]
+    tp = np.concatenate(tps) if tps else np.zeros((0, len(IOU_THRS)), bool)
+    return tp, gt_counts
+
+def ap_per_class(tp, conf, pred_cls, gt_counts):
+    """
+    Per-class AP at every IoU threshold (COCO 101-point interpolation), plus
+    P / R / F1 at the confidence that maximises mean F1 across classes.
+    """
+    order = np.argsort(-conf, kind="stable")
+    tp, conf, pred_cls = tp[order], conf[order], pred_cls[order]
+    n_cls, T = len(gt_counts), tp.shape[1]
+    ap = np.zeros((n_cls, T))
+    grid = np.linspace(0, 1, 1000)
+    rec_pts = np.linspace(0, 1, 101)
+    p_curve, r_curve = np.zeros((n_cls, 1000)), np.zeros((n_cls, 1000))
+    for c in range(n_cls):
+        sel = pred_cls == c
+        n_gt = gt_counts[c]
+        if not sel.any() or not n_gt:
+            continue
+        tpc = np.cumsum(tp[sel], 0)
+        fpc = np.cumsum(~tp[sel], 0)
+        recall = tpc / n_gt
+        precision = tpc / (tpc + fpc)
+        # Curves at IoU 0.5 over a confidence grid (descending conf → interp on -conf)
+        r_curve[c] = np.interp(-grid, -conf[sel], recall[:, 0], left=0)
+        p_curve[c] = np.interp(-grid, -conf[sel], precision[:, 0], left=1)
+        for t in range(T):
+            # Precision envelope; each recall point takes it at the first rank reaching that
+            # recall, 0 past the highest recall reached (pycocotools)
+            mpre = np.flip(np.maximum.accumulate(np.flip(precision[:, t])))
+            inds = np.searchsorted(recall[:, t], rec_pts, side="left")
+            ap[c, t] = np.where(inds < len(mpre), mpre[np.minimum(inds, len(mpre) - 1)], 0.0).mean()
+    f1 = 2 * p_curve * r_curve / np.maximum(p_curve + r_curve, 1e-9)
+    present = gt_counts > 0
+    best = int(f1[present].mean(0).argmax()) if present.any() else 0
+    return ap, p_curve[:, best], r_curve[:, best], f1[:, best], float(grid[best])
+
+def evaluate(raw, gt, conf=0.001, iou=0.7, coverage=None, names=None):
+    """Metrics dict for one post-processing setting."""
+    t0 = time.perf_counter()
+    det = postprocess(raw, conf, iou, coverage)
+    names = names or [str(n) for n in raw["names"]]
+    tp, gt_counts = match_all(det, gt, len(names))
+    ap, p, r, f1, best_conf = ap_per_class(tp, det["conf"], det["cls"], gt_counts)
+    present = gt_counts > 0
+    return {
+        "conf": conf, "iou": iou, "coverage": list(coverage) if coverage else None,
+        "images": len(gt), "instances": int(gt_counts.sum()), "predictions": int(len(det["conf"])),
+        "precision": float(p[present].mean()) if present.any() else 0.0,
+        "recall": float(r[present].mean()) if present.any() else 0.0,
+        "f1": float(f1[present].mean()) if present.any() else 0.0,
+        "map50": float(ap[present, 0].mean()) if present.any() else 0.0,
+        "map": float(ap[present].mean()) if present.any() else 0.0,
+        "best_f1_conf": best_conf,
+        # Operating point: every kept detection counts (IoU 0.5), as the app would show them
+        "op_precision": float(tp[:, 0].sum() / max(len(tp), 1)),
+        "op_recall": float(tp[:, 0].sum() / max(gt_counts.sum(), 1)),
+        "per_class": {names[c]: {"instances": int(gt_counts[c]), "precision": float(p[c]),
+                                 "recall": float(r[c]), "map50": float(ap[c, 0]),
+                                 "map": float(ap[c].mean())}
+                      for c in range(len(names)) if gt_counts[c]},
+        "score_s": round(time.perf_counter() - t0, 3),
+        "ms_per_image": float(raw["ms"].mean()) if len(raw["ms"]) else None,
+    }
+
+def print_metrics(m, log=print):
+    log(f"\n{'class':<18} {'inst':>6} {'P':>7} {'R':>7} {'mAP50':>7} {'mAP50-95':>9}")
+    for name, v in m["per_class"].items():
+        log(f"{name:<18} {v['instances']:>6} {v['precision']:>7.3f} {v['recall']:>7.3f} "
+            f"{v['map50']:>7.3f} {v['map']:>9.3f}")
+    log(f"{'all':<18} {m['instances']:>6} {m['precision']:>7.3f} {m['recall']:>7.3f} "
+        f"{m['map50']:>7.3f} {m['map']:>9.3f}")
+    log(f"\nconf {m['conf']} · iou {m['iou']} · coverage {m['coverage'] or 'off'} · "
+        f"{m['predictions']} predictions · scored in {m['score_s']:.2f}s"
+        + (f" · {m['ms_per_image']:.1f} ms/image inference" if m["ms_per_image"] else ""))
+
+def save_app_metrics(m, weights, split, path=APP_METRICS):
+    """The summary the dashboard shows (see streamlit_app ``tab_dash``)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    out = {k: m[k] for k in ("precision", "recall", "map50", "map", "f1", "images", "instances",
+                             "conf", "iou", "coverage", "ms_per_image")}
+    out.update(model=Path(weights).name, split=split,
+               date=datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
+    path.write_text(json.dumps(out, indent=1), encoding="utf-8")
+    return path
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Evaluate YOLO weights on a split of the merged dataset")
+    ap.add_argument("--weights", default="best.pt")
+    ap.add_argument("--split", default="val")
+    ap.add_argument("--imgsz", type=int, default=640)
+    ap.add_argument("--batch", type=int, default=BATCH)
+    ap.add_argument("--device", default=None, help="e.g. cpu, 0")
+    ap.add_argument("--merged", default=str(MERGED))
+    ap.add_argument("-n", "--limit", type=int, default=None, help="only the first N images")
+    ap.add_argument("--conf", type=float, default=0.001)
+    ap.add_argument("--iou", type=float, default=0.7)
+    ap.add_argument("--coverage", type=float, nargs=2, default=None, metavar=("MIN", "MAX"),
+                    help=f"box-coverage filter, e.g. {APP_COVERAGE[0]} {APP_COVERAGE[1]} as in the app")
+    ap.add_argument("--force", action="store_true", help="re-run inference even if cached")
+    ap.add_argument("--json", default=None, help="write the full metrics here")
+    ap.add_argument("--save-app-metrics", action="store_true", help=f"write {APP_METRICS} for the dashboard")
+    args = ap.parse_args()
+
+    raw = predict_raw(args.weights, args.split, args.imgsz, Path(args.merged), args.batch,
+                      args.device, args.limit, args.force)
+    if len(raw["names"]) != len(FINAL_CLASSES):
+        print(f"⚠️ model has {len(raw['names'])} classes, the merged dataset {len(FINAL_CLASSES)}")
+    gt = ground_truth(raw, Path(args.merged), args.split)
+    m = evaluate(raw, gt, args.conf, args.iou, args.coverage)
+    print_metrics(m)
+    if args.json:
+        Path(args.json).write_text(json.dumps(m, indent=1), encoding="utf-8")
+        print(f"✅ Metrics → {args.json}")
+    if args.save_app_metrics:
+        print(f"✅ Dashboard metrics → {save_app_metrics(m, args.weights, args.split)}")
@@ -0,0 +1,276 @@
+"""
+NautiCAI — Preprocessed training image cache
+Decodes and letterboxes every image of data/merged once, at the training size,
+into one memory-mapped uint8 array per split (``<split>.npy``, N × S × S × 3,
+BGR) plus ``index.json`` (source path, size/mtime, original and resized shape,
+padding). Training then reads pixels straight from the page cache instead of
+decoding JPEGs, so dataloader workers stop being the bottleneck on CPU-limited
+machines.
+
+    python scripts/image_cache.py build --imgsz 640 -j 8
+    python scripts/image_cache.py bench --split train -j 4     # one training-dataloader epoch: JPEG vs cache
+    python scripts/train.py                                    # picks up data/cache/640 automatically
+
+Disk cost is S²·3 bytes per image (≈1.2 MB at 640 px).
+"""
+import os, json, time, argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+IMAGES     = Path("data/merged/images")
+CACHE_ROOT = Path("data/cache")
+SPLITS     = ["train", "val", "test"]
+IMAGE_EXT  = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+PAD_VALUE  = 114                    # ultralytics letterbox grey
+CHUNK      = 64                     # images per worker task
+
+def cache_dir(imgsz, root=CACHE_ROOT):
+    return Path(root) / str(imgsz)
+
+# ── Build ────────────────────────────────────────────────────────────────────
+def letterbox(bgr, size):
+    """Resize the long side to ``size`` and centre on a square ``size`` canvas → (img, (h, w), (top, left))."""
+    h0, w0 = bgr.shape[:2]
+    r = size / max(h0, w0)
+    h, w = min(size, max(1, round(h0 * r))), min(size, max(1, round(w0 * r)))
+    if (h, w) != (h0, w0):
+        bgr = cv2.resize(bgr, (w, h), interpolation=cv2.INTER_AREA if r < 1 else cv2.INTER_LINEAR)
+    top, left = (size - h) // 2, (size - w) // 2
+    out = np.full((size, size, 3), PAD_VALUE, np.uint8)
+    out[top:top + h, left:left + w] = bgr
+    return out, (h, w), (top, left)
+
+def _list_images(img_dir):
+    try:
+        with os.scandir(img_dir) as it:
+            return sorted(e.path for e in it if e.is_file()
+                          and os.path.splitext(e.name)[1].lower() in IMAGE_EXT)
+    except FileNotFoundError:
+        return []
+
+def _sig(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def _fill(npy_path, rows, files, size):
+    """Worker: decode + letterbox ``files`` into ``rows`` of the memmap; returns per-row metadata."""
+    arr = np.load(npy_path, mmap_mode="r+")
+    meta = []
+    for row, path in zip(rows, files):
+        bgr = cv2.imread(path, cv2.IMREAD_COLOR)
+        if bgr is None:
+            meta.append((row, None, None, None))
+            continue
+        arr[row], hw, pad = letterbox(bgr, size)
+        meta.append((row, bgr.shape[:2], hw, pad))
+    arr.flush()
+    return meta
+
+def load_index(out_dir):
+    try:
+        with open(Path(out_dir) / "index.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def build(images=IMAGES, imgsz=640, splits=SPLITS, workers=None, out_dir=None, force=False, log=print):
+    """Build (or refresh) the cache for ``splits``; unchanged splits are kept as they are."""
+    out_dir = Path(out_dir or cache_dir(imgsz))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    old   = load_index(out_dir) or {}
+    # Splits not rebuilt on this run keep their entries (their .npy stays on disk)
+    index = {"imgsz": imgsz, "splits": dict(old.get("splits") or {}) if old.get("imgsz") == imgsz else {}}
+    for split in splits:
+        files = [os.path.abspath(p) for p in _list_images(Path(images) / split)]
+        if not files:
+            index["splits"].pop(split, None)
+            continue
+        sigs = [_sig(p) for p in files]
+        prev = (old.get("splits") or {}).get(split)
+        npy  = out_dir / f"{split}.npy"
+        if (not force and prev and old.get("imgsz") == imgsz and npy.exists()
+                and prev["files"] == files and prev["sig"] == sigs):
+            index["splits"][split] = prev
+            log(f"✅ {split}: {len(files)} images unchanged")
+            continue
+        t0 = time.perf_counter()
+        np.lib.format.open_memmap(npy, mode="w+", dtype=np.uint8, shape=(len(files), imgsz, imgsz, 3)).flush()
+        entry = {"files": files, "sig": sigs, "shape0": [None] * len(files),
+                 "shape": [None] * len(files), "pad": [None] * len(files)}
+        chunks = [(list(range(i, min(i + CHUNK, len(files)))), files[i:i + CHUNK])
+                  for i in range(0, len(files), CHUNK)]
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            futs = [ex.submit(_fill, str(npy), rows, fs, imgsz) for rows, fs in chunks]
+            for fut in futs:
+                for row, shape0, hw, pad in fut.result():
+                    entry["shape0"][row], entry["shape"][row], entry["pad"][row] = shape0, hw, pad
+        bad = sum(s is None for s in entry["shape0"])
+        index["splits"][split] = entry
+        secs = time.perf_counter() - t0
+        log(f"✅ {split}: {len(files)} images → {npy} in {secs:.1f}s "
+            f"({len(files) / max(secs, 1e-9):.0f} images/s)" + (f" · {bad} unreadable" if bad else ""))
+    tmp = out_dir / "index.json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp, out_dir / "index.json")
+    return index
+
+# ── Read side ────────────────────────────────────────────────────────────────
+class ImageStore:
+    """
+    Read-only view of one cache directory. The memmaps are opened lazily, so
+    the store can be pickled into dataloader workers (each maps the files
+    itself).
+    """
+
+    def __init__(self, out_dir):
+        self.out_dir = Path(out_dir)
+        self.index   = load_index(self.out_dir)
+        if not self.index:
+            raise FileNotFoundError(f"no image cache at {self.out_dir} — run image_cache.py build")
+        self.imgsz   = self.index["imgsz"]
+        self._rows   = {p: (split, i) for split, e in self.index["splits"].items()
+                        for i, (p, s) in enumerate(zip(e["files"], e["shape0"])) if s}
+        self._arrays = {}
+
+    def __getstate__(self):
+        return {**self.__dict__, "_arrays": {}}
+
+    def __contains__(self, path):
+        return os.path.abspath(path) in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _array(self, split):
+        if split not in self._arrays:
+            self._arrays[split] = np.load(self.out_dir / f"{split}.npy", mmap_mode="r")
+        return self._arrays[split]
+
+    def letterboxed(self, path):
+        """The stored ``imgsz × imgsz`` letterboxed BGR image (a memmap view)."""
+        split, i = self._rows[os.path.abspath(path)]
+        return self._array(split)[i]
+
+    def load(self, path):
+        """``(img, (h0, w0), (h, w))`` — resized, unpadded, as ultralytics ``load_image`` returns."""
+        split, i = self._rows[os.path.abspath(path)]
+        e = self.index["splits"][split]
+        (h, w), (top, left) = e["shape"][i], e["pad"][i]
+        img = np.ascontiguousarray(self._array(split)[i, top:top + h, left:left + w])
+        return img, tuple(e["shape0"][i]), (h, w)
+
+# ── Ultralytics adapter ──────────────────────────────────────────────────────
+try:
+    from ultralytics.data.dataset import YOLODataset
+except ImportError:         # building the cache doesn't need ultralytics
+    YOLODataset = None
+
+if YOLODataset is not None:
+    class CachedYOLODataset(YOLODataset):
+        """YOLODataset that reads pixels from an ``ImageStore`` (module level so workers can unpickle it)."""
+        image_store = None
+
+        def load_image(self, i, rect_mode=True, **kwargs):
+            f = self.im_files[i]
+            # The cache only holds the long-side resize — other resize modes decode as usual
+            if (self.image_store is None or f not in self.image_store or not rect_mode
+                    or kwargs.get("resize_short") or self.ims[i] is not None):
+                return super().load_image(i, rect_mode, **kwargs)
+            im, hw0, hw = self.image_store.load(f)
+            if self.augment:
+                # BaseDataset bookkeeping: mosaic/mixup pick their extra images from ``buffer``
+                self.ims[i], self.im_hw0[i], self.im_hw[i] = im, hw0, hw
+                self.buffer.append(i)
+                if 1 < len(self.buffer) >= self.max_buffer_length:
+                    j = self.buffer.pop(0)
+                    if self.cache != "ram":
+                        self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+            return im, hw0, hw
+
+def attach(dataset, store):
+    """
+    Make an ultralytics ``YOLODataset`` read images from ``store``. Images
+    missing from the cache (added since the build) fall back to the normal
+    decoder; a cache built for a different imgsz is ignored.
+    """
+    if store.imgsz == dataset.imgsz and type(dataset) is YOLODataset:
+        dataset.__class__ = CachedYOLODataset
+        dataset.image_store = store
+    return dataset
+
+def trainer_for(out_dir):
+    """A ``DetectionTrainer`` subclass whose datasets read from the cache at ``out_dir``."""
+    from ultralytics.models.yolo.detect import DetectionTrainer
+    store = ImageStore(out_dir)
+
+    class CachedDetectionTrainer(DetectionTrainer):
+        def build_dataset(self, img_path, mode="train", batch=None):
+            return attach(super().build_dataset(img_path, mode, batch), store)
+
+    return CachedDetectionTrainer
+
+# ── Benchmark ────────────────────────────────────────────────────────────────
+def _epoch(dataset, batch, workers):
+    """Seconds for one pass of the ultralytics training dataloader over ``dataset``."""
+    from ultralytics.data.build import build_dataloader
+    loader = build_dataloader(dataset, batch, workers, shuffle=True, rank=-1)
+    t0 = time.perf_counter()
+    for _ in loader:
+        pass
+    return time.perf_counter() - t0
+
+def bench(out_dir, split="train", workers=4, limit=None, batch=16, data=None, log=print):
+    """
+    Data time of one training epoch of ``split``: the ultralytics train
+    dataloader (mosaic and the other default augmentations, ``workers``
+    processes) run end to end, once decoding JPEGs and once reading the
+    cache. No model runs, so this is the epoch time the cache can save.
+    Returns the timings and the reduction.
+    """
+    from ultralytics.cfg import get_cfg
+    from ultralytics.data.build import build_yolo_dataset
+    from ultralytics.data.utils import check_det_dataset
+    store = ImageStore(out_dir)
+    files = store.index["splits"][split]["files"]
+    data = check_det_dataset(str(data or IMAGES.parent / "data.yaml"))     # as the trainer resolves it
+    cfg = get_cfg(overrides={"imgsz": store.imgsz, "workers": workers, "batch": batch,
+                             "fraction": min(1.0, (limit or len(files)) / len(files))})
+    img_dir = str(Path(files[0]).parent)
+    res = {"split": split, "workers": workers, "batch": batch}
+    for kind in ("jpeg", "cache"):
+        ds = build_yolo_dataset(cfg, img_dir, batch, data, mode="train")
+        if kind == "cache":
+            attach(ds, store)
+        res["images"] = len(ds)
+        res[f"{kind}_s"] = round(_epoch(ds, batch, workers), 2)
+        log(f"  {kind:<5} {res[f'{kind}_s']:>8.2f} s / epoch ({len(ds) / res[f'{kind}_s']:.0f} images/s)")
+    res["reduction"] = round(1 - res["cache_s"] / res["jpeg_s"], 3) if res["jpeg_s"] else None
+    log(f"✅ Training-epoch data time {res['reduction'] * 100:.0f}% lower with the cache")
+    return res
+
+if __name__ == "__main__":
+    ap  = argparse.ArgumentParser(description="Memory-mapped training image cache")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("build", help="decode + letterbox data/merged into the cache")
+    p.add_argument("--images", default=str(IMAGES), help="folder with one sub-folder per split")
+    p.add_argument("--imgsz", type=int, default=640)
+    p.add_argument("--splits", nargs="+", default=SPLITS)
+    p.add_argument("-j", "--workers", type=int, default=None, help="decode processes")
+    p.add_argument("--force", action="store_true", help="rebuild unchanged splits too")
+    p = sub.add_parser("bench", help="training-dataloader epoch time: JPEG vs cache")
+    p.add_argument("--imgsz", type=int, default=640)
+    p.add_argument("--split", default="train")
+    p.add_argument("-j", "--workers", type=int, default=4, help="loader processes")
+    p.add_argument("-b", "--batch", type=int, default=16)
+    p.add_argument("--data", default=str(IMAGES.parent / "data.yaml"), help="dataset yaml (class names)")
+    p.add_argument("-n", "--limit", type=int, default=None, help="about N images (ultralytics fraction)")
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        build(Path(args.images), args.imgsz, args.splits, args.workers, force=args.force)
+    else:
+        bench(cache_dir(args.imgsz), args.split, args.workers, args.limit, args.batch, args.data)
@@ -0,0 +1,196 @@
+"""
+NautiCAI — Label statistics & validation index
+Parses every YOLO label file of data/merged in parallel into one columnar index
+(``data/merged/.label_index.npz``). Each box row holds image id, class, cx, cy,
+w, h and problem flags, and there is one row per image for its split, file and
+box count. The report covers class balance, box-size distribution, invalid or
+out-of-range coordinates, malformed lines, empty labels and images without a
+label. The saved index is reused for sampling and by evaluate.py as ground
+truth.
+
+    python scripts/label_stats.py                 # build index + print report
+    python scripts/label_stats.py --json stats.json
+"""
+import os, json, time, argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from merge_datasets import FINAL_CLASSES, SPLIT_MAP
+
+MERGED    = Path("data/merged")
+INDEX     = ".label_index.npz"
+SPLITS    = list(SPLIT_MAP.values())
+IMAGE_EXT = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+CHUNK     = 2048
+
+# Box problem flags (bitmask)
+OUT_OF_RANGE = 1        # a coordinate outside [0, 1] / box edge past the image border
+DEGENERATE   = 2        # w or h ≤ 0
+BAD_CLASS    = 4        # class id not in FINAL_CLASSES
+# Size buckets on the 640 px training canvas (COCO: small < 32², medium < 96²)
+SIZE_EDGES   = ((32 / 640) ** 2, (96 / 640) ** 2)
+
+# ── Parsing ──────────────────────────────────────────────────────────────────
+def _parse_chunk(paths, first_id):
+    """Worker: parse label files → (image ids, rows[N×5], n_boxes per file, malformed lines per file)."""
+    ids, rows, counts, bad = [], [], [], []
+    for k, p in enumerate(paths):
+        n = malformed = 0
+        with open(p, "r") as f:
+            for line in f:
+                parts = line.split()
+                if not parts:
+                    continue
+                if len(parts) != 5:
+                    malformed += 1          # polygon / truncated line
+                    continue
+                try:
+                    rows.append([float(v) for v in parts])
+                except ValueError:
+                    malformed += 1
+                    continue
+                ids.append(first_id + k)
+                n += 1
+        counts.append(n)
+        bad.append(malformed)
+    return (np.asarray(ids, np.int32), np.asarray(rows, np.float32).reshape(-1, 5),
+            np.asarray(counts, np.int32), np.asarray(bad, np.int32))
+
+def _list(d, exts=None):
+    try:
+        with os.scandir(d) as it:
+            return sorted(e.name for e in it if e.is_file()
+                          and (exts is None or os.path.splitext(e.name)[1].lower() in exts))
+    except FileNotFoundError:
+        return []
+
+def build_index(merged=MERGED, splits=SPLITS, workers=None, log=print):
+    """Parse all labels and save the columnar index; returns it as a dict of arrays."""
+    t0 = time.perf_counter()
+    files, split_ids, unlabelled = [], [], {}
+    for si, split in enumerate(splits):
+        lbls = [n for n in _list(Path(merged) / "labels" / split) if n.endswith(".txt")]
+        imgs = {os.path.splitext(n)[0] for n in _list(Path(merged) / "images" / split, IMAGE_EXT)}
+        stems = {n[:-4] for n in lbls}
+        unlabelled[split] = len(imgs - stems)
+        files += [str(Path(merged) / "labels" / split / n) for n in lbls]
+        split_ids += [si] * len(lbls)
+
+    chunks = [(files[i:i + CHUNK], i) for i in range(0, len(files), CHUNK)]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        parts = list(ex.map(_parse_chunk, [c[0] for c in chunks], [c[1] for c in chunks]))
+    img_id  = np.concatenate([p[0] for p in parts]) if parts else np.zeros(0, np.int32)
+    rows    = np.concatenate([p[1] for p in parts]) if parts else np.zeros((0, 5), np.float32)
+    n_boxes = np.concatenate([p[2] for p in parts]) if parts else np.zeros(0, np.int32)
+    malformed = np.concatenate([p[3] for p in parts]) if parts else np.zeros(0, np.int32)
+
+    cls = rows[:, 0].astype(np.int16)
+    cx, cy, w, h = rows[:, 1], rows[:, 2], rows[:, 3], rows[:, 4]
+    flags = np.zeros(len(rows), np.uint8)
+    flags[((rows[:, 1:] < 0) | (rows[:, 1:] > 1)).any(1)
+          | (cx - w / 2 < -1e-3) | (cx + w / 2 > 1 + 1e-3)
+          | (cy - h / 2 < -1e-3) | (cy + h / 2 > 1 + 1e-3)] |= OUT_OF_RANGE
+    flags[(w <= 0) | (h <= 0)] |= DEGENERATE
+    flags[(rows[:, 0] != cls) | (cls < 0) | (cls >= len(FINAL_CLASSES))] |= BAD_CLASS
+
+    index = {
+        "img_id": img_id, "cls": cls, "cx": cx, "cy": cy, "w": w, "h": h, "flags": flags,
+        "files": np.asarray(files), "split": np.asarray(split_ids, np.int8),
+        "n_boxes": n_boxes, "malformed": malformed, "splits": np.asarray(splits),
+        "unlabelled": np.asarray([unlabelled[s] for s in splits], np.int32),
+    }
+    np.savez(Path(merged) / INDEX, **index)
+    log(f"✅ {len(files)} label files · {len(rows)} boxes parsed in {time.perf_counter() - t0:.2f}s "
+        f"→ {Path(merged) / INDEX}")
+    return index
+
+def load_index(merged=MERGED):
+    """The saved index as a dict of arrays (see ``build_index``)."""
+    with np.load(Path(merged) / INDEX) as z:
+        return {k: z[k] for k in z.files}
+
+def boxes_for(index, split):
+    """``{label file stem: [N×5 (cls, cx, cy, w, h)]}`` for valid boxes of one split."""
+    si = list(index["splits"]).index(split)
+    keep = (index["split"][index["img_id"]] == si) & (index["flags"] == 0)
+    out = {Path(f).stem: np.zeros((0, 5), np.float32)
+           for f in index["files"][index["split"] == si]}
+    ids = index["img_id"][keep]
+    data = np.stack([index["cls"][keep].astype(np.float32), index["cx"][keep], index["cy"][keep],
+                     index["w"][keep], index["h"][keep]], 1)
+    order = np.argsort(ids, kind="stable")
+    ids, data = ids[order], data[order]
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if len(ids) else []
+    for s, e in zip(starts, list(starts[1:]) + [len(ids)]):
+        out[Path(index["files"][ids[s]]).stem] = data[s:e]
+    return out
+
+# ── Report ───────────────────────────────────────────────────────────────────
+def stats(index):
+    """Summary dict: per split / class counts, size buckets and problems."""
+    names = {v: k for k, v in FINAL_CLASSES.items()}
+    n_cls = len(FINAL_CLASSES)
+    img_split = index["split"][index["img_id"]]
+    valid = index["flags"] == 0
+    area = index["w"] * index["h"]
+    out = {"splits": {}, "classes": {}}
+    for si, split in enumerate(index["splits"]):
+        sel = img_split == si
+        files = index["split"] == si
+        out["splits"][str(split)] = {
+            "label_files": int(files.sum()),
+            "boxes": int(sel.sum()),
+            "empty_labels": int(((index["n_boxes"] == 0) & files).sum()),
+            "images_without_label": int(index["unlabelled"][si]),
+            "malformed_lines": int(index["malformed"][files].sum()),
+            "out_of_range": int((sel & (index["flags"] & OUT_OF_RANGE > 0)).sum()),
+            "degenerate": int((sel & (index["flags"] & DEGENERATE > 0)).sum()),
+            "bad_class": int((sel & (index["flags"] & BAD_CLASS > 0)).sum()),
+            "per_class": np.bincount(index["cls"][sel & valid], minlength=n_cls)[:n_cls].tolist(),
+        }
+    bucket = np.digitize(area, SIZE_EDGES)
+    for c in range(n_cls):
+        sel = valid & (index["cls"] == c)
+        a = area[sel]
+        out["classes"][names[c]] = {
+            "boxes": int(sel.sum()),
+            "images": int(len(np.unique(index["img_id"][sel]))),
+            "area_pct": {f"p{q}": round(float(np.percentile(a, q)) * 100, 3) if len(a) else None
+                         for q in (5, 50, 95)},
+            "small": int((bucket[sel] == 0).sum()),
+            "medium": int((bucket[sel] == 1).sum()),
+            "large": int((bucket[sel] == 2).sum()),
+        }
+    counts = [v["boxes"] for v in out["classes"].values() if v["boxes"]]
+    out["imbalance"] = round(max(counts) / min(counts), 1) if counts else None
+    return out
+
+def print_report(s, log=print):
+    log(f"\n{'split':<6} {'files':>7} {'boxes':>8} {'empty':>6} {'no label':>8} "
+        f"{'malformed':>9} {'out-of-rng':>10} {'degen':>6} {'bad cls':>7}")
+    for split, v in s["splits"].items():
+        log(f"{split:<6} {v['label_files']:>7} {v['boxes']:>8} {v['empty_labels']:>6} "
+            f"{v['images_without_label']:>8} {v['malformed_lines']:>9} {v['out_of_range']:>10} "
+            f"{v['degenerate']:>6} {v['bad_class']:>7}")
+    log(f"\n{'class':<18} {'boxes':>7} {'images':>7} {'area p5/p50/p95 %':>22} {'S/M/L':>18}")
+    for name, v in s["classes"].items():
+        a = v["area_pct"]
+        area = "/".join("—" if a[k] is None else f"{a[k]:.2f}" for k in ("p5", "p50", "p95"))
+        log(f"{name:<18} {v['boxes']:>7} {v['images']:>7} {area:>22} "
+            f"{v['small']:>6}/{v['medium']}/{v['large']}")
+    log(f"\nClass imbalance (largest / smallest): {s['imbalance']}×")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Parse, validate and summarise the merged YOLO labels")
+    ap.add_argument("--merged", default=str(MERGED))
+    ap.add_argument("-j", "--workers", type=int, default=None, help="parser processes")
+    ap.add_argument("--json", default=None, help="also write the report as JSON")
+    args = ap.parse_args()
+    s = stats(build_index(Path(args.merged), workers=args.workers))
+    print_report(s)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(s, f, indent=1)
+        print(f"✅ Report → {args.json}")
@@ -10,13 +10,26 @@ Datasets:
     5. Marine Growth 781 images
     6. Hull Scan (1,187 images)
 Total: ~15,845 images | 19 classes
+
+Images are hardlinked (or reflinked, else copied) into data/merged by a thread
+pool; see dataset_io.py. Runs are incremental: data/merged/.merge_manifest.json
+records each output's source files (size, mtime) and class-map version, so a
+rerun only touches new or changed images, removes outputs whose sources are
+gone, and rewrites data.yaml only when FINAL_CLASSES changes.
+
+    python scripts/merge_datasets.py --workers 16 --link auto
+    python scripts/merge_datasets.py --full        # ignore the manifest, rebuild everything
 """
 
 import os
-import shutil
-import glob
+import json
+import hashlib
+import argparse
+from collections import Counter
 from pathlib import Path
 
+from dataset_io import LINK_MODES, IO_WORKERS, place, make_dirs, parallel_map
+
 # ── Final class mapping ───────────────────────────────────────────────────────
 FINAL_CLASSES = {
     # Subsea Infrastructure
@@ -88,8 +101,11 @@ ROOT      = Path("data")
 MERGED    = ROOT / "merged"
 SPLITS    = ["train", "valid", "test"]
 SPLIT_MAP = {"train": "train", "valid": "val", "test": "test"}
+MANIFEST  = ".merge_manifest.json"
+EXCLUDE   = ".dedup_exclude.txt"   # outputs removed by dedup_dataset.py (never re-merged)
 
-def remap_label_file(src_path, dst_path, class_map):
+def remap_lines(src_path, class_map):
+    """Label lines of ``src_path`` with class ids remapped to FINAL_CLASSES (skipped classes dropped)."""
     lines_out = []
     with open(src_path, "r") as f:
         for line in f:
@@ -104,64 +120,110 @@ def remap_label_file(src_path, dst_path, class_map):
             new_id   = FINAL_CLASSES[new_name]
             parts[0] = str(new_id)
             lines_out.append(" ".join(parts))
+    return lines_out
 
+def remap_label_file(src_path, dst_path, class_map):
+    lines_out = remap_lines(src_path, class_map)
     if lines_out:
-        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
         with open(dst_path, "w") as f:
             f.write("\n".join(lines_out) + "\n")
         return True
     return False
 
-def merge():
-    # Create output dirs
-    for split in ["train", "val", "test"]:
-        os.makedirs(MERGED / "images" / split, exist_ok=True)
-        os.makedirs(MERGED / "labels" / split, exist_ok=True)
-
-    total_images = 0
+# ── Discovery: one directory listing per split instead of glob + exists per image ──
+def _entries(path):
+    try:
+        with os.scandir(path) as it:
+            return {e.name: e for e in it if e.is_file()}
+    except FileNotFoundError:
+        return {}
 
+def collect_jobs(root=ROOT, merged=MERGED, log=print):
+    """
+    ``(ds_name, src_img, src_lbl, dst_img, dst_lbl, class_map, source_sig)`` for
+    every labelled image; ``source_sig`` is ``[img size, img mtime, lbl size, lbl mtime]``.
+    """
+    jobs = []
     for ds_name, class_map in DATASET_MAPS.items():
-        ds_path = ROOT / ds_name
+        ds_path = Path(root) / ds_name
         if not ds_path.exists():
-            print(f"⚠️  Skipping {ds_name} — folder not found")
+            log(f"⚠️  Skipping {ds_name} — folder not found")
             continue
-
-        print(f"\n📂 Processing {ds_name}...")
-        ds_count = 0
-
         for split in SPLITS:
-            img_dir   = ds_path / split / "images"
-            lbl_dir   = ds_path / split / "labels"
             out_split = SPLIT_MAP[split]
+            labels    = _entries(ds_path / split / "labels")
+            for name, entry in _entries(ds_path / split / "images").items():
+                stem, ext = os.path.splitext(name)
+                lbl = labels.get(stem + ".txt")
+                if lbl is None:
+                    continue
+                new_name = f"{ds_name}_{stem}"
+                si, sl = entry.stat(), lbl.stat()
+                jobs.append((ds_name, entry.path, lbl.path,
+                             Path(merged) / "images" / out_split / (new_name + ext),
+                             Path(merged) / "labels" / out_split / (new_name + ".txt"),
+                             class_map,
+                             [si.st_size, si.st_mtime_ns, sl.st_size, sl.st_mtime_ns]))
+    return jobs
 
-            if not img_dir.exists():
-                continue
+# ── Manifest: what each output was built from ──────────────────────────────────
+def class_map_version(class_map):
+    """Short hash of a dataset's resolved source-id → final-id mapping."""
+    resolved = {str(k): FINAL_CLASSES[v] if v else None for k, v in sorted(class_map.items())}
+    return hashlib.sha1(json.dumps(resolved, sort_keys=True).encode()).hexdigest()[:12]
 
-            for img_path in glob.glob(str(img_dir / "*.*")):
-                img_path = Path(img_path)
-                stem     = img_path.stem
-                ext      = img_path.suffix
-                lbl_path = lbl_dir / (stem + ".txt")
+def classes_version():
+    return hashlib.sha1(json.dumps(FINAL_CLASSES, sort_keys=True).encode()).hexdigest()[:12]
 
-                if not lbl_path.exists():
-                    continue
+def load_manifest(merged=MERGED):
+    try:
+        with open(Path(merged) / MANIFEST, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"classes": None, "outputs": {}}
 
-                new_name = f"{ds_name}_{stem}"
-                dst_img  = MERGED / "images" / out_split / (new_name + ext)
-                dst_lbl  = MERGED / "labels" / out_split / (new_name + ".txt")
+def save_manifest(manifest, merged=MERGED):
+    path = Path(merged) / MANIFEST
+    tmp  = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=0)
+    os.replace(tmp, path)
+
+def load_exclude(merged=MERGED):
+    try:
+        with open(Path(merged) / EXCLUDE, "r", encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip()}
+    except OSError:
+        return set()
 
-                ok = remap_label_file(str(lbl_path), str(dst_lbl), class_map)
-                if ok:
-                    os.makedirs(dst_img.parent, exist_ok=True)
-                    shutil.copy2(img_path, dst_img)
-                    ds_count += 1
+def _existing(merged):
+    """Relative paths of every file currently under images/ and labels/ (one listing per dir)."""
+    out = set()
+    for kind in ("images", "labels"):
+        for split in SPLIT_MAP.values():
+            out.update(f"{kind}/{split}/{name}" for name in _entries(Path(merged) / kind / split))
+    return out
 
-        print(f"   ✅ {ds_count} images copied")
-        total_images += ds_count
+def _rel(path, merged):
+    return Path(path).relative_to(merged).as_posix()
 
-    print(f"\n🎉 Merge complete! Total images: {total_images}")
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
 
-    # Write final data.yaml
+def _merge_one(job, link):
+    """``(dst_img, method)``; method is None when no label survived the remap."""
+    ds_name, src_img, src_lbl, dst_img, dst_lbl, class_map, _ = job
+    if not remap_label_file(src_lbl, dst_lbl, class_map):
+        # No classes left after remapping: drop any output from an earlier run
+        _unlink(dst_img)
+        _unlink(dst_lbl)
+        return dst_img, None
+    return dst_img, place(src_img, dst_img, link)
+
+def write_data_yaml(merged=MERGED):
     yaml_content = f"""train: data/merged/images/train
 val:   data/merged/images/val
 test:  data/merged/images/test
@@ -169,13 +231,88 @@ test:  data/merged/images/test
 nc: {len(FINAL_CLASSES)}
 names: {list(FINAL_CLASSES.keys())}
 """
-    with open("data/merged/data.yaml", "w") as f:
+    with open(Path(merged) / "data.yaml", "w") as f:
         f.write(yaml_content)
 
-    print("✅ data/merged/data.yaml written!")
-    print(f"\nFinal {len(FINAL_CLASSES)} classes:")
-    for name, idx in FINAL_CLASSES.items():
-        print(f"  {idx}: {name}")
+def merge(root=ROOT, merged=MERGED, workers=IO_WORKERS, link="auto", full=False):
+    merged = Path(merged)
+    # Create output dirs once
+    make_dirs(merged / kind / split for kind in ("images", "labels")
+              for split in SPLIT_MAP.values())
+
+    manifest = {"classes": None, "outputs": {}} if full else load_manifest(merged)
+    old      = manifest["outputs"]
+    versions = {ds: class_map_version(cm) for ds, cm in DATASET_MAPS.items()}
+    rebuild  = manifest["classes"] not in (None, classes_version())
+    if rebuild:
+        print("♻️  FINAL_CLASSES changed — rebuilding every output")
+    existing = _existing(merged)
+    exclude  = load_exclude(merged)
+
+    jobs    = collect_jobs(root, merged)
+    if exclude:
+        n    = len(jobs)
+        jobs = [j for j in jobs if _rel(j[3], merged) not in exclude]
+        print(f"🧬 {n - len(jobs)} images excluded as duplicates ({EXCLUDE})")
+    current = {}
+    todo    = []
+    for job in jobs:
+        ds_name, src_img, src_lbl, dst_img, dst_lbl, _, sig = job
+        key    = _rel(dst_img, merged)
+        record = {"ds": ds_name, "src": [src_img, src_lbl], "sig": sig, "map": versions[ds_name],
+                  "label": _rel(dst_lbl, merged)}
+        prev   = old.get(key)
+        current[key] = record
+        if prev and not rebuild and all(prev.get(k) == record[k] for k in ("src", "sig", "map")):
+            record["kept"] = prev.get("kept", True)
+            # Unchanged source: nothing to do while the outputs are still in place
+            if not record["kept"] or (key in existing and record["label"] in existing):
+                continue
+        todo.append(job)
+
+    # Outputs whose sources disappeared (or were renamed / re-split)
+    stale = [k for k in old if k not in current]
+    for key in stale:
+        _unlink(merged / key)
+        _unlink(merged / old[key]["label"])
+
+    print(f"\n📂 {len(jobs)} labelled images across {len({j[0] for j in jobs})} datasets · "
+          f"{len(todo)} new/changed · {len(jobs) - len(todo)} unchanged · {len(stale)} removed · "
+          f"{workers} workers · link={link}")
+    results, secs = parallel_map(lambda j: _merge_one(j, link), todo, workers)
+    # parallel_map returns completion order — key each result by its own output path
+    for dst_img, how in results:
+        current[_rel(dst_img, merged)]["kept"] = how is not None
+
+    per_ds  = Counter(r["ds"] for r in current.values() if r["kept"])
+    methods = Counter(how for _, how in results if how)
+    for ds_name in DATASET_MAPS:
+        if ds_name in per_ds:
+            print(f"   ✅ {ds_name}: {per_ds[ds_name]} images")
+    total_images = sum(per_ds.values())
+    print(f"\n🎉 Merge complete! Total images: {total_images} · {len(todo)} processed in {secs:.1f}s "
+          f"({len(todo) / max(secs, 1e-9):.0f} images/s)"
+          + "".join(f" · {n} {how}" for how, n in methods.most_common()))
+
+    yaml_path = merged / "data.yaml"
+    if manifest["classes"] != classes_version() or not yaml_path.exists():
+        write_data_yaml(merged)
+        print(f"✅ {yaml_path} written!")
+        print(f"\nFinal {len(FINAL_CLASSES)} classes:")
+        for name, idx in FINAL_CLASSES.items():
+            print(f"  {idx}: {name}")
+    else:
+        print(f"✅ {yaml_path} unchanged ({len(FINAL_CLASSES)} classes)")
+    save_manifest({"classes": classes_version(), "outputs": current}, merged)
+    return total_images
 
 if __name__ == "__main__":
-    merge()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Merge the NautiCAI source datasets into one YOLO dataset")
+    ap.add_argument("--root", default=str(ROOT), help="folder holding the dataset folders")
+    ap.add_argument("--out", default=str(MERGED), help="merged dataset folder")
+    ap.add_argument("--workers", type=int, default=IO_WORKERS, help="I/O threads")
+    ap.add_argument("--link", choices=LINK_MODES, default="auto",
+                    help="auto = hardlink, else reflink, else copy")
+    ap.add_argument("--full", action="store_true", help="ignore the manifest and rebuild every output")
+    args = ap.parse_args()
+    merge(Path(args.root), Path(args.out), args.workers, args.link, args.full)
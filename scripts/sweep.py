@@ -0,0 +1,161 @@
+"""
+NautiCAI — Detection threshold sweep
+Tunes the app's post-processing (confidence threshold, NMS IoU and the
+box-coverage window of engine._parse_result) on the cached raw predictions of
+evaluate.py, so the whole grid needs one inference pass.
+
+Per NMS IoU the candidates are suppressed once; each coverage window is a
+mask, and matching is done once per (IoU, window) in confidence order, so every
+confidence threshold is a prefix of the same result (cumulative sums, no
+re-matching). The output is a CSV of all settings, precision / recall /
+detections-per-image curves, and data/detect_config.json with the best
+setting, which the app loads as its defaults.
+
+    python scripts/sweep.py --weights best.pt --split val
+    python scripts/sweep.py --min-recall 0.85        # most precise setting that keeps recall
+"""
+import csv, json, time, argparse, datetime
+from pathlib import Path
+
+import numpy as np
+
+from evaluate import (MERGED, predict_raw, cache_path, ground_truth, postprocess, select,
+                      match_all, ap_per_class, APP_COVERAGE)
+
+OUT_ROOT   = Path("runs/sweep")
+CONFIG     = Path("data/detect_config.json")        # engine.DETECT_CONFIG_PATH
+# Grids stay inside the sidebar sliders (conf 0.05–0.95, IoU 0.10–0.90, step 0.05)
+CONFS      = np.round(np.arange(0.05, 0.951, 0.05), 2)
+IOUS       = np.round(np.arange(0.30, 0.801, 0.05), 2)
+COV_MINS   = (0.0, 0.001, 0.0025, 0.005, 0.01)
+COV_MAXS   = (0.30, 0.50, 0.70, 1.0)
+
+def _window(lo, hi):
+    return None if lo <= 0 and hi >= 1 else [lo, hi]
+
+def sweep(raw, gt, confs=CONFS, ious=IOUS, cov_mins=COV_MINS, cov_maxs=COV_MAXS, log=print):
+    """One row per (iou, coverage window, conf) with operating-point metrics."""
+    names = [str(n) for n in raw["names"]]
+    n_img, infer_ms = len(gt), float(raw["ms"].mean()) if len(raw["ms"]) else 0.0
+    rows = []
+    for iou in ious:
+        t0 = time.perf_counter()
+        det = postprocess(raw, float(confs.min()), float(iou))
+        post_ms = (time.perf_counter() - t0) * 1000 / max(n_img, 1)
+        for lo in cov_mins:
+            for hi in cov_maxs:
+                d = select(det, (det["coverage"] >= lo) & (det["coverage"] <= hi))
+                tp, gt_counts = match_all(d, gt, len(names))
+                tp50 = tp[:, :1]
+                order = np.argsort(-d["conf"], kind="stable")
+                conf_sorted, cum_tp = d["conf"][order], np.cumsum(tp50[order, 0])
+                n_gt = max(int(gt_counts.sum()), 1)
+                for c in confs:
+                    n = int(np.searchsorted(-conf_sorted, -c, side="right"))       # detections with conf ≥ c
+                    hits = int(cum_tp[n - 1]) if n else 0
+                    p, r = hits / max(n, 1), hits / n_gt
+                    keep = order[:n]
+                    ap = ap_per_class(tp50[keep], d["conf"][keep], d["cls"][keep], gt_counts)[0]
+                    present = gt_counts > 0
+                    rows.append({
+                        "conf": float(c), "iou": float(iou), "cov_min": lo, "cov_max": hi,
+                        "precision": round(p, 4), "recall": round(r, 4),
+                        "f1": round(2 * p * r / max(p + r, 1e-9), 4),
+                        "map50": round(float(ap[present, 0].mean()) if present.any() else 0.0, 4),
+                        "dets_per_image": round(n / max(n_img, 1), 3),
+                        "post_ms": round(post_ms, 2), "latency_ms": round(infer_ms + post_ms, 2),
+                    })
+        log(f"   IoU {iou:.2f}: {len(cov_mins) * len(cov_maxs) * len(confs)} settings")
+    return rows
+
+def recommend(rows, min_recall=0.0, objective="f1"):
+    """Best row by ``objective`` among those with recall ≥ ``min_recall`` (fewer detections breaks ties)."""
+    ok = [r for r in rows if r["recall"] >= min_recall] or rows
+    return max(ok, key=lambda r: (r[objective], -r["dets_per_image"]))
+
+def baseline(rows, conf=0.25, iou=0.45, coverage=APP_COVERAGE):
+    """The row of the original hand-set defaults, for comparison."""
+    for r in rows:
+        if (abs(r["conf"] - conf) < 1e-6 and abs(r["iou"] - iou) < 1e-6
+                and (r["cov_min"], r["cov_max"]) == tuple(coverage)):
+            return r
+    return None
+
+def plot(rows, best, path):
+    """Precision–recall per NMS IoU (at the best window) and metrics against conf (at the best IoU)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    win = (best["cov_min"], best["cov_max"])
+    fig, (a1, a2) = plt.subplots(1, 2, figsize=(12, 5))
+    for iou in sorted({r["iou"] for r in rows}):
+        pts = [r for r in rows if r["iou"] == iou and (r["cov_min"], r["cov_max"]) == win]
+        a1.plot([r["recall"] for r in pts], [r["precision"] for r in pts], marker=".",
+                lw=2 if iou == best["iou"] else 0.8, label=f"IoU {iou:.2f}")
+    a1.scatter([best["recall"]], [best["precision"]], s=80, c="red", zorder=5, label="recommended")
+    a1.set(xlabel="Recall", ylabel="Precision", title=f"Coverage {win[0]:g}–{win[1]:g}")
+    a1.legend(fontsize=7)
+    pts = [r for r in rows if r["iou"] == best["iou"] and (r["cov_min"], r["cov_max"]) == win]
+    for key in ("precision", "recall", "f1", "map50"):
+        a2.plot([r["conf"] for r in pts], [r[key] for r in pts], label=key)
+    a2.axvline(best["conf"], c="red", ls="--", lw=1)
+    a2b = a2.twinx()
+    a2b.plot([r["conf"] for r in pts], [r["dets_per_image"] for r in pts], c="grey", ls=":",
+             label="detections / image")
+    a2b.set_ylabel("Detections / image")
+    a2.set(xlabel="Confidence threshold", title=f"NMS IoU {best['iou']:.2f} · "
+           f"{best['latency_ms']:.0f} ms/image")
+    a2.legend(fontsize=7, loc="lower left")
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+    plt.close(fig)
+
+def write_config(best, weights, split, path=CONFIG):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cfg = {"conf": best["conf"], "iou": best["iou"], "coverage": _window(best["cov_min"], best["cov_max"]),
+           "metrics": {k: best[k] for k in ("precision", "recall", "f1", "map50", "dets_per_image",
+                                             "latency_ms")},
+           "model": Path(weights).name, "split": split,
+           "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M")}
+    path.write_text(json.dumps(cfg, indent=1), encoding="utf-8")
+    return path
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Sweep conf / NMS IoU / coverage filter on cached predictions")
+    ap.add_argument("--weights", default="best.pt")
+    ap.add_argument("--split", default="val")
+    ap.add_argument("--imgsz", type=int, default=640)
+    ap.add_argument("--device", default=None)
+    ap.add_argument("--merged", default=str(MERGED))
+    ap.add_argument("-n", "--limit", type=int, default=None, help="only the first N images")
+    ap.add_argument("--objective", choices=["f1", "map50", "precision", "recall"], default="f1")
+    ap.add_argument("--min-recall", type=float, default=0.0, help="ignore settings below this recall")
+    ap.add_argument("--config", default=str(CONFIG), help="recommended settings for the app")
+    ap.add_argument("--dry-run", action="store_true", help="report only, don't write the app config")
+    args = ap.parse_args()
+
+    raw = predict_raw(args.weights, args.split, args.imgsz, Path(args.merged), device=args.device,
+                      limit=args.limit)
+    gt = ground_truth(raw, Path(args.merged), args.split)
+    t0 = time.perf_counter()
+    rows = sweep(raw, gt)
+    print(f"✅ {len(rows)} settings scored in {time.perf_counter() - t0:.1f}s")
+
+    out = OUT_ROOT / cache_path(args.weights, args.split, args.imgsz, raw["files"], args.merged).stem
+    out.mkdir(parents=True, exist_ok=True)
+    with open(out / "sweep.csv", "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=list(rows[0]))
+        w.writeheader()
+        w.writerows(rows)
+    best = recommend(rows, args.min_recall, args.objective)
+    plot(rows, best, out / "curves.png")
+    print(f"📈 {out / 'sweep.csv'} · {out / 'curves.png'}")
+
+    for label, r in (("current", baseline(rows)), ("recommended", best)):
+        if r:
+            print(f"{label:<12} conf {r['conf']:.2f} · IoU {r['iou']:.2f} · coverage "
+                  f"{r['cov_min']:g}–{r['cov_max']:g} → P {r['precision']:.3f} · R {r['recall']:.3f} · "
+                  f"F1 {r['f1']:.3f} · mAP50 {r['map50']:.3f} · {r['dets_per_image']:.1f} det/img")
+    if not args.dry_run:
+        print(f"✅ App config → {write_config(best, args.weights, args.split, args.config)}")
@@ -3,40 +3,211 @@ NautiCAI — YOLOv8s Training Script
 Dataset: 15,845 images across 6 public datasets
 Classes: 19 (10 subsea + 9 hull)
 GPU: NVIDIA RTX 3050 Ti
+
+Settings come from scripts/train.yaml, overridable with ``--set key=value``.
+Device, dataloader workers and batch size default to ``auto`` and are resolved
+on the host, so the same config runs on a GPU workstation and a CPU-only build
+machine. An interrupted run continues from its ``last.pt``. Images are read
+from the memory-mapped cache in data/cache/<imgsz> when it exists
+(python scripts/image_cache.py build).
+
+Every epoch appends images/s, time spent waiting on the dataloader, step and
+validation time, and peak memory to ``<project>/<name>/throughput.json``.
+
+    python scripts/train.py
+    python scripts/train.py --set epochs=5 device=cpu name=smoke
+    python scripts/train.py --fresh          # ignore last.pt, start over
 """
-from ultralytics import YOLO
-
-model = YOLO("yolov8s.pt")  # auto-downloads on first run
-
-results = model.train(
-    data="data/merged/data.yaml",
-    epochs=80,
-    imgsz=640,
-    batch=16,           # reduce to 8 if memory error
-    lr0=0.01,
-    momentum=0.937,
-    weight_decay=0.0005,
-    warmup_epochs=3,
-    workers=0,          # fixes Windows multiprocessing error
-
-    # ── Underwater-specific augmentation ──────────────────────────────────
-    hsv_h=0.015,        # hue shift — simulates water colour variation
-    hsv_s=0.7,          # saturation — simulates green/blue cast
-    hsv_v=0.4,          # value — simulates depth light attenuation
-    degrees=10.0,       # rotation
-    translate=0.1,
-    scale=0.5,
-    flipud=0.3,         # valid underwater — no gravity cue
-    fliplr=0.5,
-    mosaic=1.0,         # handles partial occlusion by marine growth
-    mixup=0.1,          # improves turbidity robustness
-
-    project="runs/detect",
-    name="nauticai_v1",
-    exist_ok=True,
-    patience=20,
-    device=0,           # RTX 3050 Ti GPU ✅
-)
-
-print("✅ Training complete!")
-print("Best model: runs/detect/nauticai_v1/weights/best.pt")
\ No newline at end of file
+import os, sys, json, time, argparse
+from pathlib import Path
+
+import yaml
+
+from image_cache import ImageStore, cache_dir, trainer_for
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "app"))     # shared stdlib-only helpers
+from telemetry import peak_rss_mb
+
+CONFIG = Path(__file__).with_name("train.yaml")
+CPU_BATCH = 16
+
+# ── Config ───────────────────────────────────────────────────────────────────
+def load_config(path=CONFIG, overrides=()):
+    """The YAML config with ``key=value`` overrides applied (values parsed as YAML)."""
+    with open(path, "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f) or {}
+    for item in overrides:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"bad override {item!r} — expected key=value")
+        cfg[key.strip()] = yaml.safe_load(value)
+    return cfg
+
+def detect_device():
+    """``"0,1,…"`` for all CUDA GPUs, ``"mps"`` on Apple silicon, else ``"cpu"``."""
+    import torch
+    if torch.cuda.is_available():
+        return ",".join(str(i) for i in range(torch.cuda.device_count()))
+    if getattr(torch.backends, "mps", None) and torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+def detect_workers(device, cached):
+    """
+    Dataloader processes. Without the image cache each worker decodes JPEGs,
+    so GPUs get up to 8 per device. On CPU the workers compete with training
+    for cores, so they get at most a quarter. Windows without the cache keeps
+    0 (spawn + ultralytics dataset pickling).
+    """
+    cores = os.cpu_count() or 1
+    if sys.platform == "win32" and not cached:
+        return 0
+    if device == "cpu":
+        return max(1, min(4, cores // 4))
+    gpus = len(str(device).split(","))
+    return max(1, min(8 if not cached else 4, cores // gpus))
+
+def data_loader_args(imgsz, use_cache="auto"):
+    """Train from the preprocessed memmap cache when built (and allowed), else from raw JPEGs."""
+    if use_cache is False:
+        return {}
+    try:
+        store = ImageStore(cache_dir(imgsz))
+    except FileNotFoundError:
+        if use_cache is True:
+            raise
+        return {}
+    print(f"🗄️  Training from image cache {cache_dir(imgsz)} ({len(store)} images)")
+    return {"trainer": trainer_for(cache_dir(imgsz))}
+
+def resumable(last):
+    """True when ``last.pt`` is a checkpoint of an unfinished run (finished runs store epoch -1)."""
+    if not Path(last).exists():
+        return False
+    import torch
+    try:
+        ckpt = torch.load(last, map_location="cpu", weights_only=False)
+    except TypeError:          # torch < 1.13 has no weights_only
+        ckpt = torch.load(last, map_location="cpu")
+    return ckpt.get("epoch", -1) >= 0 and ckpt.get("optimizer") is not None
+
+# ── Throughput log ───────────────────────────────────────────────────────────
+class ThroughputLog:
+    """
+    Ultralytics callbacks timing each epoch. The gap between one batch's end
+    and the next batch's start is time spent waiting on the dataloader; the
+    batch itself is forward + backward + optimizer step.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            self.epochs = json.loads(self.path.read_text(encoding="utf-8"))     # resumed run: keep history
+        except (OSError, ValueError):
+            self.epochs = []
+
+    def register(self, model):
+        for event in ("on_train_epoch_start", "on_train_batch_start", "on_train_batch_end",
+                      "on_train_epoch_end", "on_fit_epoch_end"):
+            model.add_callback(event, getattr(self, event))
+
+    def on_train_epoch_start(self, trainer):
+        self.t_epoch = self.t_last = time.perf_counter()
+        self.wait = self.step = 0.0
+        self.batches = 0
+        if _cuda(trainer):
+            import torch
+            torch.cuda.reset_peak_memory_stats(trainer.device)
+
+    def on_train_batch_start(self, trainer):
+        now = time.perf_counter()
+        self.wait += now - self.t_last
+        self.t_last = now
+
+    def on_train_batch_end(self, trainer):
+        now = time.perf_counter()
+        self.step += now - self.t_last
+        self.t_last = now
+        self.batches += 1
+
+    def on_train_epoch_end(self, trainer):
+        self.t_train = time.perf_counter() - self.t_epoch
+        self.t_val0 = time.perf_counter()
+
+    def on_fit_epoch_end(self, trainer):
+        images = len(trainer.train_loader.dataset)
+        entry = {
+            "epoch": trainer.epoch + 1,
+            "images": images,
+            "batches": self.batches,
+            "train_s": round(self.t_train, 2),
+            "val_s": round(time.perf_counter() - self.t_val0, 2),
+            "images_per_s": round(images / max(self.t_train, 1e-9), 1),
+            "data_wait_s": round(self.wait, 2),
+            "data_wait_pct": round(100 * self.wait / max(self.t_train, 1e-9), 1),
+            "step_s": round(self.step, 2),
+            "peak_rss_mb": peak_rss_mb(),
+            "metrics": {k: round(float(v), 5) for k, v in (trainer.metrics or {}).items()},
+        }
+        if _cuda(trainer):
+            import torch
+            entry["gpu_peak_mb"] = round(torch.cuda.max_memory_allocated(trainer.device) / 2**20, 1)
+        self.epochs.append(entry)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.epochs, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)
+        print(f"⏱️  epoch {entry['epoch']}: {entry['images_per_s']} images/s · "
+              f"data wait {entry['data_wait_pct']}% · val {entry['val_s']}s")
+
+def _cuda(trainer):
+    return getattr(trainer.device, "type", "") == "cuda"
+
+# ── Run ──────────────────────────────────────────────────────────────────────
+def train(cfg, fresh=False):
+    from ultralytics import YOLO
+    cfg = dict(cfg)
+    # Runner keys; the rest goes to ultralytics as is
+    model_src = cfg.pop("model", "yolov8s.pt")
+    use_cache = cfg.pop("image_cache", "auto")
+    resume    = cfg.pop("resume", "auto")
+    run_dir = Path(cfg["project"]) / cfg["name"]
+    last = run_dir / "weights" / "last.pt"
+
+    loader = data_loader_args(cfg["imgsz"], use_cache)
+    if cfg.get("device", "auto") == "auto":
+        cfg["device"] = detect_device()
+    if cfg.get("workers", "auto") == "auto":
+        cfg["workers"] = detect_workers(cfg["device"], bool(loader))
+    if cfg.get("batch", "auto") == "auto":
+        cfg["batch"] = CPU_BATCH if cfg["device"] in ("cpu", "mps") else -1      # -1 = AutoBatch (CUDA)
+    print(f"🖥️  device {cfg['device']} · {cfg['workers']} workers · batch {cfg['batch']}")
+
+    if not fresh and resume is not False and resumable(last):
+        print(f"↩️  Resuming from {last}")
+        model = YOLO(str(last))
+        ThroughputLog(run_dir / "throughput.json").register(model)
+        # ultralytics restores every other setting from the checkpoint
+        return model.train(resume=True, device=cfg["device"], workers=cfg["workers"], **loader)
+    if resume is True and not fresh:
+        raise FileNotFoundError(f"resume requested but no unfinished run at {last}")
+
+    model = YOLO(model_src)
+    log = ThroughputLog(run_dir / "throughput.json")
+    log.epochs = []                                 # new run
+    log.register(model)
+    return model.train(**cfg, **loader)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Train the NautiCAI detector")
+    ap.add_argument("--config", default=str(CONFIG))
+    ap.add_argument("--set", nargs="*", default=[], metavar="KEY=VALUE", help="override config values")
+    ap.add_argument("--fresh", action="store_true", help="start over even if last.pt exists")
+    args = ap.parse_args()
+
+    cfg = load_config(args.config, args.set)
+    train(cfg, args.fresh)
+
+    print("✅ Training complete!")
+    print(f"Best model: {Path(cfg['project']) / cfg['name'] / 'weights' / 'best.pt'}")
+    print(f"Throughput: {Path(cfg['project']) / cfg['name'] / 'throughput.json'}")
@@ -0,0 +1,42 @@
+"""Batch inspection result naming / resume (needs the app's cv2 + numpy stack)."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("scipy")
+pytest.importorskip("matplotlib")
+
+import batch
+import engine
+
+def test_asset_stem_unique():
+    rels = ["dup/x.jpg", "dup/x.png", "a/b.jpg", "a__b.jpg"]
+    assert len({batch.asset_stem(r) for r in rels}) == len(rels)
+
+def test_same_stem_assets_keep_own_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, "MODEL_PATH", None)      # synthetic detector, no weights needed
+    monkeypatch.setattr(engine, "INFERENCE_URL", None)
+    src, out = tmp_path / "src", tmp_path / "out"
+    (src / "dup").mkdir(parents=True)
+    (out / "results").mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    for ext in ("jpg", "png"):
+        cv2.imwrite(str(src / "dup" / f"x.{ext}"), rng.integers(0, 255, (320, 480, 3), dtype=np.uint8))
+    s = dict(batch.DEFAULT_SETTINGS)
+
+    assets = batch.discover(src)
+    assert [rel for _, rel, _ in assets] == ["dup/x.jpg", "dup/x.png"]
+    for path, rel, kind in assets:
+        batch.process_asset(path, rel, kind, out, s)
+
+    results = sorted((out / "results").glob("*.json"))
+    assert len(results) == 2
+    # Both assets resume as done: each result file holds its own fingerprint
+    for path, rel, _ in assets:
+        res = out / "results" / f"{batch.asset_stem(rel)}.json"
+        assert batch.is_done(res, batch.fingerprint(path, s))
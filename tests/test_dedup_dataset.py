@@ -0,0 +1,32 @@
+"""Near-duplicate clustering of the merged dataset."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+import dedup_dataset as dd
+
+def _bits(n):
+    return (1 << n) - 1                 # hash with the lowest n bits set
+
+def test_chain_is_not_collapsed():
+    # Consecutive frames 5 bits apart: each is a near-duplicate of the next, the ends are 20 apart
+    hashes = {f"train/f{i}.jpg": (_bits(5 * i), 1000) for i in range(5)}
+    split_of = {p: "train" for p in hashes}
+    groups = dd.clusters(hashes, 6, split_of)
+    decisions = dd.plan(groups, split_of, hashes)
+    kept = {d["keep"] for d in decisions} | (set(hashes) - {p for g in groups for p in g})
+    assert kept == {"train/f0.jpg", "train/f2.jpg", "train/f4.jpg"}
+    for d in decisions:
+        assert all(dd.hamming(hashes[p][0], hashes[d["keep"]][0]) <= 6 for p in d["drop"])
+
+def test_cross_split_keeps_training_copy():
+    hashes = {"val/a.jpg": (_bits(3), 4000), "train/a.jpg": (_bits(4), 1000), "test/b.jpg": (_bits(40), 1000)}
+    split_of = {p: p.split("/")[0] for p in hashes}
+    [d] = dd.plan(dd.clusters(hashes, 6, split_of), split_of, hashes)
+    assert d["keep"] == "train/a.jpg" and d["drop"] == ["val/a.jpg"] and d["leak"]
@@ -0,0 +1,60 @@
+"""Image cache ↔ ultralytics dataset integration (needs ultralytics + cv2)."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+import image_cache
+
+IMGSZ = 64
+
+def _tiny_dataset(root, n=6, split="train"):
+    images, labels = root / "images" / split, root / "labels" / split
+    images.mkdir(parents=True)
+    labels.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    for i in range(n):
+        h, w = (48, 80) if i % 2 else (96, 72)
+        cv2.imwrite(str(images / f"{i}.jpg"), rng.integers(0, 255, (h, w, 3), dtype=np.uint8))
+        (labels / f"{i}.txt").write_text("0 0.5 0.5 0.2 0.2\n")
+    return images
+
+def test_partial_build_keeps_other_splits(tmp_path):
+    root, out = tmp_path / "merged", tmp_path / "cache"
+    _tiny_dataset(root, split="train")
+    _tiny_dataset(root, n=3, split="val")
+    quiet = lambda *a: None
+    image_cache.build(root / "images", IMGSZ, ["train", "val"], workers=1, out_dir=out, log=quiet)
+    index = image_cache.build(root / "images", IMGSZ, ["train"], workers=1, out_dir=out, force=True, log=quiet)
+    assert set(index["splits"]) == {"train", "val"}
+    store = image_cache.ImageStore(out)
+    assert len(store) == 9 and str(root / "images" / "val" / "0.jpg") in store
+
+def test_mosaic_item_from_cache(tmp_path):
+    pytest.importorskip("ultralytics")
+    from ultralytics.cfg import get_cfg
+    from ultralytics.data.build import build_yolo_dataset
+
+    images = _tiny_dataset(tmp_path / "merged")
+    out = tmp_path / "cache"
+    image_cache.build(images.parent, IMGSZ, ["train"], workers=1, out_dir=out, log=lambda *a: None)
+    store = image_cache.ImageStore(out)
+
+    cfg = get_cfg(overrides={"imgsz": IMGSZ, "mosaic": 1.0, "mixup": 0.0, "workers": 0})
+    ds = build_yolo_dataset(cfg, str(images), 4, {"names": {0: "defect"}, "nc": 1, "channels": 3}, mode="train")
+    image_cache.attach(ds, store)
+    assert isinstance(ds, image_cache.CachedYOLODataset) and ds.augment
+
+    item = ds[0]
+    assert tuple(item["img"].shape[1:]) == (IMGSZ, IMGSZ)
+    # Mosaic picked its partners from the buffer the cached loads filled
+    assert ds.buffer and all(ds.ims[j] is not None for j in ds.buffer)
+    assert len(ds.buffer) <= ds.max_buffer_length
+    for j in ds.buffer:
+        im, hw0, hw = store.load(ds.im_files[j])
+        assert ds.im_hw0[j] == hw0 and ds.im_hw[j] == hw
@@ -0,0 +1,31 @@
+"""Tiled mosaic inspection without weights (needs the app's cv2 + numpy stack)."""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("scipy")
+pytest.importorskip("matplotlib")
+
+import engine
+import mosaic_tiles
+from batch import DEFAULT_SETTINGS
+
+def test_thin_edge_tiles_without_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, "MODEL_PATH", None)      # synthetic detector path
+    monkeypatch.setattr(engine, "INFERENCE_URL", None)
+    mosaic = tmp_path / "hull.npy"
+    np.save(mosaic, np.random.default_rng(0).integers(20, 200, (1300, 1300, 3), dtype=np.uint8))
+    rects = mosaic_tiles.tile_grid(1300, 1300)
+    assert min(min(w, h) for _, _, w, h in rects) < engine.SYNTH_MIN_SIDE     # 148 px edge strips
+    s = dict(DEFAULT_SETTINGS, mode="hull")
+    for rect in rects:
+        _, dets, _ = mosaic_tiles._tile_job(str(mosaic), rect, s)
+        x, y, w, h = rect
+        if min(w, h) < engine.SYNTH_MIN_SIDE:
+            assert dets == []
+        assert all(x <= d["x1"] <= d["x2"] <= x + w and y <= d["y1"] <= d["y2"] <= y + h for d in dets)